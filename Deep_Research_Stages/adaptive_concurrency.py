@@ -0,0 +1,291 @@
+## Adaptive Concurrency Control
+## AIMD-style limiters that adjust how many LLM, search and researcher calls run in parallel
+## based on the latency and error rate observed from the backends (Ollama, Tavily)
+
+"""Adaptive Concurrency Limiters.
+
+A fixed cap on parallel work is either too low on an idle GPU box or too high under
+load, where Ollama queues everything and latency collapses. This module implements
+an additive-increase / multiplicative-decrease (AIMD) limiter:
+- The limit grows by one slot per "limit" successful calls while calls are fast
+- The limit is halved when a call fails or latency rises well above its baseline
+- Waiting callers are admitted in FIFO order as slots free up
+
+Limiters work from both sync code (tools running in worker threads) and async code
+(graph nodes), and are shared process-wide by name through get_limiter():
+- "researchers": parallel researcher agents launched by supervisor_tools. This one is
+  a fixed cap: a researcher's latency depends on how deep its topic goes, not on
+  backend load, so it would only ever shrink the limit
+- "search": Tavily search calls made by the researcher tool node
+- "summarization": webpage summarization LLM calls
+
+AIMD only adapts on single backend calls (one search, one LLM call), whose latency
+does track load. Current limits and counters are exposed through limiter_metrics()
+and printed at the end of a run with print_limiter_metrics().
+"""
+
+import asyncio
+import collections
+import threading
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+class AdaptiveLimiter:
+    """Thread-safe AIMD concurrency limiter.
+
+    Use `with limiter.slot():` in sync code and `async with limiter.slot():` in
+    async code around each call to the backend being protected.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        latency_tolerance: float = 2.0,
+        backoff_factor: float = 0.5,
+        smoothing: float = 0.2,
+        adaptive: bool = True,
+    ):
+        """Create a limiter.
+
+        Args:
+            name: Name reported in metrics
+            initial_limit: Number of concurrent calls allowed at start
+            min_limit: Lower bound for the limit
+            max_limit: Upper bound for the limit
+            latency_tolerance: Back off when smoothed latency exceeds the baseline
+                latency by this factor
+            backoff_factor: Multiplier applied to the limit on congestion or errors
+            smoothing: Weight of the newest sample in the latency moving average
+            adaptive: Whether latency and errors move the limit. A non-adaptive
+                limiter is a fixed cap of initial_limit with the same FIFO admission
+                and metrics
+        """
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_factor = backoff_factor
+        self.smoothing = smoothing
+        self.adaptive = adaptive
+
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._completed = 0
+        self._errors = 0
+        self._smoothed_latency = None
+        self._baseline_latency = None
+        ## Completions to wait for after a backoff before backing off again
+        self._cooldown = 0
+
+    ## ADMISSION
+
+    @property
+    def limit(self) -> int:
+        """Current number of calls allowed to run concurrently."""
+        return max(self.min_limit, int(self._limit))
+
+    def _try_acquire_locked(self) -> bool:
+        if not self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            return True
+        return False
+
+    def _wake_waiters_locked(self):
+        """Hand free slots to waiters in FIFO order."""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            self._in_flight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_resolve_future, future)
+
+    def acquire(self):
+        """Block the current thread until a slot is available."""
+        with self._lock:
+            if self._try_acquire_locked():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a slot is available."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire_locked():
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            ## The slot was granted while we were being cancelled - give it back
+            self.release(latency=None, error=False)
+            raise
+
+    def release(self, latency: float = None, error: bool = False):
+        """Free a slot and feed the observed latency or error into the AIMD loop."""
+        with self._lock:
+            self._in_flight -= 1
+            if latency is not None or error:
+                self._record_locked(latency, error)
+            self._wake_waiters_locked()
+
+    ## AIMD CONTROL
+
+    def _record_locked(self, latency: float, error: bool):
+        self._completed += 1
+        if self._cooldown > 0:
+            self._cooldown -= 1
+
+        if error:
+            self._errors += 1
+            if self.adaptive:
+                self._backoff_locked()
+            return
+
+        if self._smoothed_latency is None:
+            self._smoothed_latency = latency
+            self._baseline_latency = latency
+        else:
+            self._smoothed_latency += self.smoothing * (latency - self._smoothed_latency)
+            ## Baseline follows new minimums immediately and drifts up slowly otherwise
+            if latency < self._baseline_latency:
+                self._baseline_latency = latency
+            else:
+                self._baseline_latency += 0.01 * (latency - self._baseline_latency)
+
+        if not self.adaptive:
+            return
+        if self._smoothed_latency > self._baseline_latency * self.latency_tolerance:
+            self._backoff_locked()
+        elif self._in_flight + 1 >= self.limit or self._waiters:
+            ## Only grow while the limit is actually the bottleneck
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+
+    def _backoff_locked(self):
+        if self._cooldown > 0:
+            return
+        self._limit = max(float(self.min_limit), self._limit * self.backoff_factor)
+        ## Let the calls already in flight drain before reacting again
+        self._cooldown = max(self._in_flight, 1)
+        if self._smoothed_latency is not None:
+            self._smoothed_latency = self._baseline_latency
+
+    def slot(self) -> "_Slot":
+        """Return a context manager holding one slot, usable with `with` or `async with`."""
+        return _Slot(self)
+
+    ## METRICS
+
+    def metrics(self) -> dict:
+        """Return the current limit and counters for this limiter."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "adaptive": self.adaptive,
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "completed": self._completed,
+                "errors": self._errors,
+                "smoothed_latency_s": self._smoothed_latency,
+                "baseline_latency_s": self._baseline_latency,
+            }
+
+class _Slot:
+    """Context manager that holds one slot of an AdaptiveLimiter and times the call."""
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self.start = None
+
+    def __enter__(self):
+        self.limiter.acquire()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limiter.release(latency=time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+    async def __aenter__(self):
+        await self.limiter.acquire_async()
+        self.start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        ## Cancellation says nothing about backend health, so it is not counted as an error
+        cancelled = exc_type is not None and issubclass(exc_type, asyncio.CancelledError)
+        self.limiter.release(
+            latency=None if cancelled else time.perf_counter() - self.start,
+            error=exc_type is not None and not cancelled,
+        )
+        return False
+
+def _resolve_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+## SHARED LIMITERS
+
+## Default settings for the process-wide limiters
+limiter_defaults = {
+    "researchers": {"initial_limit": 3, "adaptive": False},
+    "search": {"initial_limit": 4, "max_limit": 16},
+    "summarization": {"initial_limit": 2, "max_limit": 8},
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name: str) -> AdaptiveLimiter:
+    """Get or create the process-wide limiter with the given name."""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveLimiter(name, **limiter_defaults.get(name, {}))
+        return _limiters[name]
+
+def limiter_metrics() -> list[dict]:
+    """Return metrics for every limiter created in this process."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.metrics() for limiter in limiters]
+
+def print_limiter_metrics():
+    """Display the limits and counters of every limiter as a table."""
+    metrics = limiter_metrics()
+    if not metrics:
+        return
+    table = Table(title="Concurrency Limiters", show_header=True, header_style="bold magenta")
+    table.add_column("Limiter", style="cyan")
+    table.add_column("Limit", justify="right")
+    table.add_column("Completed", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("Latency (s)", justify="right")
+    table.add_column("Baseline (s)", justify="right")
+    for m in metrics:
+        table.add_row(
+            m["name"],
+            str(m["limit"]) if m["adaptive"] else f"{m['limit']} (fixed)",
+            str(m["completed"]),
+            str(m["errors"]),
+            f"{m['smoothed_latency_s']:.2f}" if m["smoothed_latency_s"] is not None else "-",
+            f"{m['baseline_latency_s']:.2f}" if m["baseline_latency_s"] is not None else "-",
+        )
+    console.print(table)
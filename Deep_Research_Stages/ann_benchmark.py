@@ -0,0 +1,145 @@
+## ANN Index Benchmark
+## Measures recall and latency of the IVF-flat index against exact search on synthetic clustered
+## embeddings at several corpus sizes (10k, 100k and 1M chunks by default)
+
+"""Benchmark: IVF-Flat Recall and Latency vs Exact Search.
+
+For each corpus size, fills a DiskVectorStore with index="ivf" with synthetic
+embeddings, in batches as index_directory would (so the timing includes the
+incremental inserts and retraining), then runs the same queries:
+- exactly, scoring every row (the ground truth and the baseline latency)
+- through the IVF index at every requested nprobe
+
+and reports recall@k against the exact results with p50/p95 latency per query.
+
+Synthetic vectors are drawn around random topic centres, since real chunk
+embeddings cluster by topic; uniformly random vectors have no neighbourhood
+structure for any ANN index to exploit. Queries come from the same distribution.
+
+Usage:
+    python ann_benchmark.py --sizes 10000 100000 1000000 --dim 128 --nprobe 1 4 16 64
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from vector_store import DiskVectorStore
+
+console = Console()
+
+## Rows upserted per add_vectors call
+insert_batch_rows = 100000
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def synthetic_vectors(count: int, centres: np.ndarray, noise: float, rng: np.random.Generator) -> np.ndarray:
+    """Vectors scattered around randomly chosen centres."""
+    dim = centres.shape[1]
+    points = centres[rng.integers(len(centres), size=count)]
+    return (points + rng.standard_normal((count, dim), dtype=np.float32) * noise / np.sqrt(dim)).astype(np.float32)
+
+def time_queries(store: DiskVectorStore, queries: np.ndarray, k: int, **search_kwargs) -> tuple[list, list]:
+    """Run every query and return the result IDs and latencies."""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        docs = store.similarity_search_by_vector_with_score(query, k, **search_kwargs)
+        latencies.append(time.perf_counter() - start)
+        results.append({doc.id for doc, _ in docs})
+    return results, latencies
+
+def benchmark_size(rows: int, args, workdir: str) -> list[dict]:
+    """Build a store of `rows` synthetic vectors and compare exact and IVF search."""
+    rng = np.random.default_rng(args.seed)
+    centres = rng.standard_normal((args.topics, args.dim), dtype=np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+
+    path = tempfile.mkdtemp(prefix=f"ann_{rows}_", dir=workdir)
+    store = DiskVectorStore(path, index="ivf")
+    try:
+        start = time.perf_counter()
+        for offset in range(0, rows, insert_batch_rows):
+            count = min(insert_batch_rows, rows - offset)
+            store.add_vectors(
+                synthetic_vectors(count, centres, args.noise, rng),
+                [""] * count,
+                ids=[f"v{i}" for i in range(offset, offset + count)],
+            )
+        build = time.perf_counter() - start
+        if not store.ann_active:
+            store.build_index()
+
+        queries = synthetic_vectors(args.queries, centres, args.noise, rng)
+        truth, exact_latencies = time_queries(store, queries, args.k, exact=True)
+        results = [{
+            "rows": rows, "build_s": build, "lists": len(store._ivf.centroids), "nprobe": "exact",
+            "recall": 1.0,
+            "p50_ms": percentile(exact_latencies, 0.5) * 1000,
+            "p95_ms": percentile(exact_latencies, 0.95) * 1000,
+            "mean_ms": statistics.mean(exact_latencies) * 1000,
+        }]
+        for nprobe in args.nprobe:
+            found, latencies = time_queries(store, queries, args.k, nprobe=nprobe)
+            recall = statistics.mean(len(f & t) / len(t) for f, t in zip(found, truth))
+            results.append({
+                "rows": rows, "build_s": build, "lists": len(store._ivf.centroids), "nprobe": str(nprobe),
+                "recall": recall,
+                "p50_ms": percentile(latencies, 0.5) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "mean_ms": statistics.mean(latencies) * 1000,
+            })
+        return results
+    finally:
+        store.close()
+        shutil.rmtree(path, ignore_errors=True)
+
+def run_benchmark(args) -> list[dict]:
+    """Benchmark every size in turn and print one comparison table."""
+    workdir = args.workdir or tempfile.gettempdir()
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    for rows in args.sizes:
+        console.print(f"[cyan]Building {rows} rows of {args.dim} dimensions...[/cyan]")
+        results.extend(benchmark_size(rows, args, workdir))
+
+    table = Table(title=f"IVF-Flat vs Exact Search (recall@{args.k}, {args.queries} queries)", show_header=True, header_style="bold magenta")
+    table.add_column("Rows", justify="right", style="cyan")
+    table.add_column("Build (s)", justify="right")
+    table.add_column("Lists", justify="right")
+    table.add_column("nprobe", justify="right")
+    table.add_column(f"Recall@{args.k}", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    for r in results:
+        table.add_row(
+            str(r["rows"]), f"{r['build_s']:.1f}", str(r["lists"]), r["nprobe"], f"{r['recall']:.3f}",
+            f"{r['p50_ms']:.2f}", f"{r['p95_ms']:.2f}", f"{r['mean_ms']:.2f}",
+        )
+    console.print(table)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark IVF-flat recall and latency against exact search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Corpus sizes (rows)")
+    parser.add_argument("--dim", type=int, default=128, help="Vector dimensions (nomic-embed-text uses 768)")
+    parser.add_argument("--topics", type=int, default=1000, help="Topic centres the vectors cluster around")
+    parser.add_argument("--noise", type=float, default=1.0, help="Spread of vectors around their topic centre")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per size")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64], help="IVF lists probed per query")
+    parser.add_argument("--workdir", help="Directory for the temporary stores (default: the system temp directory)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    run_benchmark(args)
@@ -0,0 +1,187 @@
+## Approximate Nearest-Neighbour Index
+## IVF-flat index on NumPy for DiskVectorStore: spherical k-means centroids, inverted lists of rows
+## and a tunable number of probed lists, persisted next to the store's vectors
+
+"""IVF-Flat Approximate Nearest-Neighbour Index.
+
+Exact search scores every row of the store for every query, which is fine for a few
+blog posts but grows linearly with the corpus. IVFIndex partitions the rows:
+- Training runs spherical k-means (vectors are L2-normalized, so the dot product
+  is the cosine) on a sample of the live rows and assigns every row to its
+  nearest centroid
+- A query scores the centroids, probes the `nprobe` closest inverted lists and
+  scores only their rows exactly, so nprobe trades recall for latency
+- Inserts are incremental: new or updated rows are assigned to their nearest
+  centroid; DiskVectorStore retrains once the store has grown retrain_growth_factor
+  times past the rows the centroids were trained on
+
+Persistence lives in the store directory:
+- ivf_centroids.npy: the centroids
+- ivf_lists.i32: memory-mapped list number + 1 per row (0 for rows not yet assigned)
+
+The inverted lists themselves are rebuilt from ivf_lists.i32 on the first search
+and then kept in step with upserts: a row reassigned to another centroid moves
+from its old list to the new one, so every row is in exactly one list.
+
+Usage:
+    store = DiskVectorStore("./vector_store", index="ivf")
+    store.similarity_search("query", k=4, nprobe=32)
+"""
+
+import math
+import os
+
+import numpy as np
+
+## CONFIGURATION
+
+## Rows below which search stays exact (scoring every row is fast and k-means needs data)
+ann_min_rows = 10000
+## Inverted lists per square root of the row count
+ivf_lists_factor = 1.0
+## Lists probed per query by default (more lists: higher recall, slower search)
+default_nprobe = 16
+## Training sample rows per list
+train_rows_per_list = 64
+## k-means iterations
+kmeans_iterations = 10
+## Retrain once the store holds this many times the rows the centroids were trained on
+retrain_growth_factor = 4.0
+## Rows assigned per block (bounds the rows x centroids score matrix)
+assign_block_rows = 16384
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each vector, computed in blocks."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), assign_block_rows):
+        block = np.asarray(vectors[start:start + assign_block_rows], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+def spherical_kmeans(data: np.ndarray, lists: int, iterations: int = kmeans_iterations, seed: int = 0) -> np.ndarray:
+    """Unit-length centroids of `data` (rows must be L2-normalized)."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), lists, replace=False)].copy()
+    for _ in range(iterations):
+        labels = nearest_centroids(data, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=lists)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(data[order], starts, axis=0)
+        ## Empty lists restart from random points instead of staying empty
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+class IVFIndex:
+    """Inverted-file index over the rows of a DiskVectorStore."""
+
+    def __init__(self, path: str):
+        """Open the index files in the store directory `path` (untrained if absent)."""
+        self.centroids_path = os.path.join(path, "ivf_centroids.npy")
+        self.lists_path = os.path.join(path, "ivf_lists.i32")
+        self.centroids = np.load(self.centroids_path) if os.path.exists(self.centroids_path) else None
+        self.assignments = None
+        self._lists = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def map(self, capacity: int):
+        """Map the assignment file with room for `capacity` rows."""
+        size = capacity * 4
+        if not os.path.exists(self.lists_path) or os.path.getsize(self.lists_path) < size:
+            with open(self.lists_path, "ab") as f:
+                f.truncate(size)
+        if self.assignments is not None:
+            self.assignments.flush()
+        self.assignments = np.memmap(self.lists_path, dtype=np.int32, mode="r+", shape=(capacity,))
+
+    def flush(self):
+        if self.assignments is not None:
+            self.assignments.flush()
+
+    def train(self, vectors: np.ndarray, alive: np.ndarray, rows: int, seed: int = 0):
+        """Train centroids on a sample of the live rows, then assign every row.
+
+        Args:
+            vectors: Store vectors (memory-mapped, L2-normalized)
+            alive: Store liveness flags
+            rows: Rows in use
+            seed: Random seed of the sample and of k-means initialization
+        """
+        rng = np.random.default_rng(seed)
+        live = np.flatnonzero(alive[:rows])
+        lists = max(1, min(len(live), int(ivf_lists_factor * math.sqrt(len(live)))))
+        sample = np.sort(rng.choice(live, min(len(live), lists * train_rows_per_list), replace=False))
+        self.centroids = spherical_kmeans(np.asarray(vectors[sample]), lists, seed=seed)
+        np.save(self.centroids_path, self.centroids)
+        self.assignments[:rows] = nearest_centroids(vectors[:rows], self.centroids) + 1
+        self.assignments.flush()
+        self._lists = None
+
+    def add(self, vectors: np.ndarray, rows: list[int]):
+        """Assign new or updated rows to their nearest centroid."""
+        rows = np.asarray(rows, dtype=np.int64)
+        ## A row may appear twice in one upsert; its last vector wins, as in the store
+        unique_rows = np.unique(rows)
+        previous = np.asarray(self.assignments[unique_rows])
+        self.assignments[rows] = nearest_centroids(vectors, self.centroids) + 1
+        self.assignments.flush()
+        if self._lists is None:
+            return
+
+        current = np.asarray(self.assignments[unique_rows])
+        moved = previous != current
+        for label in np.unique(previous[moved & (previous > 0)]):
+            old = self._lists[label - 1]
+            self._lists[label - 1] = old[~np.isin(old, unique_rows[moved & (previous == label)])]
+        for label in np.unique(current[moved]):
+            self._lists[label - 1] = np.concatenate([self._lists[label - 1], unique_rows[moved & (current == label)]])
+
+    def _inverted_lists(self, rows: int) -> list[np.ndarray]:
+        if self._lists is None:
+            assignments = np.asarray(self.assignments[:rows])
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(1, len(self.centroids) + 2))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def search(self, vectors: np.ndarray, alive: np.ndarray, rows: int, query: np.ndarray, k: int, nprobe: int = default_nprobe) -> tuple[np.ndarray, np.ndarray]:
+        """Rows and cosine scores of the `k` most similar live rows among the probed lists.
+
+        Args:
+            vectors: Store vectors (memory-mapped, L2-normalized)
+            alive: Store liveness flags
+            rows: Rows in use
+            query: L2-normalized query vector
+            k: Results to return
+            nprobe: Inverted lists to probe
+
+        Returns:
+            Rows and scores, best first
+        """
+        lists = self._inverted_lists(rows)
+        nprobe = max(1, min(nprobe, len(lists)))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        ## Sorted, duplicate-free rows read the mapped vectors in file order
+        candidates = np.unique(np.concatenate([lists[i] for i in probe]))
+        if not len(candidates):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = vectors[candidates] @ query
+        scores[alive[candidates] == 0] = -np.inf
+        top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        live = np.isfinite(scores[top])
+        return candidates[top][live], scores[top][live]
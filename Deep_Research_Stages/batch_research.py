@@ -0,0 +1,190 @@
+## Batch Research Runner
+## Runs many research requests from a JSONL file through the full research agent concurrently
+## and writes reports and per-job timings to a JSONL file as they finish
+
+"""Batch Research Job Runner.
+
+Input: a JSONL file with one research job per line, e.g.
+    {"id": "coffee", "question": "What are the best coffee shops in Toronto?"}
+The "id" is optional (the line number is used instead).
+
+Output: a JSONL file with one result per finished job, appended as soon as the job
+finishes, with the job status ("completed", "needs_clarification" or "failed"),
+the final report (or clarification question / error) and per-job timings.
+
+Features:
+- Global concurrency limit on jobs running at once
+- Resume after interruption: jobs already finished in the output are skipped (failed
+  jobs are retried), and with --checkpoint-db each job is checkpointed so interrupted
+  jobs resume mid-run
+- Overall throughput in jobs per hour
+
+Usage:
+    python batch_research.py jobs.jsonl results.jsonl --concurrency 4
+    python batch_research.py jobs.jsonl results.jsonl --checkpoint-db research_checkpoints.db
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from contextlib import AsyncExitStack
+
+from langchain_core.messages import HumanMessage
+from rich.console import Console
+
+from adaptive_concurrency import print_limiter_metrics
+from model_scheduler import print_scheduler_metrics
+from source_registry import with_source_registry
+
+console = Console()
+
+## Maximum number of research jobs running at once
+default_job_concurrency = 2
+
+## JOB FILES
+
+def load_jobs(path: str) -> list[dict]:
+    """Load research jobs from a JSONL file, assigning line numbers as missing IDs."""
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            job["id"] = str(job.get("id", line_number))
+            jobs.append(job)
+    return jobs
+
+def load_finished_job_ids(path: str) -> set:
+    """Return the IDs of jobs already written to the output file (failed jobs are run again)."""
+    if not os.path.exists(path):
+        return set()
+    finished = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+                if result["status"] != "failed":
+                    finished.add(result["id"])
+            except (json.JSONDecodeError, KeyError):
+                ## A line cut short by an interruption - that job is run again
+                continue
+    return finished
+
+## JOB EXECUTION
+
+async def run_job(graph, job: dict, checkpointed: bool) -> dict:
+    """Run one research job and return its result record."""
+    start = time.time()
+    try:
+        if checkpointed:
+            from checkpointing import run_or_resume
+            state = await run_or_resume(
+                graph,
+                {"messages": [HumanMessage(content=job["question"])]},
+                thread_id=f"batch-{job['id']}",
+            )
+        else:
+            state = await graph.ainvoke(
+                {"messages": [HumanMessage(content=job["question"])]},
+                config=with_source_registry(),
+            )
+
+        if state.get("final_report"):
+            status, output = "completed", state["final_report"]
+        else:
+            status, output = "needs_clarification", state["messages"][-1].content
+        error = None
+    except Exception as e:
+        status, output, error = "failed", None, f"{type(e).__name__}: {e}"
+
+    end = time.time()
+    return {
+        "id": job["id"],
+        "status": status,
+        "question": job["question"],
+        "final_report": output if status == "completed" else None,
+        "clarification": output if status == "needs_clarification" else None,
+        "error": error,
+        "timings": {"started_at": start, "finished_at": end, "duration_s": end - start},
+    }
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = default_job_concurrency,
+    checkpoint_db: str = None,
+) -> dict:
+    """Run every unfinished job of a JSONL file and append results as they finish.
+
+    Args:
+        input_path: JSONL file with research jobs
+        output_path: JSONL file results are appended to
+        concurrency: Maximum number of jobs running at once
+        checkpoint_db: Optional SQLite database for per-job checkpoints
+
+    Returns:
+        Summary with job counts, elapsed time and throughput in jobs per hour
+    """
+    from complete_research_agent import agent, build_agent
+
+    jobs = load_jobs(input_path)
+    finished = load_finished_job_ids(output_path)
+    pending = [job for job in jobs if job["id"] not in finished]
+    console.print(f"[bold blue]{len(pending)} jobs to run ({len(jobs) - len(pending)} already finished)[/bold blue]")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    counts = {"completed": 0, "needs_clarification": 0, "failed": 0}
+    start = time.perf_counter()
+
+    async with AsyncExitStack() as stack:
+        graph = agent
+        if checkpoint_db:
+            from checkpointing import sqlite_checkpointer
+            checkpointer = await stack.enter_async_context(sqlite_checkpointer(checkpoint_db))
+            graph = build_agent(checkpointer=checkpointer)
+
+        with open(output_path, "a", encoding="utf-8") as output:
+
+            async def process(job: dict):
+                async with semaphore:
+                    result = await run_job(graph, job, checkpointed=checkpoint_db is not None)
+                ## Write each result as soon as its job finishes
+                async with write_lock:
+                    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    output.flush()
+                counts[result["status"]] += 1
+                console.print(
+                    f"[green]✓ {job['id']}[/green] {result['status']} "
+                    f"in {result['timings']['duration_s']:.1f}s"
+                )
+
+            await asyncio.gather(*[process(job) for job in pending])
+
+    elapsed = time.perf_counter() - start
+    finished_jobs = sum(counts.values())
+    summary = {
+        **counts,
+        "elapsed_s": elapsed,
+        "jobs_per_hour": finished_jobs / elapsed * 3600 if elapsed > 0 else 0.0,
+    }
+    console.print(
+        f"[bold green]Finished {finished_jobs} jobs in {elapsed:.1f}s "
+        f"({summary['jobs_per_hour']:.1f} jobs/hour)[/bold green]"
+    )
+    print_scheduler_metrics()
+    print_limiter_metrics()
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run research jobs from a JSONL file.")
+    parser.add_argument("input", help="JSONL file with one {\"id\", \"question\"} job per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=default_job_concurrency, help="Maximum jobs running at once")
+    parser.add_argument("--checkpoint-db", help="SQLite database for per-job checkpoints (resume mid-job)")
+    args = parser.parse_args()
+
+    asyncio.run(run_batch(args.input, args.output, args.concurrency, args.checkpoint_db))
@@ -0,0 +1,317 @@
+## Research Brief Evaluation
+## Runs the scoping workflow over a local dataset of conversations and grades the briefs with
+## the BRIEF_CRITERIA_PROMPT and BRIEF_HALLUCINATION_PROMPT judges, in parallel and cached
+
+"""Parallel, Cached Evaluation of Research Briefs.
+
+Dataset: a JSONL file with one example per line, e.g.
+    {"id": "toronto_apartment",
+     "messages": [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}, ...],
+     "criteria": ["Monthly rent below 4k", ...]}
+brief_eval_dataset.jsonl holds the two conversations from agent_scope.ipynb.
+
+For every example the runner:
+1. Runs scope_research on the conversation to produce a research brief
+2. Asks the criteria judge (BRIEF_CRITERIA_PROMPT) once per success criterion
+3. Asks the hallucination judge (BRIEF_HALLUCINATION_PROMPT) once per brief
+
+All examples and judge calls run concurrently, bounded by max_parallel_calls.
+Briefs and verdicts are cached in SQLite, keyed by a hash of everything that
+determines them (conversation, scoping prompts and model for briefs; formatted
+judge prompt and judge model for verdicts), so re-running an unchanged dataset is
+served from the cache and only changed examples or prompts are re-evaluated.
+
+Output: per-criterion verdicts, pass rates per example and overall, and timings.
+
+Usage:
+    python brief_evaluation.py brief_eval_dataset.jsonl --parallel 4 --output results.json
+    python brief_evaluation.py brief_eval_dataset.jsonl --no-cache
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, get_buffer_string
+from rich.console import Console
+from rich.table import Table
+
+from deep_research_prompts.prompts import (
+    BRIEF_CRITERIA_PROMPT,
+    BRIEF_HALLUCINATION_PROMPT,
+    clarify_with_user_instructions,
+    scope_in_one_pass_prompt,
+    transform_messages_into_research_topic_prompt,
+)
+from model_scheduler import init_scheduled_model
+from state_scope import Criteria, NoAssumptions
+from structured_output import with_schema_output
+
+console = Console()
+
+## CONFIGURATION
+
+## Judge model (temperature 0 so cached verdicts match what a re-run would produce)
+judge_model_name = "ollama:llama3.1:8b"
+judge_model = init_scheduled_model(model=judge_model_name, priority="bulk", temperature=0)
+
+## Scoping runs and judge calls in flight at once
+max_parallel_calls = 4
+
+## Default location of the verdict cache
+default_cache_db = "brief_eval_cache.db"
+
+## VERDICT CACHE
+
+class EvaluationCache:
+    """SQLite key-value cache for generated briefs and judge verdicts."""
+
+    def __init__(self, db_path: str = default_cache_db):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind: str, *parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in (kind, *parts):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return f"{kind}:{digest.hexdigest()}"
+
+    def get(self, key: str):
+        row = self.conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        self.conn.execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+class _NoCache:
+    """Stand-in for EvaluationCache when caching is disabled."""
+
+    hits = misses = 0
+
+    def make_key(self, kind: str, *parts: str) -> str:
+        return kind
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value):
+        pass
+
+    def close(self):
+        pass
+
+## DATASET
+
+def load_dataset(path: str) -> list[dict]:
+    """Load evaluation examples from a JSONL file."""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            example = json.loads(line)
+            example.setdefault("id", str(line_number))
+            examples.append(example)
+    return examples
+
+def to_messages(messages: list[dict]) -> list:
+    """Convert {"role", "content"} dicts into LangChain messages."""
+    return [
+        AIMessage(content=m["content"]) if m["role"] in ("assistant", "ai") else HumanMessage(content=m["content"])
+        for m in messages
+    ]
+
+## EVALUATION
+
+class BriefEvaluator:
+    """Runs scoping and both judges over a dataset with bounded parallelism and caching."""
+
+    def __init__(self, cache, max_parallel: int = max_parallel_calls):
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(max_parallel)
+        self.scope_seconds = 0.0
+        self.judge_seconds = 0.0
+
+    async def generate_brief(self, messages: list) -> str:
+        """Run scope_research on a conversation and return its brief (empty if it asked to clarify)."""
+        import research_agent_scope
+
+        key = self.cache.make_key(
+            "brief",
+            get_buffer_string(messages),
+            research_agent_scope.scoping_mode,
+            research_agent_scope.model.model_name,
+            clarify_with_user_instructions,
+            transform_messages_into_research_topic_prompt,
+            scope_in_one_pass_prompt,
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async with self.semaphore:
+            start = time.perf_counter()
+            result = await research_agent_scope.scope_research.ainvoke({"messages": messages})
+            self.scope_seconds += time.perf_counter() - start
+        brief = result.get("research_brief") or ""
+        self.cache.set(key, brief)
+        return brief
+
+    async def judge(self, schema, prompt: str) -> dict:
+        """Ask the judge model for a structured verdict, served from the cache when possible."""
+        key = self.cache.make_key("verdict", schema.__name__, judge_model_name, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async with self.semaphore:
+            start = time.perf_counter()
+            response = await with_schema_output(judge_model, schema).ainvoke([HumanMessage(content=prompt)])
+            self.judge_seconds += time.perf_counter() - start
+        verdict = response.model_dump()
+        self.cache.set(key, verdict)
+        return verdict
+
+    async def evaluate_example(self, example: dict) -> dict:
+        """Generate the brief for one example and run every judge call on it concurrently."""
+        brief = await self.generate_brief(to_messages(example["messages"]))
+        criteria = example["criteria"]
+
+        if not brief:
+            ## Scoping asked a clarifying question: nothing to grade, every check fails
+            return {
+                "id": example["id"],
+                "research_brief": "",
+                "criteria": [{"criterion": c, "is_captured": False, "reasoning": "no research brief"} for c in criteria],
+                "no_assumptions": False,
+                "no_assumptions_reasoning": "no research brief",
+            }
+
+        criteria_verdicts, assumptions_verdict = await asyncio.gather(
+            asyncio.gather(*[
+                self.judge(Criteria, BRIEF_CRITERIA_PROMPT.format(research_brief=brief, criterion=criterion))
+                for criterion in criteria
+            ]),
+            self.judge(NoAssumptions, BRIEF_HALLUCINATION_PROMPT.format(
+                research_brief=brief, success_criteria=str(criteria)
+            )),
+        )
+        return {
+            "id": example["id"],
+            "research_brief": brief,
+            "criteria": [
+                {"criterion": criterion, "is_captured": verdict["is_captured"], "reasoning": verdict["reasoning"]}
+                for criterion, verdict in zip(criteria, criteria_verdicts)
+            ],
+            "no_assumptions": assumptions_verdict["no_assumptions"],
+            "no_assumptions_reasoning": assumptions_verdict["reasoning"],
+        }
+
+def summarize_results(results: list[dict]) -> dict:
+    """Compute pass rates per example and over the whole dataset."""
+    per_example = {}
+    captured = total = 0
+    for result in results:
+        hits = sum(c["is_captured"] for c in result["criteria"])
+        per_example[result["id"]] = hits / len(result["criteria"]) if result["criteria"] else 0.0
+        captured += hits
+        total += len(result["criteria"])
+    return {
+        "criteria_pass_rate": captured / total if total else 0.0,
+        "no_assumptions_pass_rate": sum(r["no_assumptions"] for r in results) / len(results) if results else 0.0,
+        "per_example_criteria_pass_rate": per_example,
+    }
+
+async def run_evaluation(
+    dataset_path: str,
+    max_parallel: int = max_parallel_calls,
+    cache_db: str = default_cache_db,
+    use_cache: bool = True,
+) -> dict:
+    """Evaluate every example of a dataset.
+
+    Args:
+        dataset_path: JSONL dataset of conversations and success criteria
+        max_parallel: Scoping runs and judge calls in flight at once
+        cache_db: SQLite file caching briefs and verdicts
+        use_cache: Set to False to ignore and bypass the cache
+
+    Returns:
+        Dict with per-example results, pass rates and timings
+    """
+    cache = EvaluationCache(cache_db) if use_cache else _NoCache()
+    evaluator = BriefEvaluator(cache, max_parallel)
+    examples = load_dataset(dataset_path)
+
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*[evaluator.evaluate_example(example) for example in examples])
+    finally:
+        cache.close()
+
+    return {
+        "results": results,
+        "summary": summarize_results(results),
+        "timings": {
+            "total_s": time.perf_counter() - start,
+            "scope_call_s": evaluator.scope_seconds,
+            "judge_call_s": evaluator.judge_seconds,
+            "cache_hits": cache.hits,
+            "cache_misses": cache.misses,
+        },
+    }
+
+def print_evaluation(evaluation: dict):
+    """Display per-criterion verdicts, pass rates and timings."""
+    table = Table(title="Research Brief Evaluation", show_header=True, header_style="bold magenta")
+    table.add_column("Example", style="cyan")
+    table.add_column("Criterion", style="white")
+    table.add_column("Captured", justify="center")
+    for result in evaluation["results"]:
+        for verdict in result["criteria"]:
+            table.add_row(result["id"], verdict["criterion"], "[green]✓[/green]" if verdict["is_captured"] else "[red]✗[/red]")
+        table.add_row(result["id"], "No unwarranted assumptions", "[green]✓[/green]" if result["no_assumptions"] else "[red]✗[/red]")
+    console.print(table)
+
+    summary, timings = evaluation["summary"], evaluation["timings"]
+    for example_id, rate in summary["per_example_criteria_pass_rate"].items():
+        console.print(f"[cyan]{example_id}[/cyan]: criteria pass rate {rate:.0%}")
+    console.print(
+        f"[bold green]Criteria pass rate {summary['criteria_pass_rate']:.0%}, "
+        f"no-assumptions pass rate {summary['no_assumptions_pass_rate']:.0%}[/bold green]"
+    )
+    console.print(
+        f"[bold blue]{timings['total_s']:.1f}s total "
+        f"(scoping {timings['scope_call_s']:.1f}s, judges {timings['judge_call_s']:.1f}s of call time), "
+        f"cache {timings['cache_hits']} hits / {timings['cache_misses']} misses[/bold blue]"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate research briefs with the criteria and hallucination judges.")
+    parser.add_argument("dataset", nargs="?", default="brief_eval_dataset.jsonl", help="JSONL dataset of conversations and criteria")
+    parser.add_argument("--parallel", type=int, default=max_parallel_calls, help="Scoping runs and judge calls in flight at once")
+    parser.add_argument("--cache-db", default=default_cache_db, help="SQLite file caching briefs and verdicts")
+    parser.add_argument("--no-cache", action="store_true", help="Re-run every scoping and judge call")
+    parser.add_argument("--output", help="Write the full evaluation as JSON to this file")
+    args = parser.parse_args()
+
+    evaluation = asyncio.run(run_evaluation(args.dataset, args.parallel, args.cache_db, not args.no_cache))
+    print_evaluation(evaluation)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(evaluation, f, indent=2, ensure_ascii=False)
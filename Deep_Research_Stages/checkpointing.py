@@ -0,0 +1,226 @@
+## Checkpointing Utilities
+## Durable local checkpoints for the full research workflow so a crash or an Ollama restart
+## late in a run does not throw away the researchers that already finished
+
+"""Checkpointed Research Runs with Resume.
+
+This module adds durable local checkpointing to the research workflow:
+- A SQLite checkpointer (langgraph-checkpoint-sqlite) for the top-level agent
+- Resume from the last completed node of an interrupted thread, with the source
+  registry of the interrupted run rebuilt from its checkpoints
+- Instrumentation of checkpoint writes (time per step and serialized state size)
+
+The supervisor and researcher subgraphs inherit the checkpointer of the top-level
+agent. Researchers launched in parallel by supervisor_tools are checkpointed per
+call, so on resume LangGraph replays the results of researchers that already
+finished and only re-runs the ones that had not completed.
+
+Usage:
+    python checkpointing.py --thread-id coffee-run "Best coffee shops in Toronto?"
+    python checkpointing.py --thread-id coffee-run        # resume after a crash
+"""
+
+import argparse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from rich.console import Console
+from rich.table import Table
+
+from source_registry import SourceRegistry, with_source_registry
+
+console = Console()
+
+## Default location of the local checkpoint database
+default_checkpoint_db = "research_checkpoints.db"
+
+## CHECKPOINT INSTRUMENTATION
+
+class CheckpointStats:
+    """Collects checkpoint write overhead and serialized state size per step."""
+
+    def __init__(self):
+        self.put_seconds = []
+        self.state_bytes = []
+        self.writes_seconds = []
+
+    def record_put(self, seconds: float, size: int):
+        self.put_seconds.append(seconds)
+        self.state_bytes.append(size)
+
+    def record_writes(self, seconds: float):
+        self.writes_seconds.append(seconds)
+
+    def summary(self) -> dict:
+        """Return aggregate checkpoint statistics for the run."""
+        steps = len(self.put_seconds)
+        total_put = sum(self.put_seconds)
+        return {
+            "steps": steps,
+            "total_put_ms": total_put * 1000,
+            "mean_put_ms": (total_put / steps * 1000) if steps else 0.0,
+            "max_put_ms": max(self.put_seconds, default=0.0) * 1000,
+            "total_writes_ms": sum(self.writes_seconds) * 1000,
+            "last_state_kb": (self.state_bytes[-1] / 1024) if steps else 0.0,
+            "max_state_kb": max(self.state_bytes, default=0) / 1024,
+        }
+
+    def print_summary(self):
+        """Display the checkpoint statistics as a table."""
+        table = Table(title="Checkpoint Overhead", show_header=True, header_style="bold magenta")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="white", justify="right")
+        for name, value in self.summary().items():
+            table.add_row(name, f"{value:.2f}" if isinstance(value, float) else str(value))
+        console.print(table)
+
+def instrument_checkpointer(checkpointer, stats: CheckpointStats = None) -> CheckpointStats:
+    """Wrap a checkpointer's async write methods to record timing and state size.
+
+    Args:
+        checkpointer: Any LangGraph checkpoint saver
+        stats: Optional CheckpointStats to record into
+
+    Returns:
+        CheckpointStats collecting measurements for this checkpointer
+    """
+    stats = stats or CheckpointStats()
+    aput, aput_writes = checkpointer.aput, checkpointer.aput_writes
+
+    async def timed_aput(config, checkpoint, metadata, new_versions):
+        start = time.perf_counter()
+        result = await aput(config, checkpoint, metadata, new_versions)
+        elapsed = time.perf_counter() - start
+        ## Serialized size of the full checkpoint (measured outside the timed section)
+        _, payload = checkpointer.serde.dumps_typed(checkpoint)
+        stats.record_put(elapsed, len(payload))
+        return result
+
+    async def timed_aput_writes(config, writes, task_id, task_path=""):
+        start = time.perf_counter()
+        result = await aput_writes(config, writes, task_id, task_path)
+        stats.record_writes(time.perf_counter() - start)
+        return result
+
+    checkpointer.aput = timed_aput
+    checkpointer.aput_writes = timed_aput_writes
+    return stats
+
+## SQLITE CHECKPOINTER
+
+@asynccontextmanager
+async def sqlite_checkpointer(db_path: str = default_checkpoint_db):
+    """Open a durable SQLite checkpointer for the duration of a run.
+
+    Requires the optional langgraph-checkpoint-sqlite package.
+    """
+    try:
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    except ImportError as e:
+        raise ImportError(
+            "SQLite checkpointing requires langgraph-checkpoint-sqlite: "
+            "pip install langgraph-checkpoint-sqlite"
+        ) from e
+
+    async with AsyncSqliteSaver.from_conn_string(db_path) as checkpointer:
+        yield checkpointer
+
+## RUN AND RESUME
+
+def _checkpointed_texts(value):
+    """Yield every string held in a checkpointed channel value or pending write."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, BaseMessage):
+        yield from _checkpointed_texts(value.content)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _checkpointed_texts(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _checkpointed_texts(item)
+
+async def restore_source_registry(checkpointer, thread_id: str) -> SourceRegistry:
+    """Rebuild the source registry of an interrupted run from its checkpoints.
+
+    Notes checkpointed before the interruption cite sources by the IDs the
+    interrupted run assigned (e.g. [S12]). The search results that introduced
+    those IDs are in the checkpointed researcher messages of every namespace of
+    the thread, so scanning them restores the same ID to URL table.
+
+    Args:
+        checkpointer: Checkpointer the thread was run with
+        thread_id: Thread of the interrupted run
+
+    Returns:
+        SourceRegistry holding the sources of the interrupted run
+    """
+    registry = SourceRegistry()
+    ## No checkpoint_ns: the researcher subgraphs' checkpoints are included
+    async for checkpoint in checkpointer.alist({"configurable": {"thread_id": thread_id}}):
+        for text in _checkpointed_texts(checkpoint.checkpoint["channel_values"]):
+            registry.restore_from_text(text)
+        for _, _, value in checkpoint.pending_writes or ():
+            for text in _checkpointed_texts(value):
+                registry.restore_from_text(text)
+    return registry
+
+async def run_or_resume(graph, input_state: dict, thread_id: str, durability: str = "sync", **kwargs):
+    """Run a checkpointed graph, resuming the thread if it was interrupted.
+
+    If the thread has a checkpoint with pending nodes, the run resumes from the
+    last completed node and input_state is ignored; its source registry is rebuilt
+    from the checkpoints so the source IDs in finished notes still resolve.
+    Otherwise a new run starts with a fresh registry.
+
+    Args:
+        graph: Graph compiled with a checkpointer
+        input_state: Input for a fresh run
+        thread_id: Thread identifier used to store and find checkpoints
+        durability: "sync" persists each step before the next one starts, which
+            is what makes resuming after a crash reliable; "async" trades that for
+            lower overhead
+        **kwargs: Extra keyword arguments for graph.ainvoke
+
+    Returns:
+        Final graph state
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = await graph.aget_state(config)
+
+    if snapshot.next:
+        registry = await restore_source_registry(graph.checkpointer, thread_id)
+        console.print(f"[yellow]Resuming thread {thread_id} at {', '.join(snapshot.next)} ({len(registry)} sources restored)[/yellow]")
+        config = with_source_registry(config, registry)
+        return await graph.ainvoke(None, config, durability=durability, **kwargs)
+
+    ## A fresh run numbers its own sources
+    config = with_source_registry(config)
+    return await graph.ainvoke(input_state, config, durability=durability, **kwargs)
+
+async def run_checkpointed_research(question: str, thread_id: str, db_path: str = default_checkpoint_db):
+    """Run (or resume) the full research agent with SQLite checkpoints."""
+    from complete_research_agent import build_agent
+
+    async with sqlite_checkpointer(db_path) as checkpointer:
+        stats = instrument_checkpointer(checkpointer)
+        graph = build_agent(checkpointer=checkpointer)
+
+        start = time.perf_counter()
+        input_state = {"messages": [HumanMessage(content=question)]} if question else None
+        result = await run_or_resume(graph, input_state, thread_id)
+        console.print(f"[green]✓ Run finished in {time.perf_counter() - start:.1f}s[/green]")
+        stats.print_summary()
+        return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the deep research agent with durable checkpoints.")
+    parser.add_argument("question", nargs="?", default="", help="Research request (omit to resume)")
+    parser.add_argument("--thread-id", required=True, help="Thread ID used to store and resume the run")
+    parser.add_argument("--db", default=default_checkpoint_db, help="SQLite checkpoint database path")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_checkpointed_research(args.question, args.thread_id, args.db))
+    console.print(result.get("final_report") or result["messages"][-1].content)
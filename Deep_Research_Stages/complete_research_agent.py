@@ -14,19 +14,267 @@ The system orchestrates the complete research workflow from initial user
 input through final report delivery.
 """
 
+import asyncio
+import collections
+import re
+import sys
+
 from langchain_core.messages import HumanMessage
+from langgraph.config import get_config, get_stream_writer
 from langgraph.graph import StateGraph, START, END
 
 from research_stage_prompt.prompts import get_today_str
-from deep_research_prompts.prompts import final_report_generation_prompt
-from state_scope import AgentState, AgentInputState
+from deep_research_prompts.prompts import (
+    final_report_generation_prompt,
+    final_report_generation_with_sources_prompt,
+    partial_report_synthesis_prompt,
+    report_outline_prompt,
+    report_section_prompt,
+)
+from source_registry import (
+    current_source_registry,
+    with_source_registry,
+    format_source_table,
+    finalize_citations,
+    strip_sources_section,
+    CitationRenumberer,
+)
+from state_scope import AgentState, AgentInputState, ReportOutline, ReportSection
 from research_agent_scope import clarify_with_user, write_research_brief
-from supervisor_multi_agent import supervisor_agent
+from supervisor_multi_agent import supervisor_agent, estimate_tokens
 
 ## Model Configuration
 
-from langchain.chat_models import init_chat_model
-writer_model = init_chat_model(model="ollama:granite3.3:8b", max_tokens=32000)
+from model_scheduler import init_scheduled_model, print_scheduler_metrics
+from adaptive_concurrency import print_limiter_metrics
+from structured_output import with_schema_output
+writer_model = init_scheduled_model(model="ollama:granite3.3:8b", priority="critical", max_tokens=32000)
+
+## Use the run's source registry to hand the writer compact notes with pre-numbered
+## citations and one deduplicated source table, instead of every raw source block
+use_source_registry = True
+
+## Stream report tokens through the graph's "custom" stream mode as they are generated
+## (events: {"report_token": str}); the complete report is still stored in final_report
+## Only runs whose config sets configurable["stream_report"] (see streaming_config) are
+## streamed: streamed citations are already delivered and keep their source table numbers,
+## so other runs (ainvoke, batch jobs, benchmarks) get sequentially renumbered citations
+stream_final_report = True
+
+## Hierarchical (map-reduce) writing: when the findings exceed this many tokens, notes are
+## grouped by topic, partial syntheses are drafted in parallel, and the final report is
+## written from the partial syntheses (None always writes from the full findings)
+writer_findings_token_budget = 24000
+
+## Maximum number of map-reduce levels before the findings are passed on as they are
+max_synthesis_levels = 3
+
+## How the final report is written:
+## "single": one writer call over all findings
+## "outline": plan a structured outline first, then draft the sections concurrently, each
+##            with only its relevant findings, and renumber citations across sections
+report_writing_mode = "single"
+
+## Characters of each finding shown to the outline planner
+outline_finding_preview_chars = 1500
+
+## Hierarchical Findings Reduction
+
+## Common words ignored when comparing the topics of notes
+_STOPWORDS = set("""
+about above after again also among because been before being below between both could does
+doing during each from further have having here into itself just more most other over same
+should some such than that their them then there these they this those through under until
+very were what when where which while with would your research sources source findings
+""".split())
+
+def _topic_terms(note: str, top_k: int = 40) -> set:
+    """Return the most frequent content words of a note, used as its topic signature."""
+    words = [w for w in re.findall(r"[a-z]{4,}", note.lower()) if w not in _STOPWORDS]
+    return {word for word, _ in collections.Counter(words).most_common(top_k)}
+
+def group_notes_by_topic(notes: list[str], token_budget: int, min_similarity: float = 0.15) -> list[list[str]]:
+    """Group notes with related topics into groups that fit a token budget.
+
+    Each note joins the group whose topic terms overlap most with its own (Jaccard
+    similarity), provided the group stays within the budget; otherwise it starts a
+    new group. Groups keep the original order of their notes.
+
+    Args:
+        notes: Research notes to group
+        token_budget: Maximum estimated tokens per group
+        min_similarity: Minimum topic overlap needed to join an existing group
+
+    Returns:
+        List of note groups
+    """
+    groups = []
+    for note in notes:
+        terms = _topic_terms(note)
+        tokens = estimate_tokens(note)
+
+        best_group, best_similarity = None, min_similarity
+        for group in groups:
+            if group["tokens"] + tokens > token_budget:
+                continue
+            union = terms | group["terms"]
+            similarity = len(terms & group["terms"]) / len(union) if union else 0.0
+            if similarity >= best_similarity:
+                best_group, best_similarity = group, similarity
+
+        if best_group is None:
+            groups.append({"notes": [note], "terms": terms, "tokens": tokens})
+        else:
+            best_group["notes"].append(note)
+            best_group["terms"] |= terms
+            best_group["tokens"] += tokens
+
+    return [group["notes"] for group in groups]
+
+async def synthesize_note_group(notes: list[str], research_brief: str) -> str:
+    """Draft a partial synthesis of one group of related notes (map step)."""
+    prompt = partial_report_synthesis_prompt.format(
+        research_brief=research_brief,
+        findings="\n\n".join(notes),
+        date=get_today_str()
+    )
+    response = await writer_model.ainvoke([HumanMessage(content=prompt)])
+    return str(response.content)
+
+async def reduce_findings(notes: list[str], research_brief: str, token_budget: int) -> list[str]:
+    """Reduce notes with partial syntheses until they fit the writer's token budget.
+
+    Each level groups the current notes by topic and drafts one partial synthesis
+    per group in parallel. Levels repeat until the findings fit the budget, stop
+    shrinking, or max_synthesis_levels is reached.
+
+    Args:
+        notes: Research notes (citations are preserved by the syntheses)
+        research_brief: Research brief guiding the syntheses
+        token_budget: Token budget for the findings of the final writer call
+
+    Returns:
+        Notes (or partial syntheses) to write the final report from
+    """
+    for _ in range(max_synthesis_levels):
+        total_tokens = sum(estimate_tokens(note) for note in notes)
+        if total_tokens <= token_budget:
+            break
+
+        groups = group_notes_by_topic(notes, token_budget)
+        partials = await asyncio.gather(*[
+            synthesize_note_group(group, research_brief) for group in groups
+        ])
+        if sum(estimate_tokens(partial) for partial in partials) >= total_tokens:
+            break
+        notes = list(partials)
+
+    return notes
+
+## Outline-First Section Drafting
+
+async def plan_report_outline(notes: list[str], research_brief: str) -> ReportOutline:
+    """Plan a structured report outline from the research brief and previews of the findings."""
+    previews = "\n\n".join(
+        f"<Finding {i}>\n{note[:outline_finding_preview_chars]}\n</Finding {i}>"
+        for i, note in enumerate(notes, 1)
+    )
+    prompt = report_outline_prompt.format(
+        research_brief=research_brief,
+        findings=previews,
+        date=get_today_str()
+    )
+    outline_model = with_schema_output(writer_model, ReportOutline)
+    return await outline_model.ainvoke([HumanMessage(content=prompt)])
+
+def select_section_notes(section: ReportSection, notes: list[str], fallback_notes: int = 3) -> list[str]:
+    """Return the findings relevant to a section.
+
+    Uses the finding numbers chosen by the outline planner, falling back to the
+    findings whose topics overlap most with the section when none are valid.
+    """
+    finding_ids = [i for i in dict.fromkeys(section.finding_ids) if 1 <= i <= len(notes)]
+    if finding_ids:
+        return [notes[i - 1] for i in finding_ids]
+
+    terms = _topic_terms(f"{section.title} {section.description}")
+    ranked = sorted(range(len(notes)), key=lambda i: len(terms & _topic_terms(notes[i])), reverse=True)
+    return [notes[i] for i in sorted(ranked[:fallback_notes])]
+
+async def write_report_section(
+    section: ReportSection,
+    outline: ReportOutline,
+    notes: list[str],
+    source_table: list[dict],
+    research_brief: str,
+) -> str:
+    """Draft one report section from its relevant findings only."""
+    section_notes = select_section_notes(section, notes)
+    cited_numbers = set(re.findall(r"\[(\d+)\]", "\n".join(section_notes)))
+    section_sources = [source for source in source_table if str(source["number"]) in cited_numbers]
+
+    prompt = report_section_prompt.format(
+        research_brief=research_brief,
+        date=get_today_str(),
+        outline="\n".join(f"- {s.title}: {s.description}" for s in outline.sections),
+        section_title=section.title,
+        section_description=section.description,
+        findings="\n\n".join(section_notes),
+        sources=format_source_table(section_sources),
+    )
+    response = await writer_model.ainvoke([HumanMessage(content=prompt)])
+
+    text = strip_sources_section(str(response.content)).strip()
+    if not text.startswith("#"):
+        text = f"## {section.title}\n\n{text}"
+    return text
+
+async def write_report_by_sections(notes: list[str], source_table: list[dict], research_brief: str, writer) -> str:
+    """Write the report outline-first, drafting all sections concurrently.
+
+    Sections are stitched in outline order. Citations are renumbered with a single
+    global numbering in order of first use; each section is renumbered and emitted
+    as soon as it and all sections before it are finished.
+
+    Args:
+        notes: Compact research notes citing sources by source table number
+        source_table: Source table returned by SourceRegistry.compact_notes()
+        research_brief: Research brief the report answers
+        writer: Callable receiving {"report_token": str} stream events
+
+    Returns:
+        Complete report with a ### Sources section, or None if no outline was produced
+    """
+    try:
+        outline = await plan_report_outline(notes, research_brief)
+    except Exception as e:
+        ## Nothing was emitted yet, so the single writer can take over
+        print(f"Outline planning failed, writing the report in one call: {e}")
+        return None
+    if not outline.sections:
+        return None
+
+    tasks = [
+        asyncio.create_task(write_report_section(section, outline, notes, source_table, research_brief))
+        for section in outline.sections
+    ]
+    renumberer = CitationRenumberer(source_table)
+
+    report = f"# {outline.title}"
+    writer({"report_token": report})
+    try:
+        for task in tasks:
+            section = "\n\n" + renumberer.apply(await task)
+            report += section
+            writer({"report_token": section})
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    sources = renumberer.sources_section()
+    writer({"report_token": sources})
+    return report + sources
 
 ## Final Report Generation
 
@@ -40,20 +288,73 @@ async def final_report_generation(state: AgentState):
     """
     
     notes = state.get("notes", [])
+    research_brief = state.get("research_brief", "")
+
+    ## Emit report tokens as soon as they are produced, if the caller streams the report
+    writer = lambda _: None
+    streaming = False
+    if stream_final_report:
+        try:
+            if get_config().get("configurable", {}).get("stream_report"):
+                writer = get_stream_writer()
+                streaming = True
+        except RuntimeError:
+            pass
+
+    if report_writing_mode == "outline":
+        ## Sections cite pre-numbered sources so they can be renumbered across the report
+        compact_notes, source_table = current_source_registry().compact_notes(notes)
+        report = await write_report_by_sections(compact_notes, source_table, research_brief, writer)
+        if report is not None:
+            return {
+                "final_report": report,
+                "messages": ["Here is the final report: " + report],
+            }
     
-    findings = "\n".join(notes)
+    if use_source_registry:
+        ## Replace source blocks with pre-numbered citations and a single source table
+        notes, source_table = current_source_registry().compact_notes(notes)
 
-    final_report_prompt = final_report_generation_prompt.format(
-        research_brief=state.get("research_brief", ""),
-        findings=findings,
-        date=get_today_str()
-    )
+    ## Large note sets are reduced with parallel partial syntheses first
+    if writer_findings_token_budget is not None:
+        notes = await reduce_findings(notes, research_brief, writer_findings_token_budget)
     
-    final_report = await writer_model.ainvoke([HumanMessage(content=final_report_prompt)])
+    if use_source_registry:
+        final_report_prompt = final_report_generation_with_sources_prompt.format(
+            research_brief=research_brief,
+            findings="\n".join(notes),
+            sources=format_source_table(source_table),
+            date=get_today_str()
+        )
+    else:
+        findings = "\n".join(notes)
+        final_report_prompt = final_report_generation_prompt.format(
+            research_brief=research_brief,
+            findings=findings,
+            date=get_today_str()
+        )
+    
+    if streaming:
+        report = ""
+        async for chunk in writer_model.astream([HumanMessage(content=final_report_prompt)]):
+            if chunk.content:
+                report += chunk.content
+                writer({"report_token": chunk.content})
+    else:
+        final_report = await writer_model.ainvoke([HumanMessage(content=final_report_prompt)])
+        report = final_report.content
+
+    ## Renumber the cited sources sequentially and append the Sources section
+    ## Streamed citations were already delivered, so they keep their numbers
+    if use_source_registry:
+        streamed_report = report.rstrip()
+        report = finalize_citations(report, source_table, renumber=not streaming)
+        if streaming and report.startswith(streamed_report):
+            writer({"report_token": report[len(streamed_report):]})
     
     return {
-        "final_report": final_report.content, 
-        "messages": ["Here is the final report: " + final_report.content],
+        "final_report": report, 
+        "messages": ["Here is the final report: " + report],
     }
 
 ## Complete Agent workflow
@@ -72,4 +373,66 @@ deep_researcher_builder.add_edge("supervisor_subgraph", "final_report_generation
 deep_researcher_builder.add_edge("final_report_generation", END)
 
 ## Compile the agent workflow
-agent = deep_researcher_builder.compile()
\ No newline at end of file
+def build_agent(checkpointer=None):
+    """Compile the full research workflow.
+
+    Args:
+        checkpointer: Optional LangGraph checkpointer (see checkpointing.py). The
+            supervisor and researcher subgraphs inherit it, so completed researchers
+            are not re-run when an interrupted thread is resumed.
+    """
+    return deep_researcher_builder.compile(checkpointer=checkpointer)
+
+agent = build_agent()
+
+## Streaming Report Delivery
+
+def streaming_config(config: dict = None) -> dict:
+    """Return a run config (with its own source registry) that streams report tokens.
+
+    Args:
+        config: Run config to extend (e.g. {"configurable": {"thread_id": ...}})
+    """
+    config = with_source_registry(config)
+    config["configurable"]["stream_report"] = True
+    return config
+
+async def stream_research_report(question: str, graph=None):
+    """Run the full research workflow and yield final report tokens as they are generated.
+
+    If the scoping phase asks a clarifying question instead, that question is yielded.
+
+    Args:
+        question: Research request from the user
+        graph: Compiled workflow to run (defaults to the module-level agent)
+    """
+    graph = graph or agent
+    streamed = False
+    final_state = {}
+
+    async for mode, chunk in graph.astream(
+        {"messages": [HumanMessage(content=question)]},
+        config=streaming_config(),
+        stream_mode=["custom", "values"],
+    ):
+        if mode == "custom" and "report_token" in chunk:
+            streamed = True
+            yield chunk["report_token"]
+        elif mode == "values":
+            final_state = chunk
+
+    ## Non-streaming writer or clarification question: yield the final message instead
+    if not streamed and final_state.get("messages"):
+        yield final_state.get("final_report") or final_state["messages"][-1].content
+
+async def print_research_report(question: str):
+    """Simple CLI consumer printing the report to stdout as it streams."""
+    async for token in stream_research_report(question):
+        sys.stdout.write(token)
+        sys.stdout.flush()
+    sys.stdout.write("\n")
+    print_scheduler_metrics()
+    print_limiter_metrics()
+
+if __name__ == "__main__":
+    asyncio.run(print_research_report(" ".join(sys.argv[1:]) or input("Research request: ")))
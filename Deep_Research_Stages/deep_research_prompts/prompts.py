@@ -9,15 +9,8 @@ This module contains all prompt templates used across the research workflow comp
 including user clarification, research brief generation, and report synthesis.
 """
 
-clarify_with_user_instructions="""
-These are the messages that have been exchanged so far from the user asking for the report:
-<Messages>
-{messages}
-</Messages>
-
-Today's date is {date}.
-
-RULE: Before answering, you MUST ask at least one clarifying question unless the user has already provided enough information for you to start research.
+## Shared by the clarification prompts below: when and how to ask a clarifying question
+_clarification_rules = """RULE: Before answering, you MUST ask at least one clarifying question unless the user has already provided enough information for you to start research.
 IMPORTANT: If you can see in the messages history that you have already asked a clarifying question, you almost always do not need to ask another one. Only ask another question if ABSOLUTELY NECESSARY.
 
 If there are acronyms, abbreviations, or unknown terms, ask the user to clarify.
@@ -26,42 +19,18 @@ If you need to ask a question, follow these guidelines:
 - Make sure to gather all the information needed to carry out the research task in a concise, well-structured manner.
 - Use bullet points or numbered lists if appropriate for clarity. Make sure that this uses markdown formatting and will be rendered correctly if the string output is passed to a markdown renderer.
 - Don't ask for unnecessary information, or information that the user has already provided. If you can see that the user has already provided the information, do not ask for it again.
+"""
 
-Respond in valid JSON format with these exact keys:
-"need_clarification": boolean,
-"question": "<question to ask the user to clarify the report scope>",
-"verification": "<verification message that we will start research>"
-
-If you need to ask a clarifying question, return:
-"need_clarification": true,
-"question": "<your clarifying question>",
-"verification": ""
-
-If you do not need to ask a clarifying question, return:
-"need_clarification": false,
-"question": "",
-"verification": "<acknowledgement message that you will now start research based on the provided information>"
-
-For the verification message when no clarification is needed:
+## Shared by the clarification prompts below: the verification message sent when research starts
+_verification_message_guidelines = """For the verification message when no clarification is needed:
 - Acknowledge that you have sufficient information to proceed
 - Briefly summarize the key aspects of what you understand from their request
 - Confirm that you will now begin the research process
 - Keep the message concise and professional
 """
 
-transform_messages_into_research_topic_prompt = """You will be given a set of messages that have been exchanged so far between yourself and the user. 
-Your job is to translate these messages into a more detailed and concrete research question that will be used to guide the research.
-
-The messages that have been exchanged so far between yourself and the user are:
-<Messages>
-{messages}
-</Messages>
-
-Today's date is {date}.
-
-You will return a single research question that will be used to guide the research.
-
-Guidelines:
+## Shared by the research brief prompts below: how to turn the messages into a research question
+_research_brief_guidelines = """Guidelines:
 1. Maximize Specificity and Detail
 - Include all known user preferences and explicitly list key attributes or dimensions to consider.
 - It is important that all details from the user are included in the instructions.
@@ -92,6 +61,70 @@ Guidelines:
 - If the query is in a specific language, prioritize sources published in that language.
 """
 
+clarify_with_user_instructions="""
+These are the messages that have been exchanged so far from the user asking for the report:
+<Messages>
+{messages}
+</Messages>
+
+Today's date is {date}.
+
+""" + _clarification_rules + """
+Respond in valid JSON format with these exact keys:
+"need_clarification": boolean,
+"question": "<question to ask the user to clarify the report scope>",
+"verification": "<verification message that we will start research>"
+
+If you need to ask a clarifying question, return:
+"need_clarification": true,
+"question": "<your clarifying question>",
+"verification": ""
+
+If you do not need to ask a clarifying question, return:
+"need_clarification": false,
+"question": "",
+"verification": "<acknowledgement message that you will now start research based on the provided information>"
+
+""" + _verification_message_guidelines
+
+transform_messages_into_research_topic_prompt = """You will be given a set of messages that have been exchanged so far between yourself and the user. 
+Your job is to translate these messages into a more detailed and concrete research question that will be used to guide the research.
+
+The messages that have been exchanged so far between yourself and the user are:
+<Messages>
+{messages}
+</Messages>
+
+Today's date is {date}.
+
+You will return a single research question that will be used to guide the research.
+
+""" + _research_brief_guidelines
+
+## Clarification and research brief in one call (scoping_mode = "combined")
+scope_in_one_pass_prompt = """These are the messages that have been exchanged so far from the user asking for the report:
+<Messages>
+{messages}
+</Messages>
+
+Today's date is {date}.
+
+You have two tasks. First decide whether you need to ask the user a clarifying question. If you do not, also translate the messages into a detailed and concrete research brief that will be used to guide the research.
+
+<Clarification>
+""" + _clarification_rules + """
+If you need to ask a clarifying question, set need_clarification to true, put your question in question, and leave verification and research_brief empty.
+
+If you do not need to ask a clarifying question, set need_clarification to false, leave question empty, write a verification message and write the research brief.
+
+""" + _verification_message_guidelines + """</Clarification>
+
+<Research Brief>
+The research brief is a single research question that will be used to guide the research.
+
+""" + _research_brief_guidelines + """</Research Brief>
+"""
+
 research_agent_prompt =  """You are a research assistant conducting research on the user's input topic. For context, today's date is {date}.
 
 <Task>
@@ -206,7 +239,12 @@ You can use any of the tools provided to you to find and read files that help an
 </Task>
 
 <Available Tools>
-You have access to file system tools and thinking tools:
+You have access to a document search tool, file system tools and thinking tools:
+- **search_local_documents**: Search all local documents and get only the most relevant passages (use this first)
+- **retrieve_documents** (if available): Retrieve passages similar in meaning to a query from the vector store
+- **document_stats**: Get the size, line count and first lines of a document without reading it
+- **grep_document**: Find lines matching a regular expression in a document, with surrounding lines
+- **read_document_lines** / **read_document_bytes**: Read only a range of a large document
 - **list_allowed_directories**: See what directories you can access
 - **list_directory**: List files in directories
 - **read_file**: Read individual files
@@ -222,8 +260,8 @@ Think like a human researcher with access to a document library. Follow these st
 
 1. **Read the question carefully** - What specific information does the user need?
 2. **Explore available files** - Use list_allowed_directories and list_directory to understand what's available
-3. **Identify relevant files** - Use search_files if needed to find documents matching the topic
-4. **Read strategically** - Start with most relevant files, use read_multiple_files for efficiency
+3. **Search before reading** - Use search_local_documents to get the passages relevant to the topic
+4. **Read strategically** - Only read whole files when the passages are not enough, use read_multiple_files for efficiency; for large files use document_stats, grep_document and ranged reads instead of read_file
 5. **After reading, pause and assess** - Do I have enough to answer? What's still missing?
 6. **Stop when you can answer confidently** - Don't keep reading for perfection
 </Instructions>
@@ -370,7 +408,8 @@ CRITICAL REQUIREMENTS:
 
 The cleaned findings will be used for final report generation, so comprehensiveness is critical."""
 
-final_report_generation_prompt = """Based on all the research conducted, create a comprehensive, well-structured answer to the overall research brief:
+## Shared by the final report prompts below: the brief, language rules and date
+_final_report_header = """Based on all the research conducted, create a comprehensive, well-structured answer to the overall research brief:
 <Research Brief>
 {research_brief}
 </Research Brief>
@@ -381,19 +420,10 @@ This is critical. The user will only understand the answer if it is written in t
 
 Today's date is {date}.
 
-Here are the findings from the research that you conducted:
-<Findings>
-{findings}
-</Findings>
-
-Please create a detailed answer to the overall research brief that:
-1. Is well-organized with proper headings (# for title, ## for sections, ### for subsections)
-2. Includes specific facts and insights from the research
-3. References relevant sources using [Title](URL) format
-4. Provides a balanced, thorough analysis. Be as comprehensive as possible, and include all information that is relevant to the overall research question. People are using you for deep research and will expect detailed, comprehensive answers.
-5. Includes a "Sources" section at the end with all referenced links
+"""
 
-You can structure your report in a number of different ways. Here are some examples:
+## Shared by the final report prompts below: report structure and style guidelines
+_final_report_structure_guidelines = """You can structure your report in a number of different ways. Here are some examples:
 
 To answer a question that asks you to compare two things, you might structure your report like this:
 1/ intro
@@ -436,7 +466,21 @@ Make sure the final answer report is in the SAME language as the human messages
 
 Format the report in clear markdown with proper structure and include source references where appropriate.
 
-<Citation Rules>
+"""
+
+final_report_generation_prompt = _final_report_header + """Here are the findings from the research that you conducted:
+<Findings>
+{findings}
+</Findings>
+
+Please create a detailed answer to the overall research brief that:
+1. Is well-organized with proper headings (# for title, ## for sections, ### for subsections)
+2. Includes specific facts and insights from the research
+3. References relevant sources using [Title](URL) format
+4. Provides a balanced, thorough analysis. Be as comprehensive as possible, and include all information that is relevant to the overall research question. People are using you for deep research and will expect detailed, comprehensive answers.
+5. Includes a "Sources" section at the end with all referenced links
+
+""" + _final_report_structure_guidelines + """<Citation Rules>
 - Assign each unique URL a single citation number in your text
 - End with ### Sources that lists each source with corresponding numbers
 - IMPORTANT: Number sources sequentially without gaps (1,2,3,4...) in the final list regardless of which sources you choose
@@ -448,6 +492,115 @@ Format the report in clear markdown with proper structure and include source ref
 </Citation Rules>
 """
 
+## Variant for findings that cite sources by number, with the deduplicated source table
+final_report_generation_with_sources_prompt = _final_report_header + """Here are the findings from the research that you conducted. Sources are already cited in the findings by number:
+<Findings>
+{findings}
+</Findings>
+
+Here is the deduplicated table of all sources cited in the findings:
+<Sources>
+{sources}
+</Sources>
+
+Please create a detailed answer to the overall research brief that:
+1. Is well-organized with proper headings (# for title, ## for sections, ### for subsections)
+2. Includes specific facts and insights from the research
+3. References relevant sources using their citation numbers from the source table, e.g. [3]
+4. Provides a balanced, thorough analysis. Be as comprehensive as possible, and include all information that is relevant to the overall research question. People are using you for deep research and will expect detailed, comprehensive answers.
+5. Does NOT include a "Sources" section - the source list is appended automatically
+
+""" + _final_report_structure_guidelines + """<Citation Rules>
+- Sources are pre-numbered: cite each source with the number it has in the source table, e.g. [3]
+- Do NOT renumber sources, invent new numbers, or write URLs in the text
+- Do NOT write a ### Sources section - it is generated from your citations and renumbered sequentially
+- Citations are extremely important. Make sure to include these, and pay a lot of attention to getting these right. Users will often use these citations to look into more information.
+</Citation Rules>
+"""
+
+partial_report_synthesis_prompt = """You are helping write a comprehensive research report for the following research brief:
+<Research Brief>
+{research_brief}
+</Research Brief>
+
+Today's date is {date}.
+
+The research findings are too large to write the report in one pass, so they have been split into groups of related findings. Here is one group:
+<Findings>
+{findings}
+</Findings>
+
+Write a partial synthesis of this group of findings that will later be merged with the syntheses of the other groups into the final report:
+1. Organize the findings by theme using ## headings, merging duplicate statements from different findings
+2. Preserve ALL facts, names, numbers and specific findings that are relevant to the research brief - do not drop details
+3. Keep every citation exactly as it appears in the findings (e.g. [3] or [Title](URL)). Do NOT renumber, merge or invent citations
+4. Be as concise as possible without losing information - remove repetition, not substance
+5. Do not write an introduction, conclusion or Sources section, and do not refer to yourself
+
+Write the partial synthesis in the same language as the findings."""
+
+report_outline_prompt = """Based on all the research conducted, plan the structure of a comprehensive, well-structured answer to the overall research brief:
+<Research Brief>
+{research_brief}
+</Research Brief>
+
+Today's date is {date}.
+
+Here are previews of the numbered findings from the research that you conducted:
+<Findings>
+{findings}
+</Findings>
+
+Create an outline for the report:
+1. Give the report a title
+2. Choose the sections the report needs to answer the research brief. Sections will be written independently, so each section must cover a distinct part of the answer without overlapping other sections
+3. For each section, describe in one or two sentences what it should cover
+4. For each section, list the numbers of ALL findings that contain information relevant to it. A finding may be relevant to several sections
+
+Structure the report to fit the question:
+- To compare two things: intro, overview of A, overview of B, comparison, conclusion
+- To return a list of things: a single section with the list, or one section per item (no intro or conclusion needed)
+- To summarize a topic or give an overview: overview, one section per concept, conclusion
+- If a single section answers the question, use a single section
+
+Do not include a Sources section - sources are listed automatically.
+"""
+
+report_section_prompt = """You are writing one section of a comprehensive research report that answers the overall research brief:
+<Research Brief>
+{research_brief}
+</Research Brief>
+
+CRITICAL: Write the section in the same language as the research brief.
+
+Today's date is {date}.
+
+Here is the outline of the full report, so you know what the other sections cover:
+<Outline>
+{outline}
+</Outline>
+
+You are writing the section "{section_title}", which should cover: {section_description}
+
+Here are the findings relevant to this section. Sources are already cited in the findings by number:
+<Findings>
+{findings}
+</Findings>
+
+Here are the sources cited in these findings:
+<Sources>
+{sources}
+</Sources>
+
+Write the section:
+- Start with the heading "## {section_title}" and use ### for subsections if needed
+- Include specific facts and insights from the findings, as long as necessary to deeply answer this part of the question
+- Stay within the scope of this section - do not repeat what other sections of the outline cover
+- Use simple, clear language and write in paragraph form by default, with bullet points where appropriate
+- Cite sources with their numbers from the source table, e.g. [3]. Do NOT renumber sources or write URLs
+- Do NOT write an introduction to the whole report, a Sources section, or any self-referential commentary
+"""
+
 BRIEF_CRITERIA_PROMPT = """
 <role>
 You are an expert research brief evaluator specializing in assessing whether generated research briefs accurately capture user-specified criteria without loss of important details.
@@ -0,0 +1,190 @@
+## Embedding Cache
+## Content-hash cache for embeddings with batched, concurrent embedding of cache misses, so an
+## unchanged corpus is never embedded twice and cold indexing is bounded by model throughput
+
+"""Content-Hash Embedding Cache with Batched Embedding Calls.
+
+Every start of the RAG notebooks (and every rebuild of a vector store) embeds each
+chunk again, even when no document changed. CachedEmbeddings wraps any LangChain
+Embeddings model:
+- Each text is keyed by the SHA-256 of the model namespace and the text, so
+  identical chunks are embedded once, within a call and across runs
+- Document vectors are persisted as float32 blobs in SQLite, looked up in bulk;
+  query vectors are one-off, so they are only kept in a bounded in-memory LRU
+- Only cache misses go to the model, split into batches of embedding_batch_size and
+  sent with up to max_concurrent_embedding_batches batches in flight (threads for
+  embed_documents, asyncio tasks for aembed_documents)
+
+Re-indexing an unchanged corpus is then a few SQLite reads, and cold indexing runs
+at the throughput of the embedding server instead of one round trip after another.
+
+DiskVectorStore keeps its default cache in the store directory, next to the
+vectors it produced.
+
+Usage:
+    embeddings = CachedEmbeddings(init_embeddings("ollama:nomic-embed-text"), "./vector_store/embedding_cache.db")
+    store = DiskVectorStore("./vector_store", embedding=embeddings)
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+## CONFIGURATION
+
+## Default location of the embedding cache
+default_embedding_cache_db = os.path.abspath("./embedding_cache.db")
+## Texts per embedding request
+embedding_batch_size = 64
+## Embedding requests in flight at once
+max_concurrent_embedding_batches = 4
+## Query embeddings kept in memory (queries are not persisted)
+max_cached_queries = 256
+## Keys per SQLite lookup (below SQLite's bound-parameter limit)
+_LOOKUP_CHUNK = 500
+
+def model_namespace(embeddings: Embeddings) -> str:
+    """Name identifying the model that produced the vectors (part of every cache key)."""
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+    return f"{type(embeddings).__name__}:{model}" if model else type(embeddings).__name__
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches vectors by content hash and batches cache misses."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        db_path: str = default_embedding_cache_db,
+        namespace: str = None,
+        batch_size: int = embedding_batch_size,
+        max_concurrency: int = max_concurrent_embedding_batches,
+    ):
+        """Wrap an embeddings model.
+
+        Args:
+            embeddings: Underlying LangChain Embeddings model
+            db_path: SQLite file holding cached vectors
+            namespace: Cache namespace (defaults to the model's class and name, so
+                different models never share vectors)
+            batch_size: Texts per embedding request
+            max_concurrency: Embedding requests in flight at once
+        """
+        self.embeddings = embeddings
+        self.namespace = namespace or model_namespace(embeddings)
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._queries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "batches": 0}
+
+    ## CACHE
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\x00{kind}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: list[str]) -> dict:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start:start + _LOOKUP_CHUNK]
+                found.update(self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+        return {key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in found.items()}
+
+    def _store(self, vectors: dict):
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()],
+            )
+            self.conn.commit()
+
+    def _plan(self, kind: str, texts: list[str]) -> tuple:
+        """Return keys per text, cached vectors and the batches of unique missing texts."""
+        keys = [self._key(kind, text) for text in texts]
+        unique = dict(zip(keys, texts))
+        cached = self._lookup(list(unique))
+        missing = [(key, text) for key, text in unique.items() if key not in cached]
+        self.stats["hits"] += sum(key in cached for key in keys)
+        self.stats["misses"] += len(missing)
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        self.stats["batches"] += len(batches)
+        return keys, cached, batches
+
+    ## EMBEDDINGS INTERFACE
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, vectors, batches = self._plan("document", texts)
+        if batches:
+            def embed_batch(batch):
+                embedded = self.embeddings.embed_documents([text for _, text in batch])
+                return {key: vector for (key, _), vector in zip(batch, embedded)}
+
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                for result in pool.map(embed_batch, batches):
+                    ## Store each batch as it completes so an interrupted run keeps its progress
+                    self._store(result)
+                    vectors.update(result)
+        return [list(vectors[key]) for key in keys]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, vectors, batches = self._plan("document", texts)
+        if batches:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def embed_batch(batch):
+                async with semaphore:
+                    embedded = await self.embeddings.aembed_documents([text for _, text in batch])
+                result = {key: vector for (key, _), vector in zip(batch, embedded)}
+                self._store(result)
+                return result
+
+            for result in await asyncio.gather(*[embed_batch(batch) for batch in batches]):
+                vectors.update(result)
+        return [list(vectors[key]) for key in keys]
+
+    def _cached_query(self, text: str):
+        with self._lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                self.stats["hits"] += 1
+                return list(vector)
+            self.stats["misses"] += 1
+            return None
+
+    def _remember_query(self, text: str, vector) -> list[float]:
+        with self._lock:
+            self._queries[text] = list(vector)
+            while len(self._queries) > max_cached_queries:
+                self._queries.popitem(last=False)
+        return list(vector)
+
+    def embed_query(self, text: str) -> list[float]:
+        cached = self._cached_query(text)
+        if cached is not None:
+            return cached
+        return self._remember_query(text, self.embeddings.embed_query(text))
+
+    async def aembed_query(self, text: str) -> list[float]:
+        cached = self._cached_query(text)
+        if cached is not None:
+            return cached
+        return self._remember_query(text, await self.embeddings.aembed_query(text))
+
+    def metrics(self) -> dict:
+        (cached,) = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return {**self.stats, "cached_vectors": cached, "cached_queries": len(self._queries)}
+
+    def close(self):
+        self.conn.close()
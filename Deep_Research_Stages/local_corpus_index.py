@@ -0,0 +1,355 @@
+## Local Corpus Index
+## Incremental chunk index over the local research files (deep_research_files) with BM25 search,
+## optional embedding re-ranking and a search tool that returns only the top passages
+
+"""Incremental Chunk Index over the Local Research Corpus.
+
+The MCP researcher used to read whole files with the filesystem server's read_file,
+so every byte of every file went into the model context, on every run.
+LocalCorpusIndex keeps a SQLite index of the corpus directory instead:
+- Files are split into overlapping chunks (RecursiveCharacterTextSplitter, as in
+  the RAG notebooks) and stored with their term frequencies
+- update() compares each file's mtime and size with the indexed values and only
+  re-chunks files that were added or changed; deleted files are dropped
+- search() scores chunks with BM25 using the postings of the query terms only,
+  so query cost follows the matches rather than the corpus size
+- With an embeddings model, chunk embeddings are stored once per chunk and the
+  BM25 candidates are re-ranked by a mix of BM25 and cosine similarity
+
+search_local_documents exposes the index as a tool that returns the top passages
+(with file and chunk position) instead of whole files, which keeps tool latency
+and prompt tokens flat as the corpus grows.
+
+Usage:
+    python local_corpus_index.py --docs ./deep_research_files "espresso roasting"
+"""
+
+import argparse
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Annotated
+
+import numpy as np
+from langchain_core.tools import InjectedToolArg, tool
+from rich.console import Console
+
+console = Console()
+
+## CONFIGURATION
+
+## Directory indexed by default (the directory served by the MCP filesystem server)
+default_corpus_path = os.path.abspath("./deep_research_files/")
+## Default location of the index database
+default_index_db = "local_corpus_index.db"
+## Characters per chunk and overlap between neighbouring chunks
+chunk_size = 1000
+chunk_overlap = 150
+## File types read as text (other files are skipped)
+indexed_suffixes = (".md", ".txt", ".rst", ".csv", ".json", ".html", ".htm", ".xml", ".log")
+## BM25 term-frequency saturation and length normalization
+bm25_k1 = 1.5
+bm25_b = 0.75
+## BM25 candidates re-ranked with embeddings, as a multiple of top_k
+rerank_candidates_factor = 4
+## Weight of cosine similarity in the hybrid score (BM25 gets the rest)
+embedding_weight = 0.5
+## Minimum seconds between two corpus scans triggered by searches
+index_refresh_seconds = 5.0
+
+## Words that carry no signal for BM25
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the their this "
+    "to was were which with what when where who how why will would can could should not no".split()
+)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens of `text` without stopwords and single characters."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+def _text_splitter():
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError as e:
+        raise ImportError(
+            "The local corpus index requires langchain-text-splitters: "
+            "pip install langchain-text-splitters"
+        ) from e
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+## INDEX
+
+class LocalCorpusIndex:
+    """SQLite-backed chunk index of a directory with incremental updates and BM25 search."""
+
+    def __init__(self, root: str = default_corpus_path, db_path: str = default_index_db, embeddings=None):
+        """Open (or create) the index of `root`.
+
+        Args:
+            root: Directory whose text files are indexed (recursively)
+            db_path: SQLite database holding chunks, postings and file signatures
+            embeddings: Optional LangChain Embeddings model used to re-rank BM25 candidates
+        """
+        self.root = os.path.abspath(root)
+        self.embeddings = embeddings
+        self._splitter = None
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        ## Tools may run in worker threads, so the connection is shared under a lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY, path TEXT NOT NULL, ord INTEGER NOT NULL,
+                text TEXT NOT NULL, length INTEGER NOT NULL, embedding BLOB
+            );
+            CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path);
+            CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, chunk_id INTEGER NOT NULL, tf INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS postings_term ON postings (term);
+            CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+            CREATE TABLE IF NOT EXISTS corpus_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1), chunks INTEGER NOT NULL, total_length INTEGER NOT NULL
+            );
+            """
+        )
+        ## BM25 needs the chunk count and average length on every search; they are kept in
+        ## one row updated with the index (counted once for indexes created without it)
+        if self.conn.execute("SELECT 1 FROM corpus_stats").fetchone() is None:
+            self.conn.execute(
+                "INSERT INTO corpus_stats (id, chunks, total_length) SELECT 1, COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+            )
+            self.conn.commit()
+
+    ## INCREMENTAL UPDATES
+
+    def _scan(self) -> dict:
+        """Return relative path -> (mtime_ns, size) for every indexable file under root."""
+        signatures = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if not name.lower().endswith(indexed_suffixes):
+                    continue
+                full_path = os.path.join(directory, name)
+                stat = os.stat(full_path)
+                signatures[os.path.relpath(full_path, self.root)] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def _update_stats(self, chunks: int, total_length: int):
+        self.conn.execute(
+            "UPDATE corpus_stats SET chunks = chunks + ?, total_length = total_length + ? WHERE id = 1",
+            (chunks, total_length),
+        )
+
+    def _remove(self, path: str):
+        chunks, total_length = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE path = ?", (path,)
+        ).fetchone()
+        self._update_stats(-chunks, -total_length)
+        self.conn.execute("DELETE FROM postings WHERE chunk_id IN (SELECT id FROM chunks WHERE path = ?)", (path,))
+        self.conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _add(self, path: str, signature: tuple):
+        if self._splitter is None:
+            self._splitter = _text_splitter()
+        with open(os.path.join(self.root, path), encoding="utf-8", errors="replace") as f:
+            chunks = self._splitter.split_text(f.read())
+
+        vectors = [None] * len(chunks)
+        if self.embeddings is not None and chunks:
+            vectors = [np.asarray(v, dtype=np.float32).tobytes() for v in self.embeddings.embed_documents(chunks)]
+
+        total_length = 0
+        for ord_, (text, vector) in enumerate(zip(chunks, vectors)):
+            terms = Counter(tokenize(text))
+            length = sum(terms.values())
+            total_length += length
+            chunk_id = self.conn.execute(
+                "INSERT INTO chunks (path, ord, text, length, embedding) VALUES (?, ?, ?, ?, ?)",
+                (path, ord_, text, length, vector),
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)",
+                [(term, chunk_id, tf) for term, tf in terms.items()],
+            )
+        self._update_stats(len(chunks), total_length)
+        self.conn.execute("INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)", (path, *signature))
+
+    def update(self) -> dict:
+        """Bring the index in line with the directory, re-chunking only changed files.
+
+        Returns:
+            Counts of added, updated, removed and unchanged files
+        """
+        with self._lock:
+            current = self._scan() if os.path.isdir(self.root) else {}
+            indexed = {path: (mtime_ns, size) for path, mtime_ns, size in self.conn.execute("SELECT * FROM files")}
+            stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+            for path in indexed.keys() - current.keys():
+                self._remove(path)
+                stats["removed"] += 1
+            for path, signature in current.items():
+                if indexed.get(path) == signature:
+                    stats["unchanged"] += 1
+                    continue
+                if path in indexed:
+                    self._remove(path)
+                self._add(path, signature)
+                stats["updated" if path in indexed else "added"] += 1
+
+            self.conn.commit()
+            self._last_refresh = time.monotonic()
+            return stats
+
+    def refresh(self, min_interval: float = index_refresh_seconds):
+        """Run update() unless the corpus was scanned less than `min_interval` seconds ago."""
+        if time.monotonic() - self._last_refresh >= min_interval:
+            self.update()
+
+    ## SEARCH
+
+    def _bm25(self, terms: list[str]) -> dict:
+        """BM25 score of every chunk containing at least one of `terms`."""
+        chunk_count, total_length = self.conn.execute("SELECT chunks, total_length FROM corpus_stats").fetchone()
+        if not chunk_count:
+            return {}
+        average_length = total_length / chunk_count or 1.0
+
+        scores = {}
+        for term in set(terms):
+            postings = self.conn.execute(
+                "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id WHERE p.term = ?",
+                (term,),
+            ).fetchall()
+            if not postings:
+                continue
+            document_frequency = len(postings)
+            idf = math.log(1 + (chunk_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            for chunk_id, tf, length in postings:
+                norm = bm25_k1 * (1 - bm25_b + bm25_b * length / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (bm25_k1 + 1) / (tf + norm)
+        return scores
+
+    def _rerank(self, query: str, candidates: list[tuple[int, float]]) -> list[tuple[int, float]]:
+        """Mix min-max normalized BM25 with cosine similarity to the query embedding."""
+        ids = [chunk_id for chunk_id, _ in candidates]
+        rows = dict(self.conn.execute(
+            f"SELECT id, embedding FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall())
+        if any(rows.get(chunk_id) is None for chunk_id in ids):
+            ## Chunks indexed before an embeddings model was configured
+            return candidates
+
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        matrix = np.stack([np.frombuffer(rows[chunk_id], dtype=np.float32) for chunk_id in ids])
+        cosine = matrix @ query_vector / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector) + 1e-12)
+
+        bm25 = np.array([score for _, score in candidates])
+        spread = bm25.max() - bm25.min()
+        bm25 = (bm25 - bm25.min()) / spread if spread else np.ones_like(bm25)
+        hybrid = (1 - embedding_weight) * bm25 + embedding_weight * cosine
+        return sorted(zip(ids, hybrid.tolist()), key=lambda item: item[1], reverse=True)
+
+    def search(self, query: str, top_k: int = 5) -> list[dict]:
+        """Return the `top_k` best matching passages.
+
+        Args:
+            query: Free-text query
+            top_k: Number of passages to return
+
+        Returns:
+            Passages with path, chunk position, chunk count, score and text, best first
+        """
+        with self._lock:
+            scores = self._bm25(tokenize(query))
+            limit = top_k * rerank_candidates_factor if self.embeddings is not None else top_k
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            if self.embeddings is not None and ranked:
+                ranked = self._rerank(query, ranked)
+            ranked = ranked[:top_k]
+
+            passages = []
+            for chunk_id, score in ranked:
+                path, ord_, text = self.conn.execute(
+                    "SELECT path, ord, text FROM chunks WHERE id = ?", (chunk_id,)
+                ).fetchone()
+                (total,) = self.conn.execute("SELECT COUNT(*) FROM chunks WHERE path = ?", (path,)).fetchone()
+                passages.append({"path": path, "chunk": ord_ + 1, "chunks": total, "score": score, "text": text})
+            return passages
+
+    def stats(self) -> dict:
+        (files,) = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()
+        chunks, terms = self.conn.execute(
+            "SELECT COUNT(*), (SELECT COUNT(DISTINCT term) FROM postings) FROM chunks"
+        ).fetchone()
+        return {"files": files, "chunks": chunks, "terms": terms}
+
+    def close(self):
+        self.conn.close()
+
+## SEARCH TOOL
+
+## Global index variable - will be initialized lazily
+_index = None
+
+def get_local_index() -> LocalCorpusIndex:
+    """Get or open the index of the default corpus directory."""
+    global _index
+    if _index is None:
+        _index = LocalCorpusIndex(default_corpus_path)
+    return _index
+
+def format_passages(passages: list[dict]) -> str:
+    """Format passages as a tool result."""
+    if not passages:
+        return "No matching passages found in the local documents."
+    formatted_output = "Local document passages:\n\n"
+    for i, passage in enumerate(passages, 1):
+        formatted_output += f"--- PASSAGE {i}: {passage['path']} (chunk {passage['chunk']}/{passage['chunks']}) ---\n"
+        formatted_output += f"{passage['text']}\n\n"
+    return formatted_output
+
+@tool(parse_docstring=True)
+def search_local_documents(query: str, top_k: Annotated[int, InjectedToolArg] = 5) -> str:
+    """Search the local research documents and return only the most relevant passages.
+
+    Prefer this over reading whole files: it returns the best matching passages of
+    every indexed document, with the file name and chunk position of each passage.
+
+    Args:
+        query: What to look for, in a few descriptive words
+        top_k: Number of passages to return
+
+    Returns:
+        The best matching passages with their file and position
+    """
+    index = get_local_index()
+    ## Pick up added, changed or deleted files without re-reading unchanged ones
+    index.refresh()
+    return format_passages(index.search(query, top_k=top_k))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the local corpus index and search it.")
+    parser.add_argument("query", nargs="?", help="Query to run after updating the index")
+    parser.add_argument("--docs", default=default_corpus_path, help="Directory to index")
+    parser.add_argument("--db", default=default_index_db, help="Index database")
+    parser.add_argument("--top-k", type=int, default=5, help="Passages to return")
+    args = parser.parse_args()
+
+    index = LocalCorpusIndex(args.docs, args.db)
+    start = time.perf_counter()
+    changes = index.update()
+    console.print(f"[green]✓ Index updated in {time.perf_counter() - start:.2f}s:[/green] {changes} {index.stats()}")
+    if args.query:
+        start = time.perf_counter()
+        passages = index.search(args.query, top_k=args.top_k)
+        console.print(f"[green]✓ Search took {(time.perf_counter() - start) * 1000:.1f}ms[/green]")
+        console.print(format_passages(passages))
+    index.close()
@@ -0,0 +1,367 @@
+## Local Document Tools
+## Memory-mapped ranged reads, regex grep with context and file statistics for large local
+## documents, so multi-GB text files never have to be loaded (or returned) in full
+
+"""Memory-Mapped Tools for Large Local Documents.
+
+The MCP filesystem server's read_file loads a file completely and returns all of it,
+which does not work for PDFs converted to text, logs or data dumps of hundreds of MB.
+These tools open documents with mmap and only touch the pages they need:
+- read_document_lines / read_document_bytes serve a line or byte range
+- grep_document runs a regex over the mapped file and returns matching lines with
+  surrounding context
+- document_stats reports size, modification time and an estimate of the line
+  count and line length from a sample, without reading the whole file
+
+Line ranges are found through a sparse line index (the offset of every
+line_index_stride-th line) that is built incrementally on demand and cached per
+file version, so reading near the end of a large file scans it once, not per call.
+
+Every result is capped (lines, bytes, matches and characters per line), which keeps
+memory use and prompt size bounded whatever the size of the file. Paths are
+resolved inside the corpus directory; paths outside it are rejected.
+"""
+
+import mmap
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.tools import tool
+
+from local_corpus_index import default_corpus_path
+
+## CONFIGURATION
+
+## Directory the document tools may read from
+allowed_root = default_corpus_path
+## Most lines and bytes returned by one ranged read
+max_lines_per_read = 400
+max_bytes_per_read = 64 * 1024
+## Most matches returned by one grep
+max_grep_matches = 50
+## Longer lines are truncated in tool output
+max_line_chars = 500
+## One line offset is kept every line_index_stride lines
+line_index_stride = 1024
+## Files whose sparse line index is kept in memory
+max_cached_line_indexes = 32
+## Bytes sampled by document_stats to estimate line statistics
+stats_sample_bytes = 1024 * 1024
+## Window used to count newlines without copying large slices
+_SCAN_WINDOW = 4 * 1024 * 1024
+
+## FILE ACCESS
+
+def resolve_document_path(path: str, root: str = None) -> str:
+    """Resolve `path` (absolute or relative to the corpus directory) inside the allowed root.
+
+    Raises:
+        ValueError: The path points outside the allowed root
+        FileNotFoundError: The file does not exist
+    """
+    root = os.path.realpath(root or allowed_root)
+    full_path = os.path.realpath(path if os.path.isabs(path) else os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root:
+        raise ValueError(f"Access denied: {path} is outside {root}")
+    if not os.path.isfile(full_path):
+        raise FileNotFoundError(f"No such document: {path}")
+    return full_path
+
+class _MappedDocument:
+    """Read-only memory map of a file (empty files map to b"")."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size
+        self.version = (stat.st_mtime_ns, stat.st_size)
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    def __enter__(self) -> "_MappedDocument":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.size:
+            self.data.close()
+        self._file.close()
+        return False
+
+def _count_newlines(data, start: int, end: int) -> int:
+    """Count newlines in data[start:end] one window at a time."""
+    count = 0
+    for window_start in range(start, end, _SCAN_WINDOW):
+        count += data[window_start:min(end, window_start + _SCAN_WINDOW)].count(b"\n")
+    return count
+
+def _decode_line(raw: bytes) -> str:
+    line = raw.rstrip(b"\r\n").decode("utf-8", errors="replace")
+    if len(line) > max_line_chars:
+        line = line[:max_line_chars] + f" … [{len(line) - max_line_chars} more characters]"
+    return line
+
+## SPARSE LINE INDEX
+
+class _LineIndex:
+    """Offsets of every `line_index_stride`-th line of one file version, extended on demand."""
+
+    def __init__(self):
+        ## offsets[i] is the byte offset of line i * line_index_stride (0-based)
+        self.offsets = [0]
+        self.complete = False
+        self.lock = threading.Lock()
+
+    def locate(self, data, size: int, line: int) -> int:
+        """Return the byte offset of 0-based `line` (size if the file has fewer lines)."""
+        block = line // line_index_stride
+        with self.lock:
+            self._extend(data, size, block)
+        if block >= len(self.offsets):
+            return size
+
+        offset = self.offsets[block]
+        for _ in range(line - block * line_index_stride):
+            newline = data.find(b"\n", offset)
+            if newline < 0:
+                return size
+            offset = newline + 1
+        return offset
+
+    def _extend(self, data, size: int, block: int):
+        while len(self.offsets) <= block and not self.complete:
+            offset = self.offsets[-1]
+            for _ in range(line_index_stride):
+                newline = data.find(b"\n", offset)
+                if newline < 0 or newline + 1 >= size:
+                    self.complete = True
+                    break
+                offset = newline + 1
+            else:
+                self.offsets.append(offset)
+
+_line_indexes = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+def _line_index(document: _MappedDocument) -> _LineIndex:
+    key = (document.path, document.version)
+    with _line_indexes_lock:
+        if key not in _line_indexes:
+            _line_indexes[key] = _LineIndex()
+            while len(_line_indexes) > max_cached_line_indexes:
+                _line_indexes.popitem(last=False)
+        _line_indexes.move_to_end(key)
+        return _line_indexes[key]
+
+## OPERATIONS
+
+def read_lines(path: str, start_line: int = 1, num_lines: int = 100) -> dict:
+    """Read `num_lines` lines starting at 1-based `start_line`.
+
+    Returns:
+        Dictionary with the resolved path, first and last line numbers, the lines and
+        whether the end of the file was reached
+    """
+    start_line = max(1, start_line)
+    num_lines = max(1, min(num_lines, max_lines_per_read))
+    with _MappedDocument(resolve_document_path(path)) as document:
+        data, size = document.data, document.size
+        offset = _line_index(document).locate(data, size, start_line - 1) if size else 0
+        lines = []
+        budget = max_bytes_per_read
+        while offset < size and len(lines) < num_lines and budget > 0:
+            newline = data.find(b"\n", offset)
+            end = size if newline < 0 else newline + 1
+            lines.append(_decode_line(data[offset:min(end, offset + max(budget, max_line_chars * 4))]))
+            budget -= end - offset
+            offset = end
+        return {
+            "path": document.path,
+            "start_line": start_line,
+            "end_line": start_line + len(lines) - 1,
+            "lines": lines,
+            "end_of_file": offset >= size,
+        }
+
+def read_bytes(path: str, offset: int = 0, length: int = 4096) -> dict:
+    """Read `length` bytes at byte `offset`, decoded as UTF-8 (split characters are replaced)."""
+    offset = max(0, offset)
+    length = max(0, min(length, max_bytes_per_read))
+    with _MappedDocument(resolve_document_path(path)) as document:
+        chunk = document.data[offset:offset + length]
+        return {
+            "path": document.path,
+            "offset": offset,
+            "length": len(chunk),
+            "size": document.size,
+            "text": chunk.decode("utf-8", errors="replace"),
+        }
+
+def grep(path: str, pattern: str, context_lines: int = 2, max_matches: int = max_grep_matches,
+         ignore_case: bool = True) -> dict:
+    """Find lines matching the regex `pattern`, with `context_lines` lines around each match.
+
+    Returns:
+        Dictionary with the matches (line number, line and context) and whether more
+        matches were left out
+    """
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    regex = re.compile(pattern.encode("utf-8"), flags)
+    context_lines = max(0, min(context_lines, 10))
+    max_matches = max(1, min(max_matches, max_grep_matches))
+
+    with _MappedDocument(resolve_document_path(path)) as document:
+        data, size = document.data, document.size
+        matches = []
+        truncated = False
+        line_number, counted_to = 1, 0
+        search_from = 0
+        while search_from <= size:
+            match = regex.search(data, search_from)
+            if match is None:
+                break
+            if len(matches) == max_matches:
+                truncated = True
+                break
+            line_start = data.rfind(b"\n", 0, match.start()) + 1
+            line_end = data.find(b"\n", match.start())
+            line_end = size if line_end < 0 else line_end
+            ## Line numbers are counted incrementally between matches
+            line_number += _count_newlines(data, counted_to, line_start)
+            counted_to = line_start
+
+            before = []
+            offset = line_start
+            for _ in range(context_lines):
+                if offset == 0:
+                    break
+                previous = data.rfind(b"\n", 0, offset - 1) + 1
+                before.insert(0, _decode_line(data[previous:offset]))
+                offset = previous
+            after = []
+            offset = line_end + 1
+            for _ in range(context_lines):
+                if offset >= size:
+                    break
+                newline = data.find(b"\n", offset)
+                end = size if newline < 0 else newline
+                after.append(_decode_line(data[offset:end]))
+                offset = end + 1
+
+            matches.append({
+                "line_number": line_number,
+                "line": _decode_line(data[line_start:line_end]),
+                "before": before,
+                "after": after,
+            })
+            ## Continue after this line so a line is reported once
+            search_from = line_end + 1
+        return {"path": document.path, "pattern": pattern, "matches": matches, "truncated": truncated}
+
+def stats(path: str) -> dict:
+    """Size, modification time and sampled line statistics of a document."""
+    with _MappedDocument(resolve_document_path(path)) as document:
+        data, size = document.data, document.size
+        sample = data[:min(size, stats_sample_bytes)]
+        sample_lines = sample.count(b"\n") + (1 if sample and not sample.endswith(b"\n") else 0)
+        exact = size <= stats_sample_bytes
+        average_line_bytes = len(sample) / sample_lines if sample_lines else 0.0
+        return {
+            "path": document.path,
+            "size_bytes": size,
+            "modified": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(document.version[0] / 1e9)),
+            "lines": sample_lines if exact else int(size / average_line_bytes) if average_line_bytes else 0,
+            "lines_exact": exact,
+            "average_line_bytes": round(average_line_bytes, 1),
+            "binary": b"\x00" in sample[:8192],
+            "preview": [_decode_line(line) for line in sample.split(b"\n")[:5]] if sample else [],
+        }
+
+## TOOLS
+
+def _format_lines(first_line: int, lines: list[str]) -> str:
+    return "\n".join(f"{first_line + i:>7}: {line}" for i, line in enumerate(lines))
+
+@tool(parse_docstring=True)
+def read_document_lines(path: str, start_line: int = 1, num_lines: int = 100) -> str:
+    """Read a range of lines from a local document without loading the whole file.
+
+    Use this instead of reading whole files when a document is large: check its
+    size with document_stats, find the relevant place with grep_document, then
+    read only the lines around it.
+
+    Args:
+        path: Document path, relative to the research documents directory
+        start_line: First line to read (1-based)
+        num_lines: Number of lines to read (at most 400)
+
+    Returns:
+        The requested lines prefixed with their line numbers
+    """
+    result = read_lines(path, start_line, num_lines)
+    if not result["lines"]:
+        return f"{path} has fewer than {start_line} lines."
+    footer = "[end of file]" if result["end_of_file"] else f"[continues at line {result['end_line'] + 1}]"
+    return f"{path} lines {result['start_line']}-{result['end_line']}:\n{_format_lines(result['start_line'], result['lines'])}\n{footer}"
+
+@tool(parse_docstring=True)
+def read_document_bytes(path: str, offset: int = 0, length: int = 4096) -> str:
+    """Read a byte range from a local document without loading the whole file.
+
+    Args:
+        path: Document path, relative to the research documents directory
+        offset: Byte offset to start reading at
+        length: Number of bytes to read (at most 65536)
+
+    Returns:
+        The decoded text of the byte range
+    """
+    result = read_bytes(path, offset, length)
+    end = result["offset"] + result["length"]
+    return f"{path} bytes {result['offset']}-{end} of {result['size']}:\n{result['text']}"
+
+@tool(parse_docstring=True)
+def grep_document(path: str, pattern: str, context_lines: int = 2) -> str:
+    """Search a local document for a regular expression and return matching lines with context.
+
+    Args:
+        path: Document path, relative to the research documents directory
+        pattern: Regular expression to search for (case-insensitive)
+        context_lines: Lines of context to show before and after each match (at most 10)
+
+    Returns:
+        Each matching line with its line number and surrounding lines
+    """
+    result = grep(path, pattern, context_lines)
+    if not result["matches"]:
+        return f"No lines in {path} match {pattern!r}."
+    blocks = []
+    for match in result["matches"]:
+        first = match["line_number"] - len(match["before"])
+        blocks.append(_format_lines(first, match["before"] + [match["line"]] + match["after"]))
+    more = f"\n[more than {len(result['matches'])} matches, refine the pattern]" if result["truncated"] else ""
+    return f"{len(result['matches'])} matches for {pattern!r} in {path}:\n" + "\n--\n".join(blocks) + more
+
+@tool(parse_docstring=True)
+def document_stats(path: str) -> str:
+    """Get the size, modification time, line count and first lines of a local document without reading it all.
+
+    Args:
+        path: Document path, relative to the research documents directory
+
+    Returns:
+        Summary statistics of the document
+    """
+    result = stats(path)
+    lines = f"{result['lines']}" if result["lines_exact"] else f"~{result['lines']} (estimated)"
+    preview = "\n".join(f"  {line}" for line in result["preview"])
+    return (
+        f"{path}: {result['size_bytes']} bytes, modified {result['modified']}, {lines} lines, "
+        f"{result['average_line_bytes']} bytes per line{', binary' if result['binary'] else ''}\n"
+        f"First lines:\n{preview}"
+    )
+
+## Tools offered to researchers
+document_tools = [document_stats, grep_document, read_document_lines, read_document_bytes]
@@ -0,0 +1,115 @@
+## MCP Session Pool Benchmark
+## Compares per-call MCP tool latency of MultiServerMCPClient (new session per call) with the
+## persistent MCPSessionPool on the same server and tool
+
+"""Benchmark: Session per Call vs Persistent MCP Session Pool.
+
+Runs the same MCP tool call repeatedly (sequentially, then concurrently) through:
+- MultiServerMCPClient tools, which open a new session (a new stdio server
+  process) for every call
+- MCPSessionPool tools, which reuse long-lived sessions
+
+and reports tool discovery time and per-call latency percentiles for each.
+
+Usage:
+    python mcp_pool_benchmark.py --docs ./deep_research_files --calls 20
+    python mcp_pool_benchmark.py --tool list_directory --args '{"path": "/abs/path"}'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from rich.console import Console
+from rich.table import Table
+
+from mcp_session_pool import MCPSessionPool
+
+console = Console()
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+async def time_calls(tool, args: dict, calls: int, concurrency: int) -> list[float]:
+    """Time `calls` invocations of a tool with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_call():
+        async with semaphore:
+            start = time.perf_counter()
+            await tool.ainvoke(args)
+            return time.perf_counter() - start
+
+    return list(await asyncio.gather(*[one_call() for _ in range(calls)]))
+
+async def benchmark_client(label: str, client, tool_name: str, args: dict, calls: int, concurrency: int) -> dict:
+    start = time.perf_counter()
+    tools = {tool.name: tool for tool in await client.get_tools()}
+    discovery = time.perf_counter() - start
+
+    sequential = await time_calls(tools[tool_name], args, calls, 1)
+    start = time.perf_counter()
+    concurrent = await time_calls(tools[tool_name], args, calls, concurrency)
+    concurrent_wall = time.perf_counter() - start
+    return {
+        "label": label,
+        "discovery_s": discovery,
+        "p50_ms": percentile(sequential, 0.5) * 1000,
+        "p95_ms": percentile(sequential, 0.95) * 1000,
+        "mean_ms": statistics.mean(sequential) * 1000,
+        "concurrent_calls_per_s": calls / concurrent_wall,
+    }
+
+async def run_benchmark(connections: dict, tool_name: str, args: dict, calls: int, concurrency: int) -> list[dict]:
+    """Benchmark the same tool through a session-per-call client and through the pool."""
+    results = [await benchmark_client(
+        "session per call", MultiServerMCPClient(connections), tool_name, args, calls, concurrency
+    )]
+
+    pool = MCPSessionPool(connections)
+    try:
+        results.append(await benchmark_client("session pool", pool, tool_name, args, calls, concurrency))
+    finally:
+        await pool.close()
+
+    table = Table(title=f"MCP Tool Call Latency ({tool_name}, {calls} calls)", show_header=True, header_style="bold magenta")
+    table.add_column("Mode", style="cyan")
+    table.add_column("Discovery (s)", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column(f"Calls/s @ {concurrency}", justify="right")
+    for r in results:
+        table.add_row(
+            r["label"], f"{r['discovery_s']:.2f}", f"{r['p50_ms']:.1f}", f"{r['p95_ms']:.1f}",
+            f"{r['mean_ms']:.1f}", f"{r['concurrent_calls_per_s']:.1f}",
+        )
+    console.print(table)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MCP tool calls with and without the session pool.")
+    parser.add_argument("--docs", default="./deep_research_files", help="Directory served by the filesystem server")
+    parser.add_argument("--command", default="npx.cmd" if os.name == "nt" else "npx", help="Server launch command")
+    parser.add_argument("--server-args", help="Server arguments (default: the filesystem server on --docs)")
+    parser.add_argument("--tool", default="read_file", help="Tool to call")
+    parser.add_argument("--args", help="JSON tool arguments (default: the first file in --docs)")
+    parser.add_argument("--calls", type=int, default=20, help="Calls per mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="Calls in flight for the concurrent run")
+    args = parser.parse_args()
+
+    docs = os.path.abspath(args.docs)
+    server_args = args.server_args.split() if args.server_args else ["-y", "@modelcontextprotocol/server-filesystem", docs]
+    if args.args:
+        tool_args = json.loads(args.args)
+    else:
+        first_file = sorted(name for name in os.listdir(docs) if os.path.isfile(os.path.join(docs, name)))[0]
+        tool_args = {"path": os.path.join(docs, first_file)}
+
+    connections = {"filesystem": {"command": args.command, "args": server_args, "transport": "stdio"}}
+    asyncio.run(run_benchmark(connections, args.tool, tool_args, args.calls, args.concurrency))
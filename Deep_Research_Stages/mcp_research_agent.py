@@ -14,20 +14,34 @@ Key features:
 - Secure directory access with permission checking
 - Research compression for efficient processing
 - Lazy MCP client initialization for LangGraph Platform compatibility
+- Cached MCP tool discovery and pre-bound models shared across iterations and researchers
+- Persistent MCP session pool shared by every MCP researcher in the process
+- MCP servers started on first use and shut down cleanly (no import-time side effects)
+- Concurrent MCP tool execution with per-server limits, timeouts and error ToolMessages
+- Incremental local index of the documents, searched for top passages instead of whole files
+- Memory-mapped ranged reads, grep and file statistics for large documents
+- Configurable MCP transport: stdio or a long-lived local streamable HTTP server
+- Semantic tool loadout: only the tools relevant to the topic and step are bound
+- Semantic retrieval over the disk-backed vector store, when one has been built
 """
 
-import os, subprocess
+import os
 from rich.console import Console
 from typing_extensions import Literal
 
-from langchain.chat_models import init_chat_model
+from model_scheduler import init_scheduled_model
 from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage, filter_messages
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.graph import StateGraph, START, END
 
 from research_utils import format_messages
+from mcp_tool_cache import MCPToolCache
+from tool_loadout import ToolLoadout, loadout_query
+from mcp_servers import MCPServerManager, default_http_port, filesystem_http_server_command, filesystem_server_connection
+from local_corpus_index import search_local_documents
+from local_document_tools import document_tools
+from vector_store import retrieve_documents, vector_store_available
 import asyncio
-from langchain_core.messages import HumanMessage
 from rich.markdown import Markdown
 
 from deep_research_prompts.prompts import research_agent_prompt_with_mcp, compress_research_system_prompt, compress_research_human_message
@@ -39,43 +53,26 @@ from research_stage_prompt.prompts import get_today_str, think_tool, get_current
 ## MCP server configuration for filesystem access
 ## The MCP Client Configuration requires Command, Arguments and Transport to be defined
 ## Command: Server executes locally as a process using the npx command
+## The server is started by the MCP server manager on first use, not at import time
 
 console = Console()
 
 sample_docs_path = os.path.abspath("./deep_research_files/")
-console.print(f"[bold blue]Sample docs path:[/bold blue] {sample_docs_path}")
-
-if not os.path.exists(sample_docs_path):
-    console.print("[red]✗ Directory does not exist![/red]")
-else:
-    console.print(f"[green]✓ Directory exists with files:[/green] {os.listdir(sample_docs_path)}")
-
-server_proc = subprocess.Popen([
-    "npx.cmd", "-y", "@modelcontextprotocol/server-filesystem",
-    sample_docs_path,
-], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-print("Line-Error Debugging")
-## Print logs for debugging
-for i in range(1):
-    print(f"Line: {i}")
-    line = server_proc.stderr.readline()
-    print(f"Line: {line}")
-    if not line:
-        break
-    print("[MCP Server]", line.decode().strip())
-
-print("Debugging Completed")
 
+## MCP transport: "stdio" (server process per pooled session) or "streamable_http"
+## (one long-lived local HTTP server started by the manager), see mcp_transport_benchmark.py
+mcp_transport = "stdio"
+mcp_http_port = default_http_port
 
 mcp_config = {
-    "filesystem": {
-        "command": "npx.cmd",
-        "args": ["-y", "@modelcontextprotocol/server-filesystem", sample_docs_path],
-        "transport": "stdio"
-    }
+    "filesystem": filesystem_server_connection(sample_docs_path, transport=mcp_transport, port=mcp_http_port)
 }
 
+## Local server processes the manager launches for HTTP transports
+mcp_launch_commands = {
+    "filesystem": filesystem_http_server_command(sample_docs_path, port=mcp_http_port)
+} if mcp_transport == "streamable_http" else {}
+
 ## Global client variable - will be initialized lazily
 _client = None
 
@@ -83,12 +80,80 @@ def get_mcp_client():
     """Get or initialize MCP client lazily to avoid issues with LangGraph Platform."""
     global _client
     if _client is None:
-        _client = MultiServerMCPClient(mcp_config)
+        ## Sessions invalidate the tool cache when a server announces a changed tool list
+        connections = {
+            name: {**connection, "session_kwargs": {"message_handler": tool_cache.tool_list_changed_handler(name)}}
+            for name, connection in mcp_config.items()
+        }
+        _client = MultiServerMCPClient(connections)
     return _client
 
+## Global server manager variable - will be initialized lazily
+_servers = None
+
+def get_mcp_servers() -> MCPServerManager:
+    """Get or initialize the manager that starts MCP servers on first use and shuts them down."""
+    global _servers
+    if _servers is None:
+        if not os.path.exists(sample_docs_path):
+            console.print(f"[red]✗ Sample docs directory does not exist:[/red] {sample_docs_path}")
+        ## A reconnect may reach a restarted server, so rediscover its tools
+        _servers = MCPServerManager(
+            get_mcp_client().connections,
+            launch_commands=mcp_launch_commands,
+            on_reconnect=[tool_cache.invalidate],
+        )
+    return _servers
+
+def get_mcp_pool():
+    """Get the pool of long-lived MCP sessions used for discovery and tool calls."""
+    return get_mcp_servers().pool
+
+## Tools discovered per MCP server and models bound to them, shared by all researchers
+tool_cache = MCPToolCache(get_mcp_pool)
+
+## Global local tools variable - will be initialized lazily
+_local_tools = None
+
+def get_local_tools() -> list:
+    """Get the local tools offered next to the MCP tools, resolved on first use."""
+    global _local_tools
+    if _local_tools is None:
+        tools = [search_local_documents, *document_tools, think_tool]
+        ## Semantic retrieval once a vector store has been built (python vector_store.py index)
+        if vector_store_available():
+            tools.insert(1, retrieve_documents)
+        _local_tools = tools
+    return _local_tools
+
+def get_local_tool(name: str):
+    """Return the local tool called `name`, or None if it is not a local tool."""
+    return next((tool for tool in get_local_tools() if tool.name == name), None)
+
+## Tools bound on every call; the other tools are selected per step by the tool loadout
+pinned_tools = [search_local_documents, think_tool]
+pinned_names = {tool.name for tool in pinned_tools}
+
+## Global tool loadout variable - will be initialized lazily
+_tool_loadout = None
+
+def get_tool_loadout() -> ToolLoadout:
+    """Get or initialize the tool loadout that selects the tools bound per step."""
+    global _tool_loadout
+    if _tool_loadout is None:
+        _tool_loadout = ToolLoadout()
+    return _tool_loadout
+
+## Concurrent MCP tool calls per server within one tool_node step
+## (MCPSessionPool additionally caps requests per session across researchers)
+max_tool_calls_per_server = 4
+
+## Seconds before a single tool call is abandoned and reported as an error
+tool_call_timeout_seconds = 60.0
+
 ## Initialize models
-compress_model = init_chat_model(model="ollama:granite3.3:8b", max_tokens=32000)
-model = init_chat_model(model="ollama:llama3.1:8b")
+compress_model = init_scheduled_model(model="ollama:granite3.3:8b", max_tokens=32000)
+model = init_scheduled_model(model="ollama:llama3.1:8b")
 
 ## AGENT NODES
 
@@ -96,26 +161,23 @@ async def llm_call(state: ResearcherState):
     """Analyze current state and decide on tool usage with MCP integration.
 
     This node:
-    1. Retrieves available tools from MCP server
-    2. Binds tools to the language model
-    3. Processes user input and decides on tool usage
+    1. Retrieves available tools from MCP server (cached after the first discovery)
+    2. Selects the tools relevant to the research topic and current step (tool loadout)
+    3. Binds them to the language model (binding reused for the same selection)
+    4. Processes user input and decides on tool usage
 
     Returns updated state with model response.
     """
-    # Get available tools from MCP server
-    client = get_mcp_client()
-    mcp_tools = await client.get_tools()
-
-    # Use MCP tools for local document access
-    tools = mcp_tools + [think_tool]
-
-    # Initialize model with tool binding
-    model_with_tools = model.bind_tools(tools)
+    # Cached MCP tools plus the local document tools, narrowed to the relevant ones
+    candidates = await tool_cache.get_tools() + [tool for tool in get_local_tools() if tool.name not in pinned_names]
+    query = loadout_query(state["researcher_messages"])
+    tools = await get_tool_loadout().select(candidates, query, pinned=pinned_tools)
+    model_with_tools = tool_cache.bind_tools(model, tools)
 
     # Process user input with system prompt
     return {
         "researcher_messages": [
-            model_with_tools.invoke(
+            await model_with_tools.ainvoke(
                 [SystemMessage(content=research_agent_prompt_with_mcp.format(date=get_today_str()))] + state["researcher_messages"]
             )
         ]
@@ -126,49 +188,57 @@ async def tool_node(state: ResearcherState):
 
     This node:
     1. Retrieves current tool calls from the last message
-    2. Executes all tool calls using async operations (required for MCP)
-    3. Returns formatted tool results
+    2. Executes the independent tool calls concurrently, up to
+       max_tool_calls_per_server in flight per MCP server
+    3. Returns formatted tool results in the order of the tool calls
+
+    A failed or timed-out call becomes an error ToolMessage the model can react
+    to, instead of an exception that aborts the researcher.
 
     Note: MCP requires async operations due to inter-process communication
     with the MCP server subprocess. This is unavoidable.
     """
     tool_calls = state["researcher_messages"][-1].tool_calls
-
-    async def execute_tools():
-        """Execute all tool calls. MCP tools require async execution."""
-        # Get fresh tool references from MCP server
-        client = get_mcp_client()
-        mcp_tools = await client.get_tools()
-        tools = mcp_tools + [think_tool]
-        tools_by_name = {tool.name: tool for tool in tools}
-
-        # Execute tool calls (sequentially for reliability)
-        observations = []
-        for tool_call in tool_calls:
-            tool = tools_by_name[tool_call["name"]]
+    server_limits = {}
+
+    async def execute_tool(tool_call: dict) -> ToolMessage:
+        """Execute one tool call and wrap its result (or error) in a ToolMessage."""
+        # Invoking with the full tool call returns a ToolMessage (status "error" when
+        # the MCP server reports a failed call)
+        call = {**tool_call, "type": "tool_call"}
+        try:
+            # Local tools, then cached MCP tool references (rediscovered if the name is unknown)
+            tool = get_local_tool(tool_call["name"]) or await tool_cache.get_tool(
+                tool_call["name"], extra_tools=get_local_tools()
+            )
             if tool_call["name"] == "think_tool":
                 # think_tool is sync, use regular invoke
-                observation = tool.invoke(tool_call["args"])
-            else:
-                # MCP tools are async, use ainvoke
-                observation = await tool.ainvoke(tool_call["args"])
-            observations.append(observation)
-
-        # Format results as tool messages
-        tool_outputs = [
-            ToolMessage(
-                content=observation,
+                return tool.invoke(call)
+            # MCP tools (and the local search, run in a worker thread) use ainvoke under the
+            # server's in-flight limit
+            server = tool_cache.server_of(tool_call["name"])
+            limit = server_limits.setdefault(server, asyncio.Semaphore(max_tool_calls_per_server))
+            async with limit:
+                return await asyncio.wait_for(tool.ainvoke(call), tool_call_timeout_seconds)
+        except asyncio.TimeoutError:
+            return ToolMessage(
+                content=f"Error: {tool_call['name']} timed out after {tool_call_timeout_seconds:g}s",
                 name=tool_call["name"],
                 tool_call_id=tool_call["id"],
+                status="error",
+            )
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error: {tool_call['name']} failed: {type(e).__name__}: {e}",
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
+                status="error",
             )
-            for observation, tool_call in zip(observations, tool_calls)
-        ]
-
-        return tool_outputs
 
-    messages = await execute_tools()
+    # gather keeps the results in tool-call order
+    messages = await asyncio.gather(*[execute_tool(tool_call) for tool_call in tool_calls])
 
-    return {"researcher_messages": messages}
+    return {"researcher_messages": list(messages)}
 
 def compress_research(state: ResearcherState) -> dict:
     """Compress research findings into a concise summary.
@@ -255,7 +325,11 @@ the top coffee shops in Toronto, emphasizing their coffee quality according to t
 of July 2025."""
 
 async def mcp_agent_output():
-    result = await mcp_agent.ainvoke({"researcher_messages": [HumanMessage(content=f"{research_brief}.")]})
+    try:
+        result = await mcp_agent.ainvoke({"researcher_messages": [HumanMessage(content=f"{research_brief}.")]})
+    finally:
+        ## Stop the MCP server processes started for this run
+        await get_mcp_servers().shutdown()
     format_messages(result['researcher_messages'])
     comp_markdn = Markdown(result["compressed_research"])
     console.print("[green]✓ Conpressed MarkDown:[/green]")
@@ -0,0 +1,225 @@
+## MCP Server Lifecycle
+## Starts MCP servers lazily on first use, keeps one process per server, probes readiness
+## without blocking the event loop and shuts servers down cleanly
+
+"""Managed MCP Server Lifecycle.
+
+Importing an MCP module used to start `npx @modelcontextprotocol/server-filesystem`
+immediately, block on a read of its stderr, and then start a second copy through
+the client configuration. MCPServerManager replaces that:
+- Nothing is started at import or construction time
+- The first session request starts the server (through the persistent session
+  pool, so each server runs as one long-lived process per pooled session)
+- start() probes readiness with the MCP handshake and a ping, asynchronously and
+  with a timeout, instead of reading the server's stderr
+- shutdown() (or leaving `async with MCPServerManager(...)`) closes the sessions,
+  which terminates the server processes
+
+Servers can use the stdio transport (the client starts the server process per
+session) or streamable HTTP. For HTTP servers given a launch command, the manager
+starts one long-lived local server process before the first connection (and again
+if it exits), waits until its port accepts connections and terminates it on shutdown.
+See mcp_transport_benchmark.py for the per-call cost of each transport.
+
+Usage:
+    async with MCPServerManager({"filesystem": filesystem_server_connection(path)}) as servers:
+        tools = await servers.pool.get_tools()
+
+    async with MCPServerManager(
+        {"filesystem": filesystem_server_connection(path, transport="streamable_http")},
+        launch_commands={"filesystem": filesystem_http_server_command(path)},
+    ) as servers:
+        ...
+"""
+
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+
+from rich.console import Console
+
+from mcp_session_pool import MCPSessionPool, connect_timeout_seconds
+
+console = Console()
+
+## CONFIGURATION
+
+## MCP transports supported for the filesystem server
+mcp_transports = ("stdio", "streamable_http")
+## Local port of the filesystem server when it runs over streamable HTTP
+default_http_port = 8931
+## Seconds allowed for a launched HTTP server to terminate before it is killed
+server_stop_timeout_seconds = 5.0
+
+## SERVER CONFIGURATION
+
+def npx_command() -> str:
+    """Return the npx executable for this platform."""
+    return "npx.cmd" if os.name == "nt" else "npx"
+
+def filesystem_server_connection(docs_path: str, transport: str = "stdio", port: int = default_http_port) -> dict:
+    """Connection config for the MCP filesystem server restricted to `docs_path`.
+
+    Args:
+        docs_path: Directory the server may access
+        transport: "stdio" (server process per session) or "streamable_http"
+            (long-lived local server, see filesystem_http_server_command)
+        port: Local port of the HTTP server
+
+    Returns:
+        Connection config, as for MultiServerMCPClient
+    """
+    if transport == "stdio":
+        return {
+            "command": npx_command(),
+            "args": ["-y", "@modelcontextprotocol/server-filesystem", docs_path],
+            "transport": "stdio",
+        }
+    if transport == "streamable_http":
+        return {"url": f"http://127.0.0.1:{port}/mcp", "transport": "streamable_http"}
+    raise ValueError(f"Unknown MCP transport '{transport}', expected one of {mcp_transports}")
+
+def filesystem_http_server_command(docs_path: str, port: int = default_http_port) -> list[str]:
+    """Command serving the stdio filesystem server over streamable HTTP on a local port.
+
+    The filesystem server only speaks stdio, so supergateway runs it once and
+    exposes it at http://127.0.0.1:{port}/mcp.
+    """
+    server = f'{npx_command()} -y @modelcontextprotocol/server-filesystem "{docs_path}"'
+    return [
+        npx_command(), "-y", "supergateway",
+        "--stdio", server,
+        "--outputTransport", "streamableHttp",
+        "--port", str(port),
+    ]
+
+## LIFECYCLE MANAGER
+
+class MCPServerManager:
+    """Owns the MCP servers of a process: lazy start, readiness probes and shutdown."""
+
+    def __init__(self, connections: dict, launch_commands: dict = None, **pool_kwargs):
+        """Create a manager; no server is started until first use.
+
+        Args:
+            connections: Server name -> connection config, as for MultiServerMCPClient
+            launch_commands: Server name -> command starting a local HTTP server the
+                manager runs for that connection (stdio servers need none)
+            **pool_kwargs: Extra arguments for MCPSessionPool (e.g. on_reconnect)
+        """
+        self.connections = connections
+        self.launch_commands = launch_commands or {}
+        self.pool_kwargs = pool_kwargs
+        self._pool = None
+        self._processes = {}
+        self._launch_locks = {}
+
+    @property
+    def pool(self) -> MCPSessionPool:
+        """Session pool through which servers are started and used."""
+        if self._pool is None:
+            self._pool = MCPSessionPool(self.connections, before_connect=self._ensure_process, **self.pool_kwargs)
+        return self._pool
+
+    ## LOCAL HTTP SERVERS
+
+    async def _ensure_process(self, server_name: str):
+        """Start the local HTTP server of `server_name` unless it is already running."""
+        if server_name not in self.launch_commands:
+            return
+        lock = self._launch_locks.setdefault(server_name, asyncio.Lock())
+        async with lock:
+            process = self._processes.get(server_name)
+            if process is not None and process.returncode is None:
+                return
+            command = self.launch_commands[server_name]
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            self._processes[server_name] = process
+            try:
+                await self._wait_for_port(server_name, process)
+            except BaseException:
+                await self._stop_process(server_name)
+                raise
+
+    async def _wait_for_port(self, server_name: str, process, timeout: float = connect_timeout_seconds):
+        """Poll the server's URL until its port accepts connections."""
+        url = urlsplit(self.connections[server_name]["url"])
+        port = url.port or (443 if url.scheme == "https" else 80)
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.returncode is not None:
+                raise ConnectionError(f"MCP server '{server_name}' exited with code {process.returncode} during start-up")
+            try:
+                _, writer = await asyncio.open_connection(url.hostname, port)
+                writer.close()
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"MCP server '{server_name}' did not listen on port {port} within {timeout:.0f}s")
+                await asyncio.sleep(0.1)
+
+    async def _stop_process(self, server_name: str):
+        process = self._processes.pop(server_name, None)
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), server_stop_timeout_seconds)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    ## LIFECYCLE
+
+    async def _probe(self, server_name: str):
+        async with self.pool.session(server_name) as session:
+            await session.send_ping()
+
+    async def start(self, server_name: str = None, timeout: float = connect_timeout_seconds) -> dict:
+        """Start servers that are not running yet and check that they answer.
+
+        Args:
+            server_name: Server to start (all configured servers if omitted)
+            timeout: Seconds allowed per server for start-up and handshake
+
+        Returns:
+            Server name -> whether the server is ready
+        """
+        names = [server_name] if server_name else list(self.connections)
+
+        async def probe(name: str) -> bool:
+            try:
+                await asyncio.wait_for(self._probe(name), timeout)
+                return True
+            except Exception as e:
+                console.print(f"[red]✗ MCP server '{name}' is not ready: {type(e).__name__}: {e}[/red]")
+                return False
+
+        ready = await asyncio.gather(*[probe(name) for name in names])
+        return dict(zip(names, ready))
+
+    async def shutdown(self):
+        """Close all sessions and stop the server processes (stdio and launched HTTP servers)."""
+        if self._pool is not None:
+            await self._pool.close()
+        await asyncio.gather(*[self._stop_process(name) for name in list(self._processes)])
+
+    async def __aenter__(self) -> "MCPServerManager":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.shutdown()
+        return False
+
+    def status(self) -> dict:
+        """Return session health and call counters (empty before first use)."""
+        if self._pool is None:
+            return {}
+        return {
+            **self._pool.metrics(),
+            "processes": {name: process.returncode is None for name, process in self._processes.items()},
+        }
@@ -0,0 +1,364 @@
+## MCP Session Pool
+## Long-lived MCP sessions shared by every MCP researcher in the process, with health checks,
+## reconnects and per-session concurrency limits
+
+"""Persistent MCP Session Pool.
+
+MultiServerMCPClient opens a new session for every get_tools() and every tool
+call; with the stdio transport that means spawning `npx @modelcontextprotocol/
+server-filesystem` again for each file read. MCPSessionPool instead keeps a few
+initialized sessions per server open for the lifetime of the process:
+- Sessions are opened on first use and reused by every researcher
+- Each session admits at most max_calls_per_session concurrent requests, and
+  callers are spread over the least busy session of the server
+- A background health check pings idle sessions; dead sessions (or sessions whose
+  call failed with a transport error) are reconnected on next use, and on_reconnect
+  callbacks run so caches (e.g. MCPToolCache) can drop tools discovered on the old
+  server process
+- A request that hit a dead session is retried once on the new session when that
+  is safe: tool listings always, tool calls only if the request was never sent
+  (a tool may not be idempotent, so a call the server may have run is not repeated)
+- Sessions are bound to the event loop that opened them; a new loop gets new sessions,
+  and the previous loop's sessions are closed so their stdio server processes exit
+
+The pool exposes the part of the MultiServerMCPClient interface the agents use
+(connections and get_tools(server_name=...)), and the tools it returns route their
+calls through the pool.
+
+See mcp_pool_benchmark.py for per-call latency with and without the pool.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import anyio
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+## CONFIGURATION
+
+## Long-lived sessions kept open per MCP server
+sessions_per_server = 1
+## Concurrent requests admitted on one session
+max_calls_per_session = 4
+## Seconds allowed for starting a server process and completing the MCP handshake
+connect_timeout_seconds = 60.0
+## Seconds between pings of idle sessions (None disables background health checks)
+health_check_interval_seconds = 30.0
+## Seconds a ping may take before the session is considered dead
+ping_timeout_seconds = 5.0
+## Maximum tools/list pages read from one server
+max_tool_list_pages = 1000
+
+## Errors meaning the session (not the tool) failed
+_DISCONNECT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+    BrokenPipeError,
+)
+
+## Disconnect errors raised while writing a request, i.e. before the server received it
+_NOT_SENT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+def _is_disconnect(error: BaseException) -> bool:
+    if isinstance(error, McpError):
+        return error.error.code == types.CONNECTION_CLOSED
+    return isinstance(error, _DISCONNECT_ERRORS)
+
+async def list_all_tools(session) -> list:
+    """List every tool of an MCP session, following tools/list pagination cursors."""
+    tools, cursor = [], None
+    for _ in range(max_tool_list_pages):
+        page = await session.list_tools(cursor=cursor)
+        tools.extend(page.tools or [])
+        ## An empty or missing cursor ends the listing
+        if not page.nextCursor:
+            return tools
+        cursor = page.nextCursor
+    raise RuntimeError(f"MCP server listed more than {max_tool_list_pages} pages of tools")
+
+class _PooledSession:
+    """One long-lived MCP session, owned by a background task for its whole lifetime."""
+
+    def __init__(self, server_name: str, connection: dict, max_calls: int):
+        self.server_name = server_name
+        self.connection = connection
+        self.semaphore = asyncio.Semaphore(max_calls)
+        self.session = None
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.connected_once = False
+        self._task = None
+        self._closing = None
+        self._error = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.session is not None
+
+    async def connect(self, timeout: float):
+        """Start the server connection and wait for the MCP handshake."""
+        ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error = None
+        ## Transport contexts must be entered and exited by the same task
+        self._task = asyncio.create_task(self._run(ready))
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise TimeoutError(f"MCP server '{self.server_name}' did not start within {timeout:.0f}s")
+        if self.session is None:
+            raise ConnectionError(f"Could not connect to MCP server '{self.server_name}': {self._error}")
+        self.connected_once = True
+
+    async def _run(self, ready: asyncio.Event):
+        try:
+            async with create_session(self.connection) as session:
+                await session.initialize()
+                self.session = session
+                ready.set()
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            ready.set()
+
+    def mark_dead(self):
+        """Drop the session after a transport error; the next caller reconnects."""
+        self.session = None
+        if self._closing is not None:
+            self._closing.set()
+
+    async def close(self):
+        if self._task is not None:
+            self._closing.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.session = None
+
+class MCPSessionPool:
+    """Pool of persistent MCP sessions keyed by server name."""
+
+    def __init__(
+        self,
+        connections: dict,
+        sessions_per_server: int = sessions_per_server,
+        max_calls_per_session: int = max_calls_per_session,
+        connect_timeout: float = connect_timeout_seconds,
+        health_check_interval: float = health_check_interval_seconds,
+        on_reconnect: list = None,
+        before_connect=None,
+    ):
+        """Create a pool.
+
+        Args:
+            connections: Server name -> connection config, as for MultiServerMCPClient
+            sessions_per_server: Long-lived sessions opened per server
+            max_calls_per_session: Concurrent requests admitted on one session
+            connect_timeout: Seconds allowed for a server to start and initialize
+            health_check_interval: Seconds between pings of idle sessions (None disables)
+            on_reconnect: Callables invoked with the server name after a reconnect
+            before_connect: Async callable awaited with the server name before a session
+                connects (e.g. to start a local HTTP server process)
+        """
+        self.connections = connections
+        self.sessions_per_server = sessions_per_server
+        self.max_calls_per_session = max_calls_per_session
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.on_reconnect = list(on_reconnect or [])
+        self.before_connect = before_connect
+
+        self._loop = None
+        self._sessions = {}
+        self._connect_locks = {}
+        self._health_task = None
+        self._stats = {"calls": 0, "connects": 0, "reconnects": 0, "retries": 0, "failed_pings": 0}
+
+    ## SESSIONS
+
+    async def _bind_to_running_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        ## Sessions from a previous event loop cannot be used here
+        old_loop, old_sessions, old_health_task = self._loop, self._sessions, self._health_task
+        self._loop = loop
+        self._sessions = {
+            name: [_PooledSession(name, connection, self.max_calls_per_session) for _ in range(self.sessions_per_server)]
+            for name, connection in self.connections.items()
+        }
+        self._connect_locks = {}
+        self._health_task = None
+        if old_loop is not None:
+            await self._close_loop_sessions(old_loop, old_sessions, old_health_task)
+
+    async def _close_loop_sessions(self, old_loop, old_sessions: dict, health_task):
+        """Close the sessions a previous event loop opened, stopping their server processes."""
+        opened = [pooled for sessions in old_sessions.values() for pooled in sessions if pooled._task is not None]
+        if not opened and health_task is None:
+            return
+        ## asyncio.run() cancels the sessions' tasks before closing its loop, which already
+        ## closed their transports and stopped the server processes
+        if old_loop.is_closed():
+            return
+
+        async def close_sessions():
+            if health_task is not None:
+                health_task.cancel()
+                await asyncio.gather(health_task, return_exceptions=True)
+            await asyncio.gather(*[pooled.close() for pooled in opened])
+
+        ## The session tasks can only run on their own loop: schedule the close there if it is
+        ## running in another thread, otherwise run the stopped loop until they are closed
+        if old_loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(close_sessions(), old_loop)
+            await asyncio.wrap_future(future)
+        else:
+            await asyncio.to_thread(old_loop.run_until_complete, close_sessions())
+
+    async def _ensure_connected(self, pooled: _PooledSession):
+        if pooled.healthy:
+            return
+        lock = self._connect_locks.setdefault(id(pooled), asyncio.Lock())
+        async with lock:
+            if pooled.healthy:
+                return
+            reconnect = pooled.connected_once
+            await pooled.close()
+            if self.before_connect is not None:
+                await self.before_connect(pooled.server_name)
+            await pooled.connect(self.connect_timeout)
+            self._stats["connects"] += 1
+            if reconnect:
+                self._stats["reconnects"] += 1
+                for callback in self.on_reconnect:
+                    callback(pooled.server_name)
+        self._start_health_checks()
+
+    @asynccontextmanager
+    async def session(self, server_name: str):
+        """Borrow an initialized session of `server_name` for one or more requests."""
+        await self._bind_to_running_loop()
+        if server_name not in self._sessions:
+            raise ValueError(f"Unknown MCP server '{server_name}', expected one of {list(self._sessions)}")
+
+        ## Least busy session first; the semaphore caps requests per session
+        pooled = min(self._sessions[server_name], key=lambda s: (s.in_flight, not s.healthy))
+        async with pooled.semaphore:
+            await self._ensure_connected(pooled)
+            pooled.in_flight += 1
+            try:
+                yield pooled.session
+            except BaseException as e:
+                if _is_disconnect(e):
+                    pooled.mark_dead()
+                raise
+            finally:
+                pooled.in_flight -= 1
+                pooled.last_used = time.monotonic()
+
+    async def _request(self, server_name: str, request, idempotent: bool):
+        """Run `request(session)` on a pooled session, retrying once on a fresh session if it died.
+
+        Args:
+            server_name: Server to send the request to
+            request: Async callable receiving the session
+            idempotent: Whether the request may run twice. Non-idempotent requests
+                (tool calls) are only retried if the session died before the request
+                was written, so the server cannot have run it
+        """
+        self._stats["calls"] += 1
+        try:
+            async with self.session(server_name) as session:
+                return await request(session)
+        except Exception as e:
+            if not _is_disconnect(e) or not (idempotent or isinstance(e, _NOT_SENT_ERRORS)):
+                raise
+        self._stats["retries"] += 1
+        async with self.session(server_name) as session:
+            return await request(session)
+
+    async def call_tool(self, server_name: str, tool_name: str, arguments: dict) -> types.CallToolResult:
+        return await self._request(
+            server_name, lambda session: session.call_tool(tool_name, arguments), idempotent=False
+        )
+
+    async def list_tools(self, server_name: str) -> list:
+        return await self._request(server_name, list_all_tools, idempotent=True)
+
+    ## MULTISERVERMCPCLIENT INTERFACE
+
+    async def get_tools(self, *, server_name: str = None) -> list:
+        """Return LangChain tools for one server (or all servers) whose calls use pooled sessions."""
+        names = [server_name] if server_name else list(self.connections)
+        tool_lists = await asyncio.gather(*[self._load_server_tools(name) for name in names])
+        return [tool for tools in tool_lists for tool in tools]
+
+    async def _load_server_tools(self, server_name: str) -> list:
+        async def route_through_pool(request, handler):
+            return await self.call_tool(request.server_name, request.name, request.args)
+
+        return [
+            convert_mcp_tool_to_langchain_tool(
+                None,
+                tool,
+                connection=self.connections[server_name],
+                server_name=server_name,
+                tool_interceptors=[route_through_pool],
+            )
+            for tool in await self.list_tools(server_name)
+        ]
+
+    ## HEALTH CHECKS
+
+    def _start_health_checks(self):
+        if self.health_check_interval and (self._health_task is None or self._health_task.done()):
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.health_check()
+
+    async def health_check(self) -> dict:
+        """Ping idle connected sessions and mark unresponsive ones dead.
+
+        Returns:
+            Server name -> number of healthy sessions
+        """
+        for sessions in self._sessions.values():
+            for pooled in sessions:
+                ## Busy sessions just proved they are alive
+                if not pooled.healthy or pooled.in_flight:
+                    continue
+                try:
+                    await asyncio.wait_for(pooled.session.send_ping(), ping_timeout_seconds)
+                except Exception:
+                    self._stats["failed_pings"] += 1
+                    pooled.mark_dead()
+        return {name: sum(s.healthy for s in sessions) for name, sessions in self._sessions.items()}
+
+    async def close(self):
+        """Close every session (and stop stdio server processes)."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        await asyncio.gather(*[pooled.close() for sessions in self._sessions.values() for pooled in sessions])
+
+    def metrics(self) -> dict:
+        return {
+            **self._stats,
+            "sessions": {
+                name: [{"healthy": s.healthy, "in_flight": s.in_flight} for s in sessions]
+                for name, sessions in self._sessions.items()
+            },
+        }
@@ -0,0 +1,148 @@
+## MCP Tool Discovery Cache
+## Caches the tools discovered on each MCP server and the models bound to them, so researchers
+## do not repeat an MCP round trip and schema conversion on every llm_call and tool_node step
+
+"""Cached MCP Tool Discovery and Pre-Bound Models.
+
+MultiServerMCPClient.get_tools() connects to each server, lists its tools and
+converts every schema to a LangChain tool. Doing that on every researcher turn
+(llm_call) and again in tool_node adds an MCP round trip per step.
+
+MCPToolCache keeps, per server:
+- the converted tool list, discovered once and shared by all researchers
+  (concurrent callers wait for a single discovery)
+- a generation number that changes whenever the server's tools are invalidated
+
+and, across servers, the tools_by_name map and the models bound to the current
+tools (one bind_tools per model and tool set, reused across iterations). Bound
+models are also cached per selected subset of tools (see tool_loadout.py), keeping
+the most recently used max_bound_models bindings.
+
+A server's entry is invalidated when:
+- the server sends a notifications/tools/list_changed message (the handler is
+  installed on the client's sessions through tool_list_changed_handler())
+- the server is restarted (MCPSessionPool calls invalidate(server_name) after a reconnect)
+- a tool call names a tool the cache does not know (see get_tool)
+"""
+
+import asyncio
+
+from mcp import types
+
+## Bound models kept for tool subsets (one per model and distinct selection)
+max_bound_models = 64
+
+class MCPToolCache:
+    """Per-server cache of MCP tools, the tools_by_name map and bound models."""
+
+    def __init__(self, client_factory):
+        """Create a cache.
+
+        Args:
+            client_factory: Zero-argument callable returning the MultiServerMCPClient
+                or MCPSessionPool
+                (called lazily so creating the cache has no side effects)
+        """
+        self.client_factory = client_factory
+        self._tools = {}
+        self._generations = {}
+        self._locks = {}
+        self._bound_models = {}
+        self._tools_by_name = None
+        self.discoveries = 0
+
+    def _server_names(self) -> list[str]:
+        return list(self.client_factory().connections)
+
+    ## DISCOVERY
+
+    async def _server_tools(self, server_name: str) -> list:
+        if server_name in self._tools:
+            return self._tools[server_name]
+        lock = self._locks.setdefault(server_name, asyncio.Lock())
+        async with lock:
+            ## Another researcher may have finished discovery while we waited
+            if server_name not in self._tools:
+                tools = await self.client_factory().get_tools(server_name=server_name)
+                self.discoveries += 1
+                self._tools[server_name] = tools
+                self._generations[server_name] = self._generations.get(server_name, 0) + 1
+                self._tools_by_name = None
+            return self._tools[server_name]
+
+    async def get_tools(self) -> list:
+        """Return the tools of every configured server, discovering missing servers concurrently."""
+        tool_lists = await asyncio.gather(*[self._server_tools(name) for name in self._server_names()])
+        return [tool for tools in tool_lists for tool in tools]
+
+    async def get_tools_by_name(self, extra_tools: list = ()) -> dict:
+        """Return a name -> tool map over every MCP tool plus `extra_tools`."""
+        tools = await self.get_tools()
+        if self._tools_by_name is None:
+            self._tools_by_name = {tool.name: tool for tool in tools}
+        return {**self._tools_by_name, **{tool.name: tool for tool in extra_tools}}
+
+    async def get_tool(self, name: str, extra_tools: list = ()):
+        """Look up a tool by name, rediscovering once if the name is unknown."""
+        tools_by_name = await self.get_tools_by_name(extra_tools)
+        if name not in tools_by_name:
+            self.invalidate()
+            tools_by_name = await self.get_tools_by_name(extra_tools)
+        return tools_by_name[name]
+
+    def server_of(self, tool_name: str):
+        """Return the server a cached tool was discovered on (None for non-MCP tools)."""
+        for server_name, tools in self._tools.items():
+            if any(tool.name == tool_name for tool in tools):
+                return server_name
+        return None
+
+    async def bind_model(self, model, extra_tools: list = ()):
+        """Return `model` bound to every MCP tool plus `extra_tools`, reusing earlier bindings."""
+        tools = await self.get_tools()
+        return self.bind_tools(model, list(tools) + list(extra_tools))
+
+    def bind_tools(self, model, tools: list):
+        """Return `model` bound to `tools` (e.g. a tool loadout), reusing earlier bindings."""
+        generations = tuple(sorted(self._generations.items()))
+        key = (id(model), generations, tuple(tool.name for tool in tools))
+        if key in self._bound_models:
+            ## Keep recently used bindings at the end
+            self._bound_models[key] = self._bound_models.pop(key)
+            return self._bound_models[key]
+
+        ## Bindings for older tool generations are never used again
+        self._bound_models = {
+            k: v for k, v in self._bound_models.items() if k[0] != id(model) or k[1] == generations
+        }
+        self._bound_models[key] = model.bind_tools(tools)
+        while len(self._bound_models) > max_bound_models:
+            del self._bound_models[next(iter(self._bound_models))]
+        return self._bound_models[key]
+
+    ## INVALIDATION
+
+    def invalidate(self, server_name: str = None):
+        """Drop cached tools for one server (or all servers) so they are rediscovered."""
+        for name in [server_name] if server_name else list(self._tools):
+            self._tools.pop(name, None)
+        self._tools_by_name = None
+
+    def tool_list_changed_handler(self, server_name: str):
+        """Return an MCP ClientSession message_handler that invalidates `server_name`
+        when the server announces that its tool list changed."""
+
+        async def handle_message(message):
+            if isinstance(message, types.ServerNotification) and isinstance(
+                message.root, types.ToolListChangedNotification
+            ):
+                self.invalidate(server_name)
+
+        return handle_message
+
+    def metrics(self) -> dict:
+        return {
+            "discoveries": self.discoveries,
+            "cached_servers": sorted(self._tools),
+            "bound_models": len(self._bound_models),
+        }
@@ -0,0 +1,181 @@
+## MCP Transport Benchmark
+## Compares the stdio transport with a long-lived local streamable HTTP server for the same
+## filesystem tool: startup, discovery, latency percentiles and throughput per concurrency level
+
+"""Benchmark: stdio vs Local Streamable HTTP MCP Transport.
+
+Runs the same MCP tool call through MCPServerManager for each transport:
+- stdio: the client starts the server process and talks over its stdin/stdout
+- streamable_http: the manager launches one local HTTP server (by default
+  supergateway wrapping the filesystem server) and the client talks HTTP to it
+
+Both use persistent pooled sessions, so the numbers isolate the transport rather than
+session set-up (see mcp_pool_benchmark.py for session-per-call vs pooled sessions).
+For each transport it reports start-up and tool discovery time, then per-call latency
+percentiles and throughput at every requested concurrency level.
+
+Set mcp_transport in mcp_research_agent.py to the faster transport.
+
+Usage:
+    python mcp_transport_benchmark.py --docs ./deep_research_files --calls 50 --concurrency 1 4 16
+    python mcp_transport_benchmark.py --stdio-command "python server.py {docs}" \
+        --http-command "python server.py {docs} --port {port}"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import statistics
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from mcp_pool_benchmark import percentile, time_calls
+from mcp_servers import (
+    MCPServerManager,
+    default_http_port,
+    filesystem_http_server_command,
+    filesystem_server_connection,
+)
+
+console = Console()
+
+async def benchmark_transport(
+    label: str,
+    connection: dict,
+    launch_command: list,
+    tool_name: str,
+    args: dict,
+    calls: int,
+    concurrency_levels: list[int],
+) -> list[dict]:
+    """Benchmark one transport: start-up, discovery, then each concurrency level.
+
+    Args:
+        label: Transport name shown in the results
+        connection: Connection config of the server
+        launch_command: Command starting the local server (None for stdio)
+        tool_name: Tool to call
+        args: Tool arguments
+        calls: Calls per concurrency level
+        concurrency_levels: Calls in flight for each measured run
+
+    Returns:
+        One result row per concurrency level
+    """
+    servers = MCPServerManager(
+        {"filesystem": connection},
+        launch_commands={"filesystem": launch_command} if launch_command else None,
+        ## One session admitting every in-flight call, so the transport is the bottleneck
+        max_calls_per_session=max(concurrency_levels),
+        health_check_interval=None,
+    )
+    try:
+        start = time.perf_counter()
+        ready = await servers.start()
+        startup = time.perf_counter() - start
+        if not all(ready.values()):
+            console.print(f"[red]✗ Skipping {label}: server did not start[/red]")
+            return []
+
+        start = time.perf_counter()
+        tools = {tool.name: tool for tool in await servers.pool.get_tools()}
+        discovery = time.perf_counter() - start
+
+        ## Warm-up call so the first measured call does not pay for lazy initialization
+        await tools[tool_name].ainvoke(args)
+
+        results = []
+        for concurrency in concurrency_levels:
+            start = time.perf_counter()
+            latencies = await time_calls(tools[tool_name], args, calls, concurrency)
+            wall = time.perf_counter() - start
+            results.append({
+                "transport": label,
+                "startup_s": startup,
+                "discovery_ms": discovery * 1000,
+                "concurrency": concurrency,
+                "p50_ms": percentile(latencies, 0.5) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "mean_ms": statistics.mean(latencies) * 1000,
+                "calls_per_s": calls / wall,
+            })
+        return results
+    finally:
+        await servers.shutdown()
+
+async def run_benchmark(transports: dict, tool_name: str, args: dict, calls: int, concurrency_levels: list[int]) -> list[dict]:
+    """Benchmark every transport in turn and print one comparison table.
+
+    Args:
+        transports: Transport name -> (connection config, launch command or None)
+        tool_name: Tool to call
+        args: Tool arguments
+        calls: Calls per concurrency level
+        concurrency_levels: Calls in flight for each measured run
+
+    Returns:
+        Result rows for every transport and concurrency level
+    """
+    results = []
+    for label, (connection, launch_command) in transports.items():
+        results.extend(await benchmark_transport(label, connection, launch_command, tool_name, args, calls, concurrency_levels))
+
+    table = Table(title=f"MCP Transport Latency ({tool_name}, {calls} calls per level)", show_header=True, header_style="bold magenta")
+    table.add_column("Transport", style="cyan")
+    table.add_column("Start-up (s)", justify="right")
+    table.add_column("Discovery (ms)", justify="right")
+    table.add_column("Concurrency", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("p99 (ms)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column("Calls/s", justify="right")
+    for r in results:
+        table.add_row(
+            r["transport"], f"{r['startup_s']:.2f}", f"{r['discovery_ms']:.1f}", str(r["concurrency"]),
+            f"{r['p50_ms']:.1f}", f"{r['p95_ms']:.1f}", f"{r['p99_ms']:.1f}", f"{r['mean_ms']:.1f}",
+            f"{r['calls_per_s']:.1f}",
+        )
+    console.print(table)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MCP tool calls over stdio and local streamable HTTP.")
+    parser.add_argument("--docs", default="./deep_research_files", help="Directory served by the filesystem server")
+    parser.add_argument("--transports", nargs="+", default=["stdio", "streamable_http"], help="Transports to compare")
+    parser.add_argument("--port", type=int, default=default_http_port, help="Local port of the HTTP server")
+    parser.add_argument("--stdio-command", help="stdio server command ({docs} is replaced; default: the npx filesystem server)")
+    parser.add_argument("--http-command", help="HTTP server command ({docs} and {port} are replaced; default: supergateway)")
+    parser.add_argument("--tool", default="read_file", help="Tool to call")
+    parser.add_argument("--args", help="JSON tool arguments (default: the first file in --docs)")
+    parser.add_argument("--calls", type=int, default=50, help="Calls per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels")
+    args = parser.parse_args()
+
+    docs = os.path.abspath(args.docs)
+    if args.args:
+        tool_args = json.loads(args.args)
+    else:
+        first_file = sorted(name for name in os.listdir(docs) if os.path.isfile(os.path.join(docs, name)))[0]
+        tool_args = {"path": os.path.join(docs, first_file)}
+
+    transports = {}
+    for transport in args.transports:
+        connection = filesystem_server_connection(docs, transport=transport, port=args.port)
+        launch_command = None
+        if transport == "stdio" and args.stdio_command:
+            command = shlex.split(args.stdio_command.format(docs=docs))
+            connection = {"command": command[0], "args": command[1:], "transport": "stdio"}
+        elif transport == "streamable_http":
+            launch_command = (
+                shlex.split(args.http_command.format(docs=docs, port=args.port))
+                if args.http_command else filesystem_http_server_command(docs, port=args.port)
+            )
+        transports[transport] = (connection, launch_command)
+
+    asyncio.run(run_benchmark(transports, args.tool, tool_args, args.calls, args.concurrency))
@@ -0,0 +1,685 @@
+## Model-Affinity Scheduling
+## Groups pending LLM calls by model so a single-GPU Ollama box does not keep unloading and
+## reloading llama3.1:8b and granite3.3:8b while many researchers run at once
+
+"""Model-Affinity LLM Call Scheduler and Gateway.
+
+The pipeline alternates between two local models: researcher llm_call and webpage
+summarization use llama3.1:8b, while compression, the supervisor and the final writer
+use granite3.3:8b. On a single GPU only one of them fits, so interleaved calls make
+Ollama swap weights, and each swap costs seconds.
+
+The scheduler keeps one model "active" at a time:
+- Calls for the active model are admitted up to a per-model in-flight cap
+- Calls for other models wait in per-model queues (batched by model)
+- When the active queue drains, or the active model has had its turn while others
+  wait, in-flight calls drain and the model with the most waiting calls is activated
+- A turn is bounded by a call budget and a maximum wait time, so no model starves
+
+Every model call of the pipeline goes through this scheduler, which makes it the
+central gateway to Ollama:
+- Priority classes: each model proxy has a priority ("critical" for the final
+  report, "high" for the supervisor and scoping, "normal" for researcher turns and
+  compression, "bulk" for webpage summaries and evaluation). Waiting calls are
+  admitted best priority first, a model with a better-priority call waiting is
+  activated first, and a call that has waited max_wait_seconds is treated as
+  critical so bulk work cannot starve
+- Per-model concurrency caps (model_concurrency_caps, default max_in_flight_per_model)
+- Request coalescing: identical requests (same model, bindings, input and call
+  arguments) that arrive while one is in flight share its result instead of
+  running again. Only deterministic models (temperature 0) coalesce by default,
+  since sampled calls are expected to differ; call sites that accept a shared
+  sample opt in with init_scheduled_model(..., coalesce=True)
+- Queue-time metrics per priority class (mean, p50, p95, max)
+
+Models created with init_scheduled_model() are wrapped in a ScheduledModel runnable
+so every invoke/ainvoke/astream (including after bind_tools, with_structured_output,
+with_config or `|` composition) goes through the scheduler, and are created with a
+keep-alive so Ollama keeps weights resident between turns. The first model initialised
+is preloaded in the background (every model when affinity is off and the GPU holds
+them all). Swap counts, per-model call counts and queue times are reported by
+scheduler_metrics() and printed at the end of a run by print_scheduler_metrics().
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import copy
+import hashlib
+import json
+import statistics
+import threading
+import time
+
+from langchain.chat_models import init_chat_model
+from langchain_core.load import dumpd
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+## CONFIGURATION
+
+## Set to False to bypass the scheduler entirely (no affinity, priorities, caps or coalescing)
+model_scheduling_enabled = True
+
+## Set to False when the GPU can hold every model at once: models then run side by side,
+## each under its own cap, while priorities, caps and coalescing still apply
+model_affinity_enabled = True
+
+## How long Ollama keeps a model loaded after its last call
+model_keep_alive = "30m"
+
+## Load Ollama models in the background when they are first initialised. With affinity on
+## only the first model is preloaded, since loading a second one would evict it
+preload_on_init = True
+
+## Maximum concurrent calls for the active model (match OLLAMA_NUM_PARALLEL)
+max_in_flight_per_model = 4
+## Per-model overrides of max_in_flight_per_model, e.g. {"granite3.3:8b": 2}
+model_concurrency_caps = {}
+
+## A model's turn ends after this many admitted calls if other models are waiting...
+max_calls_per_turn = 16
+## ...or once the oldest call for another model has waited this many seconds
+## (calls waiting this long are also promoted to the critical priority class)
+max_wait_seconds = 30.0
+
+## Priority classes, best first
+PRIORITY_CLASSES = {"critical": 0, "high": 1, "normal": 2, "bulk": 3}
+default_priority = "normal"
+
+## Share the result of identical in-flight requests (deterministic or opted-in models only)
+request_coalescing_enabled = True
+
+## Recent queue times kept per priority class for percentiles
+queue_time_samples = 1000
+
+def _priority_value(priority: str) -> int:
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority '{priority}', expected one of {list(PRIORITY_CLASSES)}")
+    return PRIORITY_CLASSES[priority]
+
+class _Waiter:
+    """A queued call: its priority, arrival order and the event or future that admits it."""
+
+    __slots__ = ("priority", "seq", "enqueued", "waiter")
+
+    def __init__(self, priority: int, seq: int, waiter):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.waiter = waiter
+
+def _request_payload(input):
+    """JSON-serializable form of a model input, without per-run message and tool call IDs."""
+    if isinstance(input, BaseMessage):
+        payload = {"type": input.type, "content": input.content, "name": input.name}
+        tool_calls = getattr(input, "tool_calls", None)
+        if tool_calls:
+            payload["tool_calls"] = [(tool_call["name"], tool_call["args"]) for tool_call in tool_calls]
+        return payload
+    if isinstance(input, (list, tuple)):
+        return [_request_payload(item) for item in input]
+    return dumpd(input)
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+class _LeaderCancelled(Exception):
+    """The call whose result was being shared was cancelled; followers run their own call."""
+
+class ModelScheduler:
+    """Thread-safe scheduler admitting LLM calls one model at a time, best priority first."""
+
+    def __init__(
+        self,
+        max_in_flight: int = max_in_flight_per_model,
+        max_turn_calls: int = max_calls_per_turn,
+        max_wait: float = max_wait_seconds,
+        caps: dict = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_turn_calls = max_turn_calls
+        self.max_wait = max_wait
+        self.caps = model_concurrency_caps if caps is None else caps
+
+        self._lock = threading.Lock()
+        ## model -> list of _Waiter (small, so selection scans instead of keeping a heap)
+        self._queues = collections.defaultdict(list)
+        self._seq = 0
+        self._active_model = None
+        self._in_flight = 0
+        self._in_flight_by_model = collections.Counter()
+        self._turn_calls = 0
+        self._swaps = 0
+        self._loads = 0
+        self._calls = collections.Counter()
+        self._wait_seconds = collections.Counter()
+        self._priority_waits = collections.defaultdict(lambda: collections.deque(maxlen=queue_time_samples))
+        self._priority_calls = collections.Counter()
+        ## request key -> concurrent.futures.Future shared by identical in-flight requests
+        self._requests = {}
+        self._coalesced = 0
+
+    def cap(self, model: str) -> int:
+        """Maximum concurrent calls for `model`."""
+        return self.caps.get(model, self.max_in_flight)
+
+    ## PRIORITIES
+
+    def _effective_locked(self, entry: _Waiter, now: float) -> tuple:
+        ## Calls that waited max_wait are promoted so low priorities cannot starve
+        priority = PRIORITY_CLASSES["critical"] if now - entry.enqueued >= self.max_wait else entry.priority
+        return (priority, entry.seq)
+
+    def _best_locked(self, model: str, now: float):
+        queue = self._queues.get(model)
+        return min(queue, key=lambda entry: self._effective_locked(entry, now)) if queue else None
+
+    def _best_other_priority_locked(self, model: str, now: float) -> float:
+        best = float("inf")
+        for name, queue in self._queues.items():
+            if name != model and queue:
+                best = min(best, self._effective_locked(self._best_locked(name, now), now)[0])
+        return best
+
+    ## ADMISSION
+
+    def _others_waiting_locked(self, model: str) -> bool:
+        return any(queue for name, queue in self._queues.items() if name != model)
+
+    def _turn_expired_locked(self) -> bool:
+        """Whether the active model should yield to models with waiting calls."""
+        if not self._others_waiting_locked(self._active_model):
+            return False
+        if self._turn_calls >= self.max_turn_calls:
+            return True
+        now = time.monotonic()
+        oldest = min(
+            entry.enqueued for name, queue in self._queues.items()
+            if name != self._active_model for entry in queue
+        )
+        if now - oldest >= self.max_wait:
+            return True
+        ## Yield to a better-priority call of another model
+        active_best = self._best_locked(self._active_model, now)
+        active_priority = self._effective_locked(active_best, now)[0] if active_best else float("inf")
+        return self._best_other_priority_locked(self._active_model, now) < active_priority
+
+    def _can_admit_locked(self, model: str, priority: int) -> bool:
+        if self._in_flight_by_model[model] >= self.cap(model):
+            return False
+        now = time.monotonic()
+        ## Calls of the same model with an equal or better priority go first
+        own_best = self._best_locked(model, now)
+        if own_best is not None and self._effective_locked(own_best, now)[0] <= priority:
+            return False
+        if not model_affinity_enabled:
+            return True
+        ## An idle scheduler with nothing queued admits any model
+        if self._in_flight == 0 and not any(self._queues.values()):
+            return True
+        return (
+            model == self._active_model
+            and not self._turn_expired_locked()
+            and self._best_other_priority_locked(model, now) >= priority
+        )
+
+    def _activate_locked(self, model: str):
+        if model != self._active_model:
+            if self._active_model is None:
+                self._loads += 1
+            else:
+                self._swaps += 1
+            self._active_model = model
+            self._turn_calls = 0
+
+    def _admit_locked(self, model: str, priority: int, waited: float = 0.0):
+        if model_affinity_enabled:
+            self._activate_locked(model)
+        self._in_flight += 1
+        self._in_flight_by_model[model] += 1
+        self._turn_calls += 1
+        self._calls[model] += 1
+        self._wait_seconds[model] += waited
+        self._priority_calls[priority] += 1
+        self._priority_waits[priority].append(waited)
+
+    def _pop_locked(self, model: str, now: float) -> _Waiter:
+        entry = self._best_locked(model, now)
+        self._queues[model].remove(entry)
+        self._admit_locked(model, entry.priority, now - entry.enqueued)
+        _wake(entry.waiter)
+        return entry
+
+    def _dispatch_locked(self):
+        """Admit queued calls, switching models once in-flight calls have drained."""
+        now = time.monotonic()
+        if not model_affinity_enabled:
+            for model, queue in self._queues.items():
+                while queue and self._in_flight_by_model[model] < self.cap(model):
+                    self._pop_locked(model, now)
+            return
+
+        waiting = {name: queue for name, queue in self._queues.items() if queue}
+        if self._in_flight == 0 and waiting and (
+            self._active_model not in waiting or self._turn_expired_locked()
+        ):
+            ## Best waiting priority across every model (the active one included), then a model
+            ## whose turn is not over, then batch by model: the model with the most pending calls
+            next_model = min(waiting, key=lambda name: (
+                self._effective_locked(self._best_locked(name, now), now)[0],
+                name == self._active_model,
+                -len(waiting[name]),
+                min(entry.enqueued for entry in waiting[name]),
+            ))
+            self._activate_locked(next_model)
+            self._turn_calls = 0
+
+        model = self._active_model
+        queue = self._queues.get(model)
+        while queue and self._in_flight_by_model[model] < self.cap(model):
+            ## With nothing in flight no release would dispatch again, so always admit a call
+            if self._in_flight > 0:
+                if self._turn_calls >= self.max_turn_calls and self._others_waiting_locked(model):
+                    break
+                ## Stop feeding this model while another model has a better-priority call waiting
+                if self._best_other_priority_locked(model, now) < self._effective_locked(self._best_locked(model, now), now)[0]:
+                    break
+            self._pop_locked(model, now)
+
+    def _enqueue_locked(self, model: str, priority: int, waiter) -> _Waiter:
+        self._seq += 1
+        entry = _Waiter(priority, self._seq, waiter)
+        self._queues[model].append(entry)
+        return entry
+
+    def acquire(self, model: str, priority: str = default_priority):
+        """Block the current thread until a call for `model` may run."""
+        value = _priority_value(priority)
+        with self._lock:
+            if self._can_admit_locked(model, value):
+                self._admit_locked(model, value)
+                return
+            event = threading.Event()
+            self._enqueue_locked(model, value, event)
+        event.wait()
+
+    async def acquire_async(self, model: str, priority: str = default_priority):
+        """Wait without blocking the event loop until a call for `model` may run."""
+        value = _priority_value(priority)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._can_admit_locked(model, value):
+                self._admit_locked(model, value)
+                return
+            entry = self._enqueue_locked(model, value, (loop, loop.create_future()))
+        try:
+            await entry.waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if entry in self._queues[model]:
+                    self._queues[model].remove(entry)
+                    self._dispatch_locked()
+                    raise
+            ## Admitted while being cancelled - free the slot again
+            self.release(model)
+            raise
+
+    def release(self, model: str):
+        """Mark a call for `model` as finished and admit waiting calls."""
+        with self._lock:
+            self._in_flight -= 1
+            self._in_flight_by_model[model] -= 1
+            self._dispatch_locked()
+
+    def slot(self, model: str, priority: str = default_priority) -> "_ModelSlot":
+        """Return a context manager admitting one call for `model` (sync or async)."""
+        return _ModelSlot(self, model, priority)
+
+    ## REQUEST COALESCING
+
+    def join_request(self, key: str) -> tuple:
+        """Register a request, or join the identical request already in flight.
+
+        Returns:
+            (future, leader): the leader runs the request and resolves the future,
+            followers wait for the future
+        """
+        with self._lock:
+            future = self._requests.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return future, False
+            future = concurrent.futures.Future()
+            self._requests[key] = future
+            return future, True
+
+    def finish_request(self, key: str, future: concurrent.futures.Future):
+        """Stop sharing a finished request (later identical requests run again)."""
+        with self._lock:
+            if self._requests.get(key) is future:
+                del self._requests[key]
+
+    ## METRICS
+
+    def metrics(self) -> dict:
+        """Return swap counts, per-model call counts and queueing statistics."""
+        names = {value: name for name, value in PRIORITY_CLASSES.items()}
+        with self._lock:
+            queue_times = {}
+            for value, waits in sorted(self._priority_waits.items()):
+                ordered = sorted(waits)
+                queue_times[names[value]] = {
+                    "calls": self._priority_calls[value],
+                    "mean_ms": statistics.mean(ordered) * 1000,
+                    "p50_ms": ordered[len(ordered) // 2] * 1000,
+                    "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+                    "max_ms": ordered[-1] * 1000,
+                }
+            return {
+                "active_model": self._active_model,
+                "in_flight": self._in_flight,
+                "in_flight_by_model": {name: n for name, n in self._in_flight_by_model.items() if n},
+                "swaps": self._swaps,
+                "loads": self._loads,
+                "calls": dict(self._calls),
+                "coalesced": self._coalesced,
+                "waiting": {name: len(queue) for name, queue in self._queues.items() if queue},
+                "total_wait_s": dict(self._wait_seconds),
+                "queue_time": queue_times,
+            }
+
+class _ModelSlot:
+    """Context manager holding one scheduler slot for a model."""
+
+    def __init__(self, scheduler: ModelScheduler, model: str, priority: str = default_priority):
+        self.scheduler = scheduler
+        self.model = model
+        self.priority = priority
+
+    def __enter__(self):
+        self.scheduler.acquire(self.model, self.priority)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.scheduler.release(self.model)
+        return False
+
+    async def __aenter__(self):
+        await self.scheduler.acquire_async(self.model, self.priority)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler.release(self.model)
+        return False
+
+def _wake(waiter):
+    if isinstance(waiter, threading.Event):
+        waiter.set()
+    else:
+        loop, future = waiter
+        loop.call_soon_threadsafe(_resolve_future, future)
+
+def _resolve_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+## Process-wide scheduler shared by every scheduled model
+model_scheduler = ModelScheduler()
+
+def scheduler_metrics() -> dict:
+    """Return metrics of the process-wide model scheduler."""
+    return model_scheduler.metrics()
+
+def print_scheduler_metrics():
+    """Display the process-wide scheduler's swaps, calls and queue times as tables."""
+    metrics = scheduler_metrics()
+    if not metrics["calls"]:
+        return
+    console.print(
+        f"[bold]Model scheduler:[/bold] {metrics['swaps']} swaps, {metrics['loads']} loads, "
+        f"{metrics['coalesced']} coalesced calls"
+    )
+    calls = Table(title="Model Calls", show_header=True, header_style="bold magenta")
+    calls.add_column("Model", style="cyan")
+    calls.add_column("Calls", justify="right")
+    calls.add_column("Total wait (s)", justify="right")
+    for name, count in metrics["calls"].items():
+        calls.add_row(name, str(count), f"{metrics['total_wait_s'].get(name, 0.0):.1f}")
+    console.print(calls)
+
+    queue = Table(title="Queue Time by Priority", show_header=True, header_style="bold magenta")
+    queue.add_column("Priority", style="cyan")
+    for column in ("Calls", "Mean (ms)", "p50 (ms)", "p95 (ms)", "Max (ms)"):
+        queue.add_column(column, justify="right")
+    for priority, q in metrics["queue_time"].items():
+        queue.add_row(
+            priority, str(q["calls"]), f"{q['mean_ms']:.0f}", f"{q['p50_ms']:.0f}",
+            f"{q['p95_ms']:.0f}", f"{q['max_ms']:.0f}",
+        )
+    console.print(queue)
+
+## SCHEDULED MODELS
+
+class ScheduledModel(Runnable):
+    """Runnable wrapping a chat model (or a runnable derived from one) that runs calls through the scheduler.
+
+    bind(), bind_tools() and with_structured_output() return scheduled models as well,
+    so bound, tool-bound and structured-output models keep their model affinity and priority.
+    Being a Runnable, it also composes with `|`, with_config(), with_retry() and batch().
+    """
+
+    def __init__(
+        self,
+        runnable,
+        model_name: str,
+        scheduler: ModelScheduler = None,
+        priority: str = default_priority,
+        coalesce: bool = False,
+    ):
+        _priority_value(priority)
+        self.runnable = runnable
+        self.model_name = model_name
+        self.scheduler = scheduler or model_scheduler
+        self.priority = priority
+        self.coalesce = coalesce
+        self._fingerprint = None
+
+    def _derive(self, runnable, priority: str = None, coalesce: bool = None) -> "ScheduledModel":
+        return ScheduledModel(
+            runnable,
+            self.model_name,
+            self.scheduler,
+            priority or self.priority,
+            self.coalesce if coalesce is None else coalesce,
+        )
+
+    def _slot(self):
+        return self.scheduler.slot(self.model_name, self.priority)
+
+    def _request_key(self, input, kwargs: dict):
+        """Key identifying identical requests (None if the request must not be shared)."""
+        if not (request_coalescing_enabled and self.coalesce):
+            return None
+        ## A call that samples at a non-zero temperature is not shared
+        if kwargs.get("temperature", 0) != 0:
+            return None
+        try:
+            if self._fingerprint is None:
+                ## The runnable's repr covers model settings, bound tools and output parsers
+                self._fingerprint = hashlib.sha256(repr(self.runnable).encode("utf-8")).hexdigest()
+            payload = json.dumps([_request_payload(input), kwargs], sort_keys=True, default=str)
+        except Exception:
+            return None
+        digest = hashlib.sha256(f"{self.model_name}\x00{self._fingerprint}\x00{payload}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def invoke(self, input, config=None, **kwargs):
+        if not model_scheduling_enabled:
+            return self.runnable.invoke(input, config, **kwargs)
+        key = self._request_key(input, kwargs)
+        if key is not None:
+            future, leader = self.scheduler.join_request(key)
+            ## Blocking an event loop thread could block the leader, so such callers run their own call
+            if not leader and not _in_event_loop():
+                try:
+                    return copy.deepcopy(future.result())
+                except _LeaderCancelled:
+                    pass
+            elif leader:
+                try:
+                    with self._slot():
+                        result = self.runnable.invoke(input, config, **kwargs)
+                    future.set_result(result)
+                    return result
+                except BaseException as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    self.scheduler.finish_request(key, future)
+        with self._slot():
+            return self.runnable.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        if not model_scheduling_enabled:
+            return await self.runnable.ainvoke(input, config, **kwargs)
+        key = self._request_key(input, kwargs)
+        if key is not None:
+            future, leader = self.scheduler.join_request(key)
+            if not leader:
+                try:
+                    return copy.deepcopy(await asyncio.wrap_future(future))
+                except _LeaderCancelled:
+                    pass
+            else:
+                try:
+                    async with self._slot():
+                        result = await self.runnable.ainvoke(input, config, **kwargs)
+                    future.set_result(result)
+                    return result
+                except asyncio.CancelledError:
+                    ## Followers are not cancelled with the leader; they run the call themselves
+                    future.set_exception(_LeaderCancelled())
+                    raise
+                except BaseException as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    self.scheduler.finish_request(key, future)
+        async with self._slot():
+            return await self.runnable.ainvoke(input, config, **kwargs)
+
+    async def astream(self, input, config=None, **kwargs):
+        if not model_scheduling_enabled:
+            async for chunk in self.runnable.astream(input, config, **kwargs):
+                yield chunk
+            return
+        async with self._slot():
+            async for chunk in self.runnable.astream(input, config, **kwargs):
+                yield chunk
+
+    def with_priority(self, priority: str) -> "ScheduledModel":
+        """Return this model with calls scheduled in another priority class."""
+        return self._derive(self.runnable, priority=priority)
+
+    def bind(self, **kwargs) -> "ScheduledModel":
+        ## Binding a sampling temperature stops coalescing
+        coalesce = self.coalesce and kwargs.get("temperature", 0) == 0
+        return self._derive(self.runnable.bind(**kwargs), coalesce=coalesce)
+
+    def bind_tools(self, tools, **kwargs) -> "ScheduledModel":
+        return self._derive(self.runnable.bind_tools(tools, **kwargs))
+
+    def with_structured_output(self, schema, **kwargs) -> "ScheduledModel":
+        return self._derive(self.runnable.with_structured_output(schema, **kwargs))
+
+    ## The wrapped runnable's types and schemas describe this one
+
+    @property
+    def InputType(self):
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self):
+        return self.runnable.OutputType
+
+    @property
+    def config_specs(self):
+        return self.runnable.config_specs
+
+    def get_input_schema(self, config=None):
+        return self.runnable.get_input_schema(config)
+
+    def get_output_schema(self, config=None):
+        return self.runnable.get_output_schema(config)
+
+    def __repr__(self) -> str:
+        return f"ScheduledModel({self.model_name!r}, priority={self.priority!r}, runnable={self.runnable!r})"
+
+    def __getattr__(self, name):
+        ## Only reached for attributes the proxy does not define (e.g. model settings)
+        if name == "runnable":
+            raise AttributeError(name)
+        return getattr(self.runnable, name)
+
+## Models already preloaded (or being preloaded) by init_scheduled_model
+_preloaded_models = set()
+_preload_lock = threading.Lock()
+
+def _preload_in_background(model: str):
+    """Preload a model on first initialisation, following the preload_on_init policy."""
+    if not (preload_on_init and model_scheduling_enabled and model.startswith("ollama:")):
+        return
+    with _preload_lock:
+        if model in _preloaded_models or (model_affinity_enabled and _preloaded_models):
+            return
+        _preloaded_models.add(model)
+
+    def run():
+        try:
+            asyncio.run(preload_model(model))
+        except Exception as e:
+            print(f"Could not preload {model}: {e}")
+
+    threading.Thread(target=run, name=f"preload-{model}", daemon=True).start()
+
+def init_scheduled_model(model: str, priority: str = default_priority, coalesce: bool = None, **kwargs) -> ScheduledModel:
+    """Initialize a chat model whose calls go through the model-affinity scheduler.
+
+    Args:
+        model: Model identifier for init_chat_model, e.g. "ollama:llama3.1:8b"
+        priority: Priority class of the model's calls (see PRIORITY_CLASSES)
+        coalesce: Whether identical in-flight calls share one result. Defaults to
+            True only for deterministic models (temperature=0)
+        **kwargs: Extra arguments for init_chat_model
+
+    Returns:
+        ScheduledModel wrapping the chat model
+    """
+    if model.startswith("ollama:"):
+        kwargs.setdefault("keep_alive", model_keep_alive)
+    if coalesce is None:
+        coalesce = kwargs.get("temperature") == 0
+    chat_model = init_chat_model(model=model, **kwargs)
+    model_name = model.split(":", 1)[-1] if model.startswith("ollama:") else model
+    _preload_in_background(model)
+    return ScheduledModel(chat_model, model_name, priority=priority, coalesce=coalesce)
+
+async def preload_model(model: str, keep_alive: str = model_keep_alive):
+    """Load an Ollama model into memory ahead of its first call.
+
+    Sends an empty generate request, which makes Ollama load the weights and keep
+    them resident for keep_alive. Requires the ollama Python package.
+    """
+    from ollama import AsyncClient
+
+    name = model.split(":", 1)[-1] if model.startswith("ollama:") else model
+    await AsyncClient().generate(model=name, keep_alive=keep_alive)
@@ -0,0 +1,144 @@
+## Report Writer Benchmark
+## Compares end-to-end latency of the single-call writer and the outline-first section writer
+## on the same research brief and notes
+
+"""Benchmark: Single-Call vs Outline-First Report Writing.
+
+Runs final_report_generation in both writing modes on the same research notes
+and reports end-to-end latency and report size for each mode.
+
+When outline planning fails, the outline mode falls back to the single-call writer.
+Such runs are counted separately and left out of the outline latency, so the
+comparison only times reports actually written section by section.
+
+The notes come either from a JSON file with "research_brief" and "notes" keys,
+or from a completed checkpointed run (see checkpointing.py).
+
+Usage:
+    python report_writer_benchmark.py --notes notes.json --runs 3
+    python report_writer_benchmark.py --thread-id coffee-run --db research_checkpoints.db
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+import complete_research_agent
+
+console = Console()
+
+async def load_state_from_checkpoint(thread_id: str, db_path: str) -> dict:
+    """Load the research brief and notes of a checkpointed run."""
+    from checkpointing import sqlite_checkpointer
+
+    async with sqlite_checkpointer(db_path) as checkpointer:
+        graph = complete_research_agent.build_agent(checkpointer=checkpointer)
+        snapshot = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+    return {
+        "research_brief": snapshot.values.get("research_brief", ""),
+        "notes": snapshot.values.get("notes", []),
+    }
+
+async def time_report_writing(state: dict, mode: str, runs: int) -> dict:
+    """Time final_report_generation in one writing mode.
+
+    Outline runs that fell back to the single-call writer are counted in
+    "fallback_runs" and excluded from the latency statistics.
+    """
+    complete_research_agent.report_writing_mode = mode
+    complete_research_agent.stream_final_report = False
+
+    ## Record whether the section path produced the report (None means it fell back)
+    write_by_sections = complete_research_agent.write_report_by_sections
+    section_reports = []
+
+    async def recording_write_by_sections(*args, **kwargs):
+        report = await write_by_sections(*args, **kwargs)
+        section_reports.append(report is not None)
+        return report
+
+    complete_research_agent.write_report_by_sections = recording_write_by_sections
+    latencies = []
+    fallback_runs = 0
+    report = ""
+    try:
+        for _ in range(runs):
+            section_reports.clear()
+            start = time.perf_counter()
+            result = await complete_research_agent.final_report_generation(state)
+            elapsed = time.perf_counter() - start
+            if mode == "outline" and not any(section_reports):
+                fallback_runs += 1
+                continue
+            latencies.append(elapsed)
+            report = result["final_report"]
+    finally:
+        complete_research_agent.write_report_by_sections = write_by_sections
+
+    return {
+        "mode": mode,
+        "runs": len(latencies),
+        "fallback_runs": fallback_runs,
+        "mean_s": statistics.mean(latencies) if latencies else None,
+        "min_s": min(latencies) if latencies else None,
+        "report_chars": len(report),
+    }
+
+async def run_benchmark(state: dict, runs: int):
+    """Benchmark both writing modes and print a comparison table."""
+    results = [
+        await time_report_writing(state, "single", runs),
+        await time_report_writing(state, "outline", runs),
+    ]
+
+    table = Table(title="Report Writer Latency", show_header=True, header_style="bold magenta")
+    table.add_column("Mode", style="cyan")
+    table.add_column("Mean (s)", justify="right")
+    table.add_column("Min (s)", justify="right")
+    table.add_column("Report chars", justify="right")
+    table.add_column("Fallbacks", justify="right")
+    for result in results:
+        timed = result["mean_s"] is not None
+        table.add_row(
+            result["mode"],
+            f"{result['mean_s']:.1f}" if timed else "-",
+            f"{result['min_s']:.1f}" if timed else "-",
+            str(result["report_chars"]),
+            str(result["fallback_runs"]),
+        )
+    console.print(table)
+
+    single, outline = results
+    if outline["fallback_runs"]:
+        console.print(
+            f"[yellow]{outline['fallback_runs']} of {runs} outline runs fell back to the single-call "
+            f"writer and are excluded from its latency[/yellow]"
+        )
+    if outline["mean_s"]:
+        console.print(f"[bold green]Outline-first speedup: {single['mean_s'] / outline['mean_s']:.2f}x[/bold green]")
+    else:
+        console.print("[red]No outline run wrote its report section by section - no speedup to report[/red]")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark single-call vs outline-first report writing.")
+    parser.add_argument("--notes", help="JSON file with research_brief and notes")
+    parser.add_argument("--thread-id", help="Load notes from this checkpointed thread instead")
+    parser.add_argument("--db", default="research_checkpoints.db", help="SQLite checkpoint database path")
+    parser.add_argument("--runs", type=int, default=1, help="Runs per writing mode")
+    args = parser.parse_args()
+
+    if args.notes:
+        with open(args.notes, encoding="utf-8") as f:
+            state = json.load(f)
+    elif args.thread_id:
+        state = asyncio.run(load_state_from_checkpoint(args.thread_id, args.db))
+    else:
+        parser.error("either --notes or --thread-id is required")
+
+    asyncio.run(run_benchmark(state, args.runs))
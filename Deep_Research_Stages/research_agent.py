@@ -12,7 +12,7 @@ from typing_extensions import Literal
 
 from langgraph.graph import StateGraph, START, END
 from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage, filter_messages
-from langchain.chat_models import init_chat_model
+from model_scheduler import init_scheduled_model
 
 from state_research import ResearcherState, ResearcherOutputState
 from research_stage_prompt.prompts import tavily_search, get_today_str, think_tool
@@ -25,10 +25,10 @@ tools = [tavily_search, think_tool]
 tools_by_name = {tool.name: tool for tool in tools}
 
 # Initialize models
-model = init_chat_model(model="ollama:llama3.1:8b")
+model = init_scheduled_model(model="ollama:llama3.1:8b")
 model_with_tools = model.bind_tools(tools)
-summarization_model = init_chat_model(model="ollama:granite3.3:8b")
-compress_model = init_chat_model(model="ollama:granite3.3:8b", max_tokens=32000)
+summarization_model = init_scheduled_model(model="ollama:granite3.3:8b", priority="bulk")
+compress_model = init_scheduled_model(model="ollama:granite3.3:8b", max_tokens=32000)
 
 ## AGENT NODES
 
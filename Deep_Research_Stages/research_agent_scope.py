@@ -14,13 +14,15 @@ whether sufficient context exists to proceed with research.
 from datetime import datetime
 from typing_extensions import Literal
 
-from langchain.chat_models import init_chat_model
+from model_scheduler import init_scheduled_model
+from structured_output import with_schema_output
 from langchain_core.messages import HumanMessage, AIMessage, get_buffer_string
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Command
 
-from deep_research_prompts.prompts import clarify_with_user_instructions, transform_messages_into_research_topic_prompt
-from state_scope import AgentState, ClarifyWithUser, ResearchQuestion, AgentInputState
+from deep_research_prompts.prompts import clarify_with_user_instructions, transform_messages_into_research_topic_prompt, scope_in_one_pass_prompt
+from state_scope import AgentState, ClarifyWithUser, ResearchQuestion, ScopeDecision, AgentInputState
 
 ## UTILITY FUNCTIONS
 
@@ -38,7 +40,43 @@ def get_today_str() -> str:
 ## CONFIGURATION
 
 ## Initialize model
-model = init_chat_model(model="ollama:llama3.1:8b", temperature=0.4)
+model = init_scheduled_model(model="ollama:llama3.1:8b", priority="high", temperature=0.4)
+
+## Scoping mode:
+## "sequential": clarification check, then research brief (two model round trips)
+## "speculative": the brief is written while the clarification check runs; it is used
+##                when no clarification is needed and discarded otherwise
+## "combined": clarification decision and research brief in one structured call
+scoping_mode = "speculative"
+
+## HELPER FUNCTIONS
+
+def generate_research_brief(messages: str) -> str:
+    """Generate a research brief from a conversation rendered with get_buffer_string."""
+    ## Set up schema-constrained structured output model
+    structured_output_model = with_schema_output(model, ResearchQuestion)
+
+    ## Generate research brief from conversation history
+    response = structured_output_model.invoke([
+        HumanMessage(content=transform_messages_into_research_topic_prompt.format(
+            messages=messages,
+            date=get_today_str()
+        ))
+    ])
+    return response.research_brief
+
+def check_clarification(messages: str) -> ClarifyWithUser:
+    """Decide whether the conversation needs a clarifying question."""
+    ## Set up schema-constrained structured output model
+    structured_output_model = with_schema_output(model, ClarifyWithUser)
+
+    ## Invoke the model with clarification instructions
+    return structured_output_model.invoke([
+        HumanMessage(content=clarify_with_user_instructions.format(
+            messages=messages, 
+            date=get_today_str()
+        ))
+    ])
 
 ## WORKFLOW NODES
 
@@ -48,28 +86,49 @@ def clarify_with_user(state: AgentState) -> Command[Literal["write_research_brie
 
     Uses structured output to make deterministic decisions and avoid hallucination.
     Routes to either research brief generation or ends with a clarification question.
+    Depending on scoping_mode, the research brief is also produced here (speculatively
+    or in the same call) so write_research_brief does not need another round trip.
     """
-    ## Set up structured output model
-    structured_output_model = model.with_structured_output(ClarifyWithUser)
-
-    ## Invoke the model with clarification instructions
-    response = structured_output_model.invoke([
-        HumanMessage(content=clarify_with_user_instructions.format(
-            messages=get_buffer_string(messages=state["messages"]), 
-            date=get_today_str()
-        ))
-    ])
+    messages = get_buffer_string(messages=state["messages"])
+    research_brief = None
+
+    if scoping_mode == "combined":
+        ## Clarification decision and research brief in one structured call
+        response = with_schema_output(model, ScopeDecision).invoke([
+            HumanMessage(content=scope_in_one_pass_prompt.format(
+                messages=messages,
+                date=get_today_str()
+            ))
+        ])
+        research_brief = response.research_brief or None
+    elif scoping_mode == "speculative":
+        ## Start writing the brief while the clarification check runs
+        executor = ContextThreadPoolExecutor(max_workers=1)
+        brief_future = executor.submit(generate_research_brief, messages)
+        try:
+            response = check_clarification(messages)
+            if not response.need_clarification:
+                try:
+                    research_brief = brief_future.result()
+                except Exception as e:
+                    ## write_research_brief regenerates it, as without speculation
+                    print(f"Speculative research brief failed, regenerating it: {e}")
+        finally:
+            ## A brief that is no longer needed finishes in the background and is discarded
+            executor.shutdown(wait=False)
+    else:
+        response = check_clarification(messages)
 
     ## Route based on clarification need
     if response.need_clarification:
         return Command(
             goto=END, 
-            update={"messages": [AIMessage(content=response.question)]}
+            update={"messages": [AIMessage(content=response.question)], "speculative_brief": None}
         )
     else:
         return Command(
             goto="write_research_brief", 
-            update={"messages": [AIMessage(content=response.verification)]}
+            update={"messages": [AIMessage(content=response.verification)], "speculative_brief": research_brief}
         )
 
 def write_research_brief(state: AgentState):
@@ -77,23 +136,18 @@ def write_research_brief(state: AgentState):
     Transform the conversation history into a comprehensive research brief.
 
     Uses structured output to ensure the brief follows the required format
-    and contains all necessary details for effective research.
+    and contains all necessary details for effective research. A brief already
+    produced by clarify_with_user is used as is.
     """
-    ## Set up structured output model
-    structured_output_model = model.with_structured_output(ResearchQuestion)
-
-    ## Generate research brief from conversation history
-    response = structured_output_model.invoke([
-        HumanMessage(content=transform_messages_into_research_topic_prompt.format(
-            messages=get_buffer_string(state.get("messages", [])),
-            date=get_today_str()
-        ))
-    ])
+    research_brief = state.get("speculative_brief")
+    if not research_brief:
+        research_brief = generate_research_brief(get_buffer_string(state.get("messages", [])))
 
     ## Update state with generated research brief and pass it to the supervisor
     return {
-        "research_brief": response.research_brief,
-        "supervisor_messages": [HumanMessage(content=f"{response.research_brief}.")]
+        "research_brief": research_brief,
+        "speculative_brief": None,
+        "supervisor_messages": [HumanMessage(content=f"{research_brief}.")]
     }
 
 ## GRAPH CONSTRUCTION
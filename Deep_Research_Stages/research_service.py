@@ -0,0 +1,471 @@
+## Research HTTP Service
+## Long-running async HTTP service around the full research agent with job submission,
+## SSE progress and report-token streaming, admission control and graceful draining
+
+"""Deep Research HTTP Service.
+
+Endpoints:
+- POST /jobs                 submit {"question": ...}; returns 202 with the job ID
+- GET  /jobs/{job_id}        job status, timings and (when finished) the report
+- GET  /jobs/{job_id}/events SSE stream of status, progress and report token events
+                             (reconnects resume after the Last-Event-ID header)
+
+When a job finishes, its token events are folded into one "report" event carrying
+the whole streamed text, so finished jobs kept for polling hold a handful of events
+instead of one per token. Clients that see "report" after some tokens should replace
+the text they streamed with it.
+- GET  /health               queue depth, running jobs, draining flag, scheduler and limiter metrics
+
+Load is controlled at admission:
+- At most max_concurrent_runs research runs execute at once
+- At most max_queued_jobs jobs wait for a worker; beyond that POST /jobs returns 503
+- Each client (X-Client-Id header, else the remote address) may have at most
+  max_jobs_per_client queued or running jobs; beyond that POST /jobs returns 429
+
+On shutdown the service stops admitting jobs, lets queued and running jobs finish
+for up to drain_timeout_seconds, and cancels whatever is left.
+
+For local testing without Ollama or Tavily, --stand-in serves a small stand-in graph
+that emits the same progress and report token events as the real agent.
+
+Requires the optional starlette and uvicorn packages.
+
+Usage:
+    python research_service.py --port 8000
+    python research_service.py --stand-in
+    curl -X POST localhost:8000/jobs -H "X-Client-Id: alice" -d '{"question": "..."}'
+    curl -N localhost:8000/jobs/<job_id>/events
+"""
+
+import argparse
+import asyncio
+import bisect
+import collections
+import json
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage
+from rich.console import Console
+
+from adaptive_concurrency import limiter_metrics, print_limiter_metrics
+from model_scheduler import print_scheduler_metrics, scheduler_metrics
+from source_registry import with_source_registry
+
+console = Console()
+
+## CONFIGURATION
+
+## Research runs executing at once (each run fans out to several researchers)
+max_concurrent_runs = 2
+## Jobs waiting for a free worker before new submissions are rejected
+max_queued_jobs = 16
+## Queued plus running jobs allowed per client
+max_jobs_per_client = 2
+## Time given to queued and running jobs to finish on shutdown
+drain_timeout_seconds = 600.0
+## Finished jobs kept for status polling before the oldest are forgotten
+max_finished_jobs = 1000
+
+class AdmissionError(Exception):
+    """Raised when a job cannot be admitted; carries the HTTP status code to return."""
+
+    def __init__(self, status_code: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+
+## JOBS
+
+class ResearchJob:
+    """One research request with its status and event log."""
+
+    def __init__(self, question: str, client_id: str):
+        self.id = uuid.uuid4().hex
+        self.question = question
+        self.client_id = client_id
+        self.status = "queued"
+        self.final_report = None
+        self.clarification = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        ## (event ID, event, data) emitted so far, so late or reconnecting SSE clients can replay
+        self.events = []
+        self._next_event_id = 1
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "needs_clarification", "failed", "cancelled")
+
+    def _append(self, event: str, data: dict):
+        self.events.append((self._next_event_id, event, data))
+        self._next_event_id += 1
+        self._changed.notify_all()
+
+    async def emit(self, event: str, data: dict):
+        """Append an event to the job log and wake SSE subscribers."""
+        async with self._changed:
+            self._append(event, data)
+
+    async def set_status(self, status: str):
+        ## The final status event is appended together with the status, so followers
+        ## never see a finished job without it
+        async with self._changed:
+            self.status = status
+            if self.finished:
+                self._fold_report_tokens()
+            self._append("status", {"status": status})
+
+    def _fold_report_tokens(self):
+        """Replace the token events with one "report" event in place of the last token.
+
+        It keeps the last token's ID, so clients that already read every token never see
+        it and clients resuming from an earlier ID receive the whole text at once.
+        """
+        tokens = [(event_id, data) for event_id, event, data in self.events if event == "token"]
+        if not tokens:
+            return
+        report = ("report", {"text": "".join(data["text"] for _, data in tokens)})
+        last_token_id = tokens[-1][0]
+        self.events = [
+            (event_id, *report) if event_id == last_token_id else (event_id, event, data)
+            for event_id, event, data in self.events
+            if event != "token" or event_id == last_token_id
+        ]
+
+    async def follow(self, after: int = 0):
+        """Yield (event_id, event, data) for events after ID `after` until the job finishes."""
+        last_id = after
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._next_event_id - 1 > last_id or self.finished)
+                start = bisect.bisect_right(self.events, last_id, key=lambda e: e[0])
+                events = self.events[start:]
+            for event_id, event, data in events:
+                yield event_id, event, data
+            if events:
+                last_id = events[-1][0]
+            if self.finished and last_id >= self._next_event_id - 1:
+                return
+
+    def to_dict(self) -> dict:
+        queued_s = (self.started_at or time.time()) - self.submitted_at
+        run_s = ((self.finished_at or time.time()) - self.started_at) if self.started_at else None
+        return {
+            "job_id": self.id,
+            "client_id": self.client_id,
+            "status": self.status,
+            "question": self.question,
+            "final_report": self.final_report,
+            "clarification": self.clarification,
+            "error": self.error,
+            "timings": {"queued_s": queued_s, "run_s": run_s},
+        }
+
+## SERVICE
+
+class ResearchService:
+    """Admission-controlled job queue with a fixed pool of research workers."""
+
+    def __init__(
+        self,
+        graph=None,
+        max_concurrent: int = max_concurrent_runs,
+        max_queued: int = max_queued_jobs,
+        max_per_client: int = max_jobs_per_client,
+    ):
+        """Create the service.
+
+        Args:
+            graph: Compiled research workflow (defaults to complete_research_agent.agent)
+            max_concurrent: Research runs executing at once
+            max_queued: Jobs allowed to wait for a worker
+            max_per_client: Queued plus running jobs allowed per client
+        """
+        if graph is None:
+            from complete_research_agent import agent as graph
+        self.graph = graph
+        self.max_concurrent = max_concurrent
+        self.max_per_client = max_per_client
+
+        self.jobs = collections.OrderedDict()
+        self._queue = asyncio.Queue(maxsize=max_queued)
+        self._active_per_client = collections.Counter()
+        self._running = {}
+        self._workers = []
+        self.draining = False
+
+    async def start(self):
+        """Start the worker pool."""
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent)]
+
+    ## ADMISSION
+
+    async def submit(self, question: str, client_id: str) -> ResearchJob:
+        """Admit a research job or raise AdmissionError."""
+        if self.draining:
+            raise AdmissionError(503, "service is shutting down")
+        if self._active_per_client[client_id] >= self.max_per_client:
+            raise AdmissionError(429, f"client already has {self.max_per_client} active jobs")
+
+        job = ResearchJob(question, client_id)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise AdmissionError(503, "job queue is full, retry later")
+
+        self._active_per_client[client_id] += 1
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        await job.set_status("queued")
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    ## EXECUTION
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            task = asyncio.create_task(self._run(job))
+            self._running[job.id] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                ## Worker cancelled at the end of a drain - cancel the run with it
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise
+            finally:
+                self._running.pop(job.id, None)
+                self._queue.task_done()
+
+    async def _run(self, job: ResearchJob):
+        job.started_at = time.time()
+        await job.set_status("running")
+        final_state = {}
+        ## Ask the writer to stream report tokens (see complete_research_agent.stream_final_report)
+        config = with_source_registry()
+        config["configurable"]["stream_report"] = True
+        try:
+            async for namespace, mode, chunk in self.graph.astream(
+                {"messages": [HumanMessage(content=job.question)]},
+                config=config,
+                stream_mode=["updates", "custom", "values"],
+                subgraphs=True,
+            ):
+                if mode == "custom" and "report_token" in chunk:
+                    await job.emit("token", {"text": chunk["report_token"]})
+                elif mode == "updates":
+                    path = [part.split(":", 1)[0] for part in namespace]
+                    for node in chunk:
+                        await job.emit("progress", {"node": node, "path": path})
+                elif mode == "values" and not namespace:
+                    final_state = chunk
+
+            if final_state.get("final_report"):
+                job.final_report = final_state["final_report"]
+                status = "completed"
+            else:
+                messages = final_state.get("messages") or []
+                job.clarification = messages[-1].content if messages else None
+                status = "needs_clarification"
+        except asyncio.CancelledError:
+            job.error = "cancelled during shutdown"
+            status = "cancelled"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            status = "failed"
+
+        job.finished_at = time.time()
+        self._active_per_client[job.client_id] -= 1
+        if not self._active_per_client[job.client_id]:
+            del self._active_per_client[job.client_id]
+        await job.set_status(status)
+
+    ## SHUTDOWN
+
+    async def shutdown(self, timeout: float = drain_timeout_seconds):
+        """Stop admitting jobs, drain queued and running jobs, then cancel what is left."""
+        self.draining = True
+        console.print(f"[yellow]Draining {self._queue.qsize()} queued and {len(self._running)} running jobs[/yellow]")
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            console.print("[red]Drain timed out - cancelling remaining jobs[/red]")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        ## Jobs still queued never started
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.error = "cancelled during shutdown"
+            job.finished_at = time.time()
+            await job.set_status("cancelled")
+        print_scheduler_metrics()
+        print_limiter_metrics()
+
+    def health(self) -> dict:
+        return {
+            "draining": self.draining,
+            "queued": self._queue.qsize(),
+            "running": len(self._running),
+            "max_concurrent": self.max_concurrent,
+            "active_clients": len(self._active_per_client),
+            "scheduler": scheduler_metrics(),
+            "limiters": limiter_metrics(),
+        }
+
+## HTTP APPLICATION
+
+def _sse(event_id: int, event: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def create_app(service: ResearchService = None, graph=None, drain_timeout: float = drain_timeout_seconds):
+    """Create the Starlette application serving a ResearchService.
+
+    Args:
+        service: Service to expose (created from `graph` if omitted)
+        graph: Compiled research workflow for a new service
+        drain_timeout: Seconds to drain jobs on shutdown
+
+    Returns:
+        Starlette application; the service is available as app.state.service
+    """
+    try:
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse, StreamingResponse
+        from starlette.routing import Route
+    except ImportError as e:
+        raise ImportError("The research service requires starlette: pip install starlette uvicorn") from e
+
+    from contextlib import asynccontextmanager
+
+    service = service or ResearchService(graph)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await service.start()
+        yield
+        await service.shutdown(drain_timeout)
+
+    async def submit_job(request):
+        try:
+            body = await request.json()
+            question = body["question"].strip()
+        except (ValueError, KeyError, AttributeError):
+            return JSONResponse({"error": "expected a JSON body with a 'question' string"}, status_code=400)
+        if not question:
+            return JSONResponse({"error": "question is empty"}, status_code=400)
+
+        client_id = request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+        try:
+            job = await service.submit(question, client_id)
+        except AdmissionError as e:
+            return JSONResponse({"error": e.reason}, status_code=e.status_code, headers={"Retry-After": "30"})
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status, "events": f"/jobs/{job.id}/events"},
+            status_code=202,
+        )
+
+    async def job_status(request):
+        job = service.jobs.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"error": "unknown job"}, status_code=404)
+        return JSONResponse(job.to_dict())
+
+    async def job_events(request):
+        job = service.jobs.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"error": "unknown job"}, status_code=404)
+        try:
+            after = int(request.headers.get("last-event-id", 0))
+        except ValueError:
+            after = 0
+
+        async def stream():
+            async for event_id, event, data in job.follow(after):
+                yield _sse(event_id, event, data)
+
+        return StreamingResponse(
+            stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def health(request):
+        return JSONResponse(service.health())
+
+    app = Starlette(
+        routes=[
+            Route("/jobs", submit_job, methods=["POST"]),
+            Route("/jobs/{job_id}", job_status),
+            Route("/jobs/{job_id}/events", job_events),
+            Route("/health", health),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.service = service
+    return app
+
+## STAND-IN AGENT
+
+def build_stand_in_agent(step_seconds: float = 0.5):
+    """Build a small graph that behaves like the research agent without any model calls.
+
+    It walks through the same top-level nodes, sleeps step_seconds in each, and
+    streams a canned report through report_token events, so the service (admission,
+    SSE, draining) can be exercised locally without Ollama or Tavily.
+    """
+    from langgraph.config import get_stream_writer
+    from langgraph.graph import END, START, StateGraph
+
+    from state_scope import AgentInputState, AgentState
+
+    async def write_research_brief(state: AgentState):
+        await asyncio.sleep(step_seconds)
+        return {"research_brief": f"Research brief: {state['messages'][-1].content}"}
+
+    async def supervisor_subgraph(state: AgentState):
+        await asyncio.sleep(step_seconds)
+        return {"notes": ["Stand-in finding [1]."]}
+
+    async def final_report_generation(state: AgentState):
+        writer = get_stream_writer()
+        report = ""
+        for token in ["# Stand-in Report\n\n", state["research_brief"], "\n\n", "Stand-in finding [1].\n"]:
+            await asyncio.sleep(step_seconds / 4)
+            writer({"report_token": token})
+            report += token
+        return {"final_report": report, "messages": [AIMessage(content=report)]}
+
+    builder = StateGraph(AgentState, input_schema=AgentInputState)
+    builder.add_node("write_research_brief", write_research_brief)
+    builder.add_node("supervisor_subgraph", supervisor_subgraph)
+    builder.add_node("final_report_generation", final_report_generation)
+    builder.add_edge(START, "write_research_brief")
+    builder.add_edge("write_research_brief", "supervisor_subgraph")
+    builder.add_edge("supervisor_subgraph", "final_report_generation")
+    builder.add_edge("final_report_generation", END)
+    return builder.compile()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the deep research agent over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--drain-timeout", type=float, default=drain_timeout_seconds, help="Seconds to drain jobs on shutdown")
+    parser.add_argument("--stand-in", action="store_true", help="Serve a stand-in graph that makes no model calls")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(graph=build_stand_in_agent() if args.stand_in else None, drain_timeout=args.drain_timeout)
+    uvicorn.run(app, host=args.host, port=args.port, timeout_graceful_shutdown=int(args.drain_timeout))
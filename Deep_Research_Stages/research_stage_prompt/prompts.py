@@ -13,13 +13,17 @@ from typing_extensions import Annotated, List, Literal
 import os
 from dotenv import load_dotenv
 
-from langchain.chat_models import init_chat_model 
+from model_scheduler import init_scheduled_model
+from structured_output import with_schema_output
 from langchain_core.messages import HumanMessage
 from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langchain_core.tools import tool, InjectedToolArg
 from tavily import TavilyClient
 
 from state_research import Summary
+from source_registry import current_source_registry
+from adaptive_concurrency import get_limiter
 from deep_research_prompts.prompts import summarize_webpage_prompt
 
 ## UTILITY FUNCTIONS
@@ -44,10 +48,16 @@ def get_current_dir() -> Path:
 
 ## CONFIGURATIONS
 
-summarization_model = init_chat_model(model="ollama:llama3.1:8b", temperature=0.4)
+## Researchers often find the same page at once; one sampled summary can serve all of them
+summarization_model = init_scheduled_model(model="ollama:llama3.1:8b", priority="bulk", temperature=0.4, coalesce=True)
 load_dotenv("api_connect.env")
 tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
 
+## Adaptive limiters shared by every researcher in the process
+## They bound in-flight Tavily searches and summarization calls based on observed latency
+search_limiter = get_limiter("search")
+summarization_limiter = get_limiter("summarization")
+
 
 ## SEARCH FUNCTIONS
 
@@ -72,12 +82,13 @@ def tavily_search_multiple(
     ## Execute searches sequentially. Note: yon can use AsyncTavilyClient to parallelize this step.
     search_docs = []
     for query in search_queries:
-        result = tavily_client.search(
-            query,
-            max_results=max_results,
-            include_raw_content=include_raw_content,
-            topic=topic
-        )
+        with search_limiter.slot():
+            result = tavily_client.search(
+                query,
+                max_results=max_results,
+                include_raw_content=include_raw_content,
+                topic=topic
+            )
         search_docs.append(result)
 
     return search_docs
@@ -92,16 +103,17 @@ def summarize_webpage_content(webpage_content: str) -> str:
         Formatted summary with key excerpts
     """
     try:
-        ## Set up structured output model for summarization
-        structured_model = summarization_model.with_structured_output(Summary)
+        ## Set up schema-constrained structured output model for summarization
+        structured_model = with_schema_output(summarization_model, Summary)
         
-        ## Generate summary
-        summary = structured_model.invoke([
-            HumanMessage(content=summarize_webpage_prompt.format(
-                webpage_content=webpage_content, 
-                date=get_today_str()
-            ))
-        ])
+        ## Generate summary (admission controlled by the adaptive summarization limiter)
+        with summarization_limiter.slot():
+            summary = structured_model.invoke([
+                HumanMessage(content=summarize_webpage_prompt.format(
+                    webpage_content=webpage_content, 
+                    date=get_today_str()
+                ))
+            ])
         
         ## Format summary with clear structure
         formatted_summary = (
@@ -145,13 +157,27 @@ def process_search_results(unique_results: dict) -> dict:
     """
     summarized_results = {}
     
+    ## Summarize pages concurrently; the summarization limiter decides how many actually run,
+    ## so threads beyond its maximum would only block. The context executor carries the
+    ## run config (callbacks, source registry) into the summarization calls
+    to_summarize = [url for url, result in unique_results.items() if result.get("raw_content")]
+    summaries = {}
+    if to_summarize:
+        workers = min(len(to_summarize), summarization_limiter.max_limit)
+        with ContextThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                url: executor.submit(summarize_webpage_content, unique_results[url]['raw_content'])
+                for url in to_summarize
+            }
+            summaries = {url: future.result() for url, future in futures.items()}
+    
     for url, result in unique_results.items():
         ## Use existing content if no raw content for summarization
         if not result.get("raw_content"):
             content = result['content']
         else:
             ## Summarize raw content for better processing
-            content = summarize_webpage_content(result['raw_content'])
+            content = summaries[url]
         
         summarized_results[url] = {
             'title': result['title'],
@@ -168,14 +194,19 @@ def format_search_output(summarized_results: dict) -> str:
         
     Returns:
         Formatted string of search results with clear source separation
+    
+    Each source is registered in the run's source registry and labelled with its
+    stable source ID (e.g. [S12]) so citations can be deduplicated across researchers.
     """
     if not summarized_results:
         return "No valid search results found. Please try different search queries or use a different search API."
     
     formatted_output = "Search results: \n\n"
     
-    for i, (url, result) in enumerate(summarized_results.items(), 1):
-        formatted_output += f"\n\n--- SOURCE {i}: {result['title']} ---\n"
+    registry = current_source_registry()
+    for url, result in summarized_results.items():
+        source_id = registry.register(url, result['title'])
+        formatted_output += f"\n\n--- SOURCE [{source_id}]: {result['title']} ---\n"
         formatted_output += f"URL: {url}\n\n"
         formatted_output += f"SUMMARY:\n{result['content']}\n\n"
         formatted_output += "-" * 80 + "\n"
@@ -0,0 +1,323 @@
+## Source Registry
+## Keeps track of every source emitted by the search tools so that citations can be
+## numbered once, deduplicated across researchers and handed to the final report writer
+
+"""Global Source Registry for Pre-Numbered Citations.
+
+This module implements a registry of web sources that is filled as
+format_search_output() emits search results:
+- Every unique URL gets a stable source ID (e.g. [S12]) for the lifetime of the run
+- URLs are normalized so the same page found by different researchers is deduplicated
+- Research notes can be compacted so they refer to citation numbers instead of
+  repeating full source blocks, with one deduplicated source table for the writer
+
+Each top-level run gets its own registry through its config (see
+with_source_registry), which the search tools and the report writer of that run
+find with current_source_registry(). IDs are stable across the run's parallel
+researchers, and concurrent runs in one process (research_service, batch_research)
+neither share an ID space nor accumulate each other's sources. Runs started without
+one fall back to a process-wide registry. A resumed checkpointed run restores the
+registry of the interrupted run from its checkpoints (see
+checkpointing.restore_source_registry), so the IDs in its notes still resolve.
+"""
+
+import re
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+from langchain_core.runnables.config import ensure_config
+
+## Matches source IDs emitted by format_search_output, e.g. [S12]
+SOURCE_ID_PATTERN = re.compile(r"\[(S\d+)\]")
+## Matches the source headers written by format_search_output, e.g. "--- SOURCE [S12]: Title ---\nURL: https://..."
+SOURCE_BLOCK_PATTERN = re.compile(r"--- SOURCE \[(S\d+)\]: (.*?) ---\r?\nURL: (\S+)")
+## Matches source list entries, e.g. "[1] Source Title: https://..."
+SOURCE_LINE_PATTERN = re.compile(
+    r"^\s*(?:[-*]\s*)?\[(\d+)\]\s*(.*?)[\s:\-–]*<?(https?://[^\s>)]+)>?\s*$"
+)
+## Matches headings of source lists, e.g. "### Sources" or "**List of All Relevant Sources**"
+SOURCES_HEADING_PATTERN = re.compile(
+    r"^\s*(?:#{1,6}\s*)?(?:\*\*)?\s*(?:List of (?:All )?(?:Relevant )?)?Sources\b[^\n]*?(?:\*\*)?\s*:?\s*$",
+    re.IGNORECASE,
+)
+## Matches markdown links, e.g. [Title](https://...)
+MARKDOWN_LINK_PATTERN = re.compile(r"\[([^\]]+)\]\((https?://[^\s)]+)\)")
+## Matches bare URLs
+URL_PATTERN = re.compile(r"https?://[^\s<>\]\)\"']+")
+## Matches numeric citations, e.g. [3] or [1, 2]
+CITATION_PATTERN = re.compile(r"\[(\d+(?:\s*,\s*\d+)*)\]")
+## Matches a trailing Sources section written by a model
+SOURCES_SECTION_PATTERN = re.compile(r"\n#{1,6}\s*(?:\*\*)?Sources(?:\*\*)?\s*\n.*\Z", re.DOTALL | re.IGNORECASE)
+
+## Placeholder used while rewriting notes so rewritten citations are not rewritten twice
+_PLACEHOLDER = "\x00{}\x00"
+_PLACEHOLDER_PATTERN = re.compile(r"\x00(S\d+)\x00")
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for deduplication.
+
+    Lowercases the scheme and host, drops the fragment and any trailing slash
+    and trailing punctuation picked up from surrounding prose.
+    """
+    url = url.strip().rstrip(".,;:")
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+class SourceRegistry:
+    """Thread-safe registry assigning stable IDs to unique source URLs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids_by_url = {}
+        self._sources = {}
+        self._next_number = 1
+
+    def register(self, url: str, title: str = "") -> str:
+        """Register a source and return its stable ID.
+
+        Args:
+            url: Source URL
+            title: Source title, kept from the first registration that provides one
+
+        Returns:
+            Source ID such as "S12"
+        """
+        key = normalize_url(url)
+        with self._lock:
+            source_id = self._ids_by_url.get(key)
+            if source_id is None:
+                source_id = f"S{self._next_number}"
+                self._next_number += 1
+                self._ids_by_url[key] = source_id
+                self._sources[source_id] = {"url": url.strip(), "title": title.strip()}
+            elif title and not self._sources[source_id]["title"]:
+                self._sources[source_id]["title"] = title.strip()
+            return source_id
+
+    def restore(self, source_id: str, url: str, title: str = ""):
+        """Re-register a source under the ID an earlier registry gave it.
+
+        Used when resuming a checkpointed run, whose notes already cite the IDs of
+        the interrupted run. New sources are numbered after the restored ones.
+        """
+        key = normalize_url(url)
+        with self._lock:
+            if source_id in self._sources or key in self._ids_by_url:
+                return
+            self._ids_by_url[key] = source_id
+            self._sources[source_id] = {"url": url.strip(), "title": title.strip()}
+            self._next_number = max(self._next_number, int(source_id[1:]) + 1)
+
+    def restore_from_text(self, text: str) -> int:
+        """Restore every source block written by format_search_output in `text`.
+
+        Returns:
+            Number of source blocks found
+        """
+        matches = SOURCE_BLOCK_PATTERN.findall(text)
+        for source_id, title, url in matches:
+            self.restore(source_id, url, title)
+        return len(matches)
+
+    def lookup(self, url: str):
+        """Return the ID of a registered URL, or None if it is unknown."""
+        with self._lock:
+            return self._ids_by_url.get(normalize_url(url))
+
+    def __contains__(self, source_id: str) -> bool:
+        with self._lock:
+            return source_id in self._sources
+
+    def get(self, source_id: str) -> dict:
+        """Return the {"url", "title"} entry for a source ID."""
+        with self._lock:
+            return dict(self._sources[source_id])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sources)
+
+    def clear(self):
+        """Forget all registered sources."""
+        with self._lock:
+            self._ids_by_url.clear()
+            self._sources.clear()
+            self._next_number = 1
+
+    def _compact_note(self, note: str) -> str:
+        """Rewrite one note so every known source is referenced by a placeholder ID."""
+        ## Source lists map the note's local citation numbers to URLs
+        local_ids = {}
+        kept_lines = []
+        for line in note.splitlines():
+            match = SOURCE_LINE_PATTERN.match(line)
+            if match:
+                number, title, url = match.groups()
+                local_ids[number] = self.register(url, title.strip(" *:-"))
+            else:
+                kept_lines.append(line)
+        ## Drop the headings left behind by the removed source lists
+        if local_ids:
+            kept_lines = [line for line in kept_lines if not SOURCES_HEADING_PATTERN.match(line)]
+        note = "\n".join(kept_lines)
+
+        def replace_link(match):
+            source_id = self.register(match.group(2), match.group(1))
+            return f"{match.group(1)} {_PLACEHOLDER.format(source_id)}"
+
+        def replace_url(match):
+            source_id = self.lookup(match.group(0))
+            return _PLACEHOLDER.format(source_id) if source_id else match.group(0)
+
+        def replace_local_citation(match):
+            numbers = [n.strip() for n in match.group(1).split(",")]
+            if not all(n in local_ids for n in numbers):
+                return match.group(0)
+            return "".join(_PLACEHOLDER.format(local_ids[n]) for n in numbers)
+
+        note = MARKDOWN_LINK_PATTERN.sub(replace_link, note)
+        note = URL_PATTERN.sub(replace_url, note)
+        ## IDs from another registry (e.g. notes checkpointed before a restart) are left as they are
+        note = SOURCE_ID_PATTERN.sub(
+            lambda m: _PLACEHOLDER.format(m.group(1)) if m.group(1) in self else m.group(0), note
+        )
+        note = CITATION_PATTERN.sub(replace_local_citation, note)
+        ## Collapse repeated citations of the same source, e.g. "[Blog](url) [2]"
+        note = re.sub(r"(\x00S\d+\x00)(?:\s*\1)+", r"\1", note)
+        return note.strip()
+
+    def compact_notes(self, notes: list[str]) -> tuple[list[str], list[dict]]:
+        """Compact research notes so they refer to pre-numbered citations.
+
+        Source blocks, source lists and URLs in the notes are replaced with citation
+        numbers. Numbers are assigned sequentially (1, 2, 3, ...) in order of first
+        appearance across all notes, so the same URL found by different researchers
+        gets a single number.
+
+        Args:
+            notes: Compressed research notes from the researchers
+
+        Returns:
+            Tuple of (compact notes, source table). Each source table entry is a dict
+            with "number", "id", "title" and "url".
+        """
+        compacted = [self._compact_note(note) for note in notes]
+
+        numbers = {}
+        for note in compacted:
+            for source_id in _PLACEHOLDER_PATTERN.findall(note):
+                if source_id not in numbers:
+                    numbers[source_id] = len(numbers) + 1
+
+        compact_notes = [
+            _PLACEHOLDER_PATTERN.sub(lambda m: f"[{numbers[m.group(1)]}]", note)
+            for note in compacted
+        ]
+        source_table = [
+            {"number": number, "id": source_id, **self.get(source_id)}
+            for source_id, number in numbers.items()
+        ]
+        return compact_notes, source_table
+
+## Process-wide registry used by runs started without their own
+source_registry = SourceRegistry()
+
+def with_source_registry(config: dict = None, registry: SourceRegistry = None) -> dict:
+    """Return a copy of a run config carrying a fresh SourceRegistry for one top-level run.
+
+    Args:
+        config: Run config (e.g. {"configurable": {"thread_id": ...}})
+        registry: Registry to use instead of a fresh one (e.g. one restored from checkpoints)
+
+    Returns:
+        Config whose configurable["source_registry"] is the run's registry
+    """
+    config = dict(config or {})
+    configurable = dict(config.get("configurable") or {})
+    if registry is not None:
+        configurable["source_registry"] = registry
+    configurable.setdefault("source_registry", SourceRegistry())
+    config["configurable"] = configurable
+    return config
+
+def current_source_registry() -> SourceRegistry:
+    """Registry of the current run (the process-wide registry outside one)."""
+    registry = ensure_config().get("configurable", {}).get("source_registry")
+    return registry if registry is not None else source_registry
+
+def format_source_table(source_table: list[dict]) -> str:
+    """Format a source table as one "[n] Title: URL" line per source."""
+    return "\n".join(
+        f"[{source['number']}] {source['title'] or source['url']}: {source['url']}"
+        for source in source_table
+    )
+
+class CitationRenumberer:
+    """Renumber citations in order of first use, incrementally across report chunks.
+
+    Chunks (e.g. report sections) must be passed in report order. Renumbering them one
+    by one gives the same result as a single pass over the stitched report, which lets
+    finished sections be delivered before later ones are written.
+    """
+
+    def __init__(self, source_table: list[dict], renumber: bool = True):
+        """Create a renumberer.
+
+        Args:
+            source_table: Source table returned by SourceRegistry.compact_notes()
+            renumber: Whether to renumber citations. Pass False when the report body
+                has already been delivered (e.g. streamed) and must not change; the
+                Sources section then keeps the source table numbers.
+        """
+        self.sources_by_number = {str(source["number"]): source for source in source_table}
+        self.renumber = renumber
+        self.numbers = {}
+
+    def _replace_citation(self, match):
+        numbers = [n.strip() for n in match.group(1).split(",")]
+        if not all(n in self.sources_by_number for n in numbers):
+            return match.group(0)
+        for n in numbers:
+            if n not in self.numbers:
+                self.numbers[n] = len(self.numbers) + 1 if self.renumber else int(n)
+        if not self.renumber:
+            return match.group(0)
+        return "".join(f"[{self.numbers[n]}]" for n in numbers)
+
+    def apply(self, text: str) -> str:
+        """Renumber the citations of the next chunk of the report."""
+        return CITATION_PATTERN.sub(self._replace_citation, text)
+
+    def sources_section(self) -> str:
+        """Return the ### Sources section for every source cited so far."""
+        if not self.numbers:
+            return ""
+        cited = sorted(
+            ({**self.sources_by_number[n], "number": new_number} for n, new_number in self.numbers.items()),
+            key=lambda source: source["number"],
+        )
+        return f"\n\n### Sources\n{format_source_table(cited)}\n"
+
+def strip_sources_section(report: str) -> str:
+    """Remove a trailing Sources section written by the model."""
+    return SOURCES_SECTION_PATTERN.sub("", report).rstrip()
+
+def finalize_citations(report: str, source_table: list[dict], renumber: bool = True) -> str:
+    """Renumber citations in a report and append a matching Sources section.
+
+    Citation numbers are renumbered sequentially in order of first use in the
+    report, any Sources section written by the model is replaced, and only
+    sources that are actually cited are listed.
+
+    Args:
+        report: Report text citing sources as [n] using source table numbers
+        source_table: Source table returned by SourceRegistry.compact_notes()
+        renumber: See CitationRenumberer
+
+    Returns:
+        Report with sequential citations and a deduplicated ### Sources section
+    """
+    renumberer = CitationRenumberer(source_table, renumber=renumber)
+    body = renumberer.apply(strip_sources_section(report))
+    return body + renumberer.sources_section()
@@ -32,6 +32,8 @@ class AgentState(MessagesState):
 
     ## Research brief generated from user conversation history
     research_brief: Optional[str]
+    ## Brief produced during scoping (speculatively or in one pass), consumed by write_research_brief
+    speculative_brief: Optional[str]
     ## Messages exchanged with the supervisor agent for coordination
     supervisor_messages: Annotated[Sequence[BaseMessage], add_messages]
     ## Raw unprocessed research notes collected during the research phase
@@ -61,4 +63,69 @@ class ResearchQuestion(BaseModel):
     
     research_brief: str = Field(
         description="A research question that will be used to guide the research.",
+    )
+
+class ScopeDecision(BaseModel):
+    """Schema for the clarification decision and research brief in a single call."""
+    
+    need_clarification: bool = Field(
+        description="Whether the user needs to be asked a clarifying question.",
+    )
+    question: str = Field(
+        description="A question to ask the user to clarify the report scope",
+    )
+    verification: str = Field(
+        description="Verify message that we will start research after the user has provided the necessary information.",
+    )
+    research_brief: str = Field(
+        description="A research question that will be used to guide the research. Empty if clarification is needed.",
+    )
+
+class ReportSection(BaseModel):
+    """Schema for one section of the final report outline."""
+    
+    title: str = Field(
+        description="Heading of the section.",
+    )
+    description: str = Field(
+        description="What the section should cover, in one or two sentences.",
+    )
+    finding_ids: List[int] = Field(
+        default_factory=list,
+        description="Numbers of the findings that contain information relevant to this section.",
+    )
+
+class ReportOutline(BaseModel):
+    """Schema for the structured outline of the final report."""
+    
+    title: str = Field(
+        description="Title of the report.",
+    )
+    sections: List[ReportSection] = Field(
+        description="Sections of the report, in reading order.",
+    )
+
+## EVALUATION SCHEMAS
+
+class Criteria(BaseModel):
+    """Judge verdict on whether one success criterion is captured in a research brief."""
+    
+    criteria_text: str = Field(
+        description="The specific success criteria being evaluated (e.g., 'Current age is 25', 'Monthly rent below 7k')",
+    )
+    reasoning: str = Field(
+        description="Detailed explanation of why this criteria is or isn't captured in the research brief, including specific evidence from the brief",
+    )
+    is_captured: bool = Field(
+        description="Whether this specific criteria is adequately captured in the research brief (True) or missing/inadequately addressed (False)",
+    )
+
+class NoAssumptions(BaseModel):
+    """Judge verdict on whether a research brief avoids unwarranted assumptions."""
+    
+    no_assumptions: bool = Field(
+        description="Whether the research brief avoids making unwarranted assumptions. True if the brief only includes information explicitly provided by the user, False if it makes assumptions beyond what was stated.",
+    )
+    reasoning: str = Field(
+        description="Detailed explanation of the evaluation decision, including specific examples of any assumptions found or confirmation that no assumptions were made beyond the user's explicit statements.",
     )
\ No newline at end of file
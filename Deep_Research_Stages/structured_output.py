@@ -0,0 +1,242 @@
+## Structured Output
+## Schema-constrained decoding with local validation and JSON repair for the small local models,
+## so malformed structured output is fixed in-process instead of failing a node
+
+"""Schema-Constrained Structured Output with Local Repair.
+
+8B local models regularly return almost-JSON for structured calls: code fences, a
+trailing comma, Python True/None, a raw newline inside a string, an object cut off
+before its closing brace, or the right object wrapped in an extra key. With
+with_structured_output such replies fail the scope nodes outright and make
+summarize_webpage_content fall back to raw truncated text.
+
+with_schema_output() returns a model that:
+1. Asks Ollama for schema-constrained decoding by passing the Pydantic JSON schema
+   as the `format` parameter (other chat models are called unconstrained)
+2. Validates the reply locally against the schema
+3. Repairs common JSON errors locally, without another model call
+4. Retries at most once, showing the model its invalid reply and the validation error
+5. Raises StructuredOutputError if the retry is invalid too
+
+Counts of calls, local repairs, retries and failures are reported by
+structured_output_metrics().
+"""
+
+import json
+import re
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel, ValidationError
+
+## CONFIGURATION
+
+## Pass the JSON schema as Ollama's `format` parameter (grammar-constrained decoding)
+use_schema_constrained_decoding = True
+
+## Extra model calls allowed when the reply cannot be parsed or repaired
+max_structured_output_retries = 1
+
+class StructuredOutputError(ValueError):
+    """Raised when a structured reply is still invalid after repair and retry."""
+
+## METRICS
+
+_metrics_lock = threading.Lock()
+_metrics = {"calls": 0, "valid_first_try": 0, "repaired": 0, "retries": 0, "failures": 0}
+
+def _count(name: str):
+    with _metrics_lock:
+        _metrics[name] += 1
+
+def structured_output_metrics() -> dict:
+    """Return counts of structured calls, local repairs, retries and failures."""
+    with _metrics_lock:
+        return dict(_metrics)
+
+## LOCAL REPAIR
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+def repair_json(text: str) -> str:
+    """Fix the JSON mistakes small models commonly make, without changing valid JSON.
+
+    Handles code fences and surrounding prose, smart quotes, Python literals
+    outside strings, trailing commas, raw control characters inside strings, and
+    output truncated before its closing quotes and brackets.
+    """
+    fenced = _FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    if start == -1:
+        return text
+    text = text[start:].replace("“", '"').replace("”", '"')
+
+    out = []
+    stack = []
+    in_string = escaped = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                char = "\\n"
+            elif char == "\t":
+                char = "\\t"
+            elif char == "\r":
+                char = "\\r"
+            out.append(char)
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            ## Drop a trailing comma before the closing bracket
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                ## Ignore anything after the top-level object
+                break
+        elif char.isalpha():
+            word = re.match(r"[A-Za-z]+", text[i:]).group(0)
+            out.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(char)
+        i += 1
+
+    ## Close whatever a truncated reply left open
+    if in_string:
+        out.append('"')
+    while out and (out[-1].isspace() or out[-1] == ","):
+        out.pop()
+    out.extend(reversed(stack))
+    return "".join(out)
+
+def _unwrap_candidates(data):
+    """Yield the parsed object and the objects models sometimes wrap it in."""
+    yield data
+    if isinstance(data, dict) and len(data) == 1:
+        inner = next(iter(data.values()))
+        if isinstance(inner, dict):
+            yield inner
+    if isinstance(data, dict) and isinstance(data.get("properties"), dict):
+        ## The model echoed the schema and filled in the property values
+        yield data["properties"]
+
+def parse_structured_output(text: str, schema: type[BaseModel]) -> tuple[BaseModel, bool]:
+    """Validate a model reply against a schema, repairing it locally if needed.
+
+    Returns:
+        (parsed object, whether a local repair was needed)
+
+    Raises:
+        StructuredOutputError: If the reply cannot be parsed even after repair
+    """
+    last_error = None
+    for repaired, candidate_text in ((False, text), (True, repair_json(text))):
+        try:
+            data = json.loads(candidate_text)
+        except json.JSONDecodeError as e:
+            last_error = e
+            continue
+        for candidate in _unwrap_candidates(data):
+            try:
+                return schema.model_validate(candidate), repaired or candidate is not data
+            except ValidationError as e:
+                last_error = e
+    raise StructuredOutputError(f"Invalid {schema.__name__} output: {last_error}")
+
+## STRUCTURED MODEL
+
+def _reply_text(response) -> str:
+    content = response.content
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content
+
+def _retry_messages(messages: list, reply: str, error: Exception) -> list:
+    return list(messages) + [
+        AIMessage(content=reply),
+        HumanMessage(content=(
+            f"Your reply was not valid JSON for the required schema: {error}\n"
+            "Reply again with only the corrected JSON object."
+        )),
+    ]
+
+class SchemaOutputModel:
+    """Chat model wrapper returning validated Pydantic objects (see with_schema_output)."""
+
+    def __init__(self, model, schema: type[BaseModel], max_retries: int = max_structured_output_retries):
+        self.schema = schema
+        self.max_retries = max_retries
+        self.model = model
+        if use_schema_constrained_decoding and _is_ollama(model):
+            self.model = model.bind(format=schema.model_json_schema())
+
+    def _parse(self, response, attempt: int):
+        parsed, repaired = parse_structured_output(_reply_text(response), self.schema)
+        if attempt == 0:
+            _count("repaired" if repaired else "valid_first_try")
+        elif repaired:
+            _count("repaired")
+        return parsed
+
+    def invoke(self, messages: list, config=None, **kwargs) -> BaseModel:
+        _count("calls")
+        for attempt in range(self.max_retries + 1):
+            response = self.model.invoke(messages, config, **kwargs)
+            try:
+                return self._parse(response, attempt)
+            except StructuredOutputError as e:
+                if attempt == self.max_retries:
+                    _count("failures")
+                    raise
+                _count("retries")
+                messages = _retry_messages(messages, _reply_text(response), e)
+
+    async def ainvoke(self, messages: list, config=None, **kwargs) -> BaseModel:
+        _count("calls")
+        for attempt in range(self.max_retries + 1):
+            response = await self.model.ainvoke(messages, config, **kwargs)
+            try:
+                return self._parse(response, attempt)
+            except StructuredOutputError as e:
+                if attempt == self.max_retries:
+                    _count("failures")
+                    raise
+                _count("retries")
+                messages = _retry_messages(messages, _reply_text(response), e)
+
+def _is_ollama(model) -> bool:
+    chat_model = getattr(model, "runnable", model)
+    return type(chat_model).__name__ == "ChatOllama"
+
+def with_schema_output(model, schema: type[BaseModel], max_retries: int = max_structured_output_retries) -> SchemaOutputModel:
+    """Wrap a chat model so invoke/ainvoke return a validated instance of `schema`.
+
+    Args:
+        model: Chat model (plain or ScheduledModel)
+        schema: Pydantic model describing the expected output
+        max_retries: Extra model calls allowed when repair fails
+
+    Returns:
+        SchemaOutputModel with invoke and ainvoke
+    """
+    return SchemaOutputModel(model, schema, max_retries)
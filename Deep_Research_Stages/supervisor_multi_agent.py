@@ -15,7 +15,7 @@ import asyncio
 
 from typing_extensions import Literal
 
-from langchain.chat_models import init_chat_model
+from model_scheduler import init_scheduled_model
 from langchain_core.messages import (
     HumanMessage, 
     BaseMessage, 
@@ -30,6 +30,7 @@ from deep_research_prompts.prompts import lead_researcher_prompt
 from research_agent import researcher_agent
 from state_supervisor_research import (SupervisorState, ConductResearch, ResearchComplete)
 from research_stage_prompt.prompts import get_today_str, think_tool
+from adaptive_concurrency import get_limiter
 
 def get_notes_from_tool_calls(messages: list[BaseMessage]) -> list[str]:
     """Extract research notes from ToolMessage objects in supervisor message history.
@@ -48,6 +49,94 @@ def get_notes_from_tool_calls(messages: list[BaseMessage]) -> list[str]:
     """
     return [tool_msg.content for tool_msg in filter_messages(messages, include_types="tool")]
 
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in a piece of text.
+
+    Uses the common ~4 characters per token heuristic, which is close enough
+    for budgeting prompts without loading a tokenizer for local models.
+    """
+    return len(text) // 4 + 1
+
+def digest_research_message(message: ToolMessage, max_chars: int = 400) -> ToolMessage:
+    """Replace a ConductResearch result with a short digest plus a handle.
+
+    The handle is the tool_call_id of the original research result. The full
+    findings stay in the supervisor message history, so
+    get_notes_from_tool_calls() and final report generation still see them.
+
+    Args:
+        message: ToolMessage returned by a ConductResearch call
+        max_chars: Maximum number of characters of findings kept in the digest
+
+    Returns:
+        ToolMessage with the same name and tool_call_id but digested content
+    """
+    content = str(message.content)
+    lines = [line.strip() for line in content.splitlines() if line.strip()]
+
+    ## Keep leading lines (headings and first statements), truncating the last one
+    digest = ""
+    for line in lines:
+        remaining = max_chars - len(digest)
+        if len(line) + 1 > remaining:
+            digest += line[:max(remaining - 3, 0)] + "..."
+            break
+        digest += line + "\n"
+
+    return ToolMessage(
+        content=(
+            f"[Digest of research result {message.tool_call_id} - full findings "
+            f"({len(content)} chars) are archived and will be used for the final report]\n"
+            f"{digest.rstrip()}"
+        ),
+        name=message.name,
+        tool_call_id=message.tool_call_id,
+        id=message.id,
+    )
+
+def bound_supervisor_context(
+    messages: list[BaseMessage],
+    token_budget: int,
+    keep_recent: int = 1,
+    digest_chars: int = 400,
+) -> list[BaseMessage]:
+    """Keep the supervisor prompt within a token budget.
+
+    Older ConductResearch results are digested, oldest first, until the estimated
+    prompt size fits the budget. The most recent research results are always kept
+    verbatim so the supervisor can reason about what it just learned. The input
+    messages are not modified.
+
+    Args:
+        messages: Supervisor message history
+        token_budget: Target number of tokens for the supervisor messages
+        keep_recent: Number of most recent research results never digested
+        digest_chars: Maximum number of characters kept per digest
+
+    Returns:
+        List of messages to send to the supervisor model
+    """
+    bounded = list(messages)
+    total_tokens = sum(estimate_tokens(str(m.content)) for m in bounded)
+    if total_tokens <= token_budget:
+        return bounded
+
+    research_indices = [
+        i for i, m in enumerate(bounded)
+        if isinstance(m, ToolMessage) and m.name == "ConductResearch"
+    ]
+    if keep_recent > 0:
+        research_indices = research_indices[:-keep_recent]
+
+    for i in research_indices:
+        digested = digest_research_message(bounded[i], max_chars=digest_chars)
+        total_tokens -= estimate_tokens(str(bounded[i].content)) - estimate_tokens(str(digested.content))
+        bounded[i] = digested
+        if total_tokens <= token_budget:
+            break
+
+    return bounded
+
 ## Ensure async compatibility for Jupyter environments
 try:
     import nest_asyncio
@@ -65,7 +154,7 @@ except ImportError:
 ## Agent Configuration
 
 supervisor_tools = [ConductResearch, ResearchComplete, think_tool]
-supervisor_model = init_chat_model(model="ollama:granite3.3:8b")
+supervisor_model = init_scheduled_model(model="ollama:granite3.3:8b", priority="high")
 supervisor_model_with_tools = supervisor_model.bind_tools(supervisor_tools)
 
 ## System constants
@@ -77,6 +166,19 @@ max_researcher_iterations = 6 # Calls to think_tool + ConductResearch
 ## This is passed to the lead_researcher_prompt to limit parallel research tasks
 max_concurrent_researchers = 3
 
+## Fixed cap on researcher agents actually running at once, shared across supervisors
+## The supervisor may request more parallel research; extra researchers wait for a slot.
+## Not adaptive: a researcher's latency reflects its topic's depth, not backend load
+researcher_limiter = get_limiter("researchers")
+
+## Token budget for the supervisor's message history (None disables digesting)
+## When exceeded, older ConductResearch results are sent to the supervisor as short
+## digests; the full findings are kept in state for the final report
+supervisor_context_token_budget = None
+
+class ResearcherError(RuntimeError):
+    """A researcher failed (e.g. the model server restarted) while its batch was running."""
+
 ## Supervisor Nodes
 
 async def supervisor(state: SupervisorState) -> Command[Literal["supervisor_tools"]]:
@@ -101,7 +203,12 @@ async def supervisor(state: SupervisorState) -> Command[Literal["supervisor_tool
         max_concurrent_research_units=max_concurrent_researchers,
         max_researcher_iterations=max_researcher_iterations
     )
-    messages = [SystemMessage(content=system_message)] + supervisor_messages
+    ## Digest older research results if the history exceeds the context budget
+    if supervisor_context_token_budget is not None:
+        supervisor_messages = bound_supervisor_context(
+            supervisor_messages, supervisor_context_token_budget
+        )
+    messages = [SystemMessage(content=system_message)] + list(supervisor_messages)
     
     ## Make decision about next research steps
     response = await supervisor_model_with_tools.ainvoke(messages)
@@ -179,19 +286,32 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
 
             # Handle ConductResearch calls (asynchronous)
             if conduct_research_calls:
+                async def run_researcher(research_topic: str):
+                    # Wait for a slot from the researcher limiter
+                    async with researcher_limiter.slot():
+                        return await researcher_agent.ainvoke({
+                            "researcher_messages": [
+                                HumanMessage(content=research_topic)
+                            ],
+                            "research_topic": research_topic
+                        })
+
                 # Launch parallel research agents
                 coros = [
-                    researcher_agent.ainvoke({
-                        "researcher_messages": [
-                            HumanMessage(content=tool_call["args"]["research_topic"])
-                        ],
-                        "research_topic": tool_call["args"]["research_topic"]
-                    }) 
+                    run_researcher(tool_call["args"]["research_topic"])
                     for tool_call in conduct_research_calls
                 ]
 
-                # Wait for all research to complete
-                tool_results = await asyncio.gather(*coros)
+                # Wait for all research to complete, letting the others finish if one fails
+                tool_results = await asyncio.gather(*coros, return_exceptions=True)
+                failures = [result for result in tool_results if isinstance(result, BaseException)]
+                if failures:
+                    ## Fail the step rather than end the research: the finished researchers are
+                    ## checkpointed, so a resumed run only re-runs the failed ones
+                    raise ResearcherError(
+                        f"{len(failures)} of {len(tool_results)} researchers failed: "
+                        f"{type(failures[0]).__name__}: {failures[0]}"
+                    ) from failures[0]
 
                 # Format research results as tool messages
                 # Each sub-agent returns compressed research findings in result["compressed_research"]
@@ -213,6 +333,8 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
                     for result in tool_results
                 ]
                 
+        except ResearcherError:
+            raise
         except Exception as e:
             print(f"Error in supervisor tools: {e}")
             should_end = True
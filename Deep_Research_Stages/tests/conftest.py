@@ -0,0 +1,7 @@
+## Test configuration
+## The research stages are flat modules, so tests import them from the parent directory
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
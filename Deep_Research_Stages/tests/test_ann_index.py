@@ -0,0 +1,57 @@
+## ANN Index Tests
+## Upserts must keep every row in exactly one IVF list, and search options must reach
+## the index through the LangChain search entry points
+
+import numpy as np
+import pytest
+
+import ann_index
+from vector_store import DiskVectorStore
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ann_index, "ann_min_rows", 100)
+    monkeypatch.setattr("vector_store.ann_min_rows", 100)
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((8, 16)).astype(np.float32)
+    vectors = centres[rng.integers(8, size=400)] + 0.1 * rng.standard_normal((400, 16)).astype(np.float32)
+    store = DiskVectorStore(str(tmp_path / "store"), index="ivf")
+    store.add_vectors(vectors, [f"text {i}" for i in range(400)], ids=[f"v{i}" for i in range(400)])
+    assert store.ann_active
+    yield store, vectors
+    store.close()
+
+def test_reupserted_row_is_returned_once(store):
+    store, vectors = store
+    ## The first search builds the inverted lists that later upserts must keep in step
+    store.similarity_search_by_vector(vectors[5], k=3)
+    store.add_vectors(vectors[5:6], ["text 5"], ids=["v5"])
+    store.add_vectors(vectors[5:6], ["text 5"], ids=["v5"])
+
+    ids = [doc.id for doc in store.similarity_search_by_vector(vectors[5], k=3)]
+    assert ids[0] == "v5"
+    assert len(ids) == len(set(ids))
+
+def test_reassigned_row_moves_to_its_new_list(store):
+    store, vectors = store
+    store.similarity_search_by_vector(vectors[0], k=3)
+    ## Move v0 onto v1's vector, which may belong to another list
+    store.add_vectors(vectors[1:2], ["moved"], ids=["v0"])
+
+    lists = store._ivf._inverted_lists(store.rows)
+    memberships = sum(int(np.isin(0, rows)) for rows in lists)
+    assert memberships == 1
+    assert 0 in lists[store._ivf.assignments[0] - 1]
+
+def test_search_options_reach_the_index(store, monkeypatch):
+    store, vectors = store
+    calls = []
+    search = store._ivf.search
+    monkeypatch.setattr(store._ivf, "search", lambda *args: calls.append(args[-1]) or search(*args))
+    top_rows = store._top_rows
+    monkeypatch.setattr(store, "_top_rows", lambda *args: calls.append("exact") or top_rows(*args))
+    monkeypatch.setattr(store, "_embedding", type("Fixed", (), {"embed_query": lambda self, text: vectors[7]})())
+
+    store.as_retriever(search_kwargs={"k": 3, "nprobe": 2}).invoke("query")
+    store.similarity_search("query", k=3, exact=True)
+    assert calls == [2, "exact"]
@@ -0,0 +1,133 @@
+## Checkpoint Resume Tests
+## A researcher failing partway through a batch must leave the run resumable without
+## losing the findings of the researchers that finished
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+import research_agent
+import supervisor_multi_agent
+from checkpointing import run_or_resume, sqlite_checkpointer
+from research_stage_prompt.prompts import format_search_output
+from source_registry import SOURCE_ID_PATTERN, current_source_registry
+
+class FakeSupervisor:
+    """Delegates two research topics, then completes."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        self.calls += 1
+        if not any(isinstance(m, AIMessage) for m in messages):
+            return AIMessage("", tool_calls=[
+                {"name": "ConductResearch", "args": {"research_topic": f"topic {i}"}, "id": f"research_{i}"}
+                for i in range(2)
+            ])
+        return AIMessage("", tool_calls=[{"name": "ResearchComplete", "args": {}, "id": "complete"}])
+
+class FakeResearcher:
+    """Answers directly, without tool calls."""
+
+    def invoke(self, messages, *args, **kwargs):
+        return AIMessage("answer")
+
+class FlakyCompressor:
+    """Compresses each topic, failing "topic 1" once as if the model server restarted."""
+
+    def __init__(self):
+        self.calls = {}
+        self.failed = False
+
+    def invoke(self, messages, *args, **kwargs):
+        topic = next(m.content for m in messages if isinstance(m, HumanMessage))
+        self.calls[topic] = self.calls.get(topic, 0) + 1
+        if topic == "topic 1" and not self.failed:
+            self.failed = True
+            raise ConnectionError("model server unavailable")
+        return AIMessage(f"Findings for {topic}")
+
+def test_resume_keeps_finished_researchers(tmp_path, monkeypatch):
+    compressor = FlakyCompressor()
+    monkeypatch.setattr(supervisor_multi_agent, "supervisor_model_with_tools", FakeSupervisor())
+    monkeypatch.setattr(research_agent, "model_with_tools", FakeResearcher())
+    monkeypatch.setattr(research_agent, "compress_model", compressor)
+
+    async def run():
+        async with sqlite_checkpointer(str(tmp_path / "checkpoints.db")) as checkpointer:
+            graph = supervisor_multi_agent.supervisor_builder.compile(checkpointer=checkpointer)
+            input_state = {"supervisor_messages": [HumanMessage(content="brief")], "research_brief": "brief"}
+            config = {"configurable": {"thread_id": "crash"}}
+
+            with pytest.raises(supervisor_multi_agent.ResearcherError):
+                await run_or_resume(graph, input_state, thread_id="crash")
+            snapshot = await graph.aget_state(config)
+            assert snapshot.next == ("supervisor_tools",)
+
+            return await run_or_resume(graph, input_state, thread_id="crash")
+
+    result = asyncio.run(run())
+
+    assert sorted(result["notes"]) == ["Findings for topic 0", "Findings for topic 1"]
+    ## The researcher that finished before the crash is replayed from its checkpoint
+    assert compressor.calls == {"topic 0": 1, "topic 1": 2}
+
+class SearchingResearcher:
+    """Searches its topic once, then answers."""
+
+    def invoke(self, messages, *args, **kwargs):
+        if any(m.type == "tool" for m in messages):
+            return AIMessage("answer")
+        topic = next(m.content for m in messages if isinstance(m, HumanMessage))
+        return AIMessage("", tool_calls=[{"name": "tavily_search", "args": {"query": topic}, "id": "search"}])
+
+class FakeSearch:
+    """Registers one page per query, as tavily_search does."""
+
+    def invoke(self, input, *args, **kwargs):
+        slug = input["query"].replace(" ", "-")
+        return format_search_output({f"https://example.com/{slug}": {"title": input["query"], "content": "..."}})
+
+class CitingCompressor(FlakyCompressor):
+    """Cites the source found by the researcher and keeps the registry of the run."""
+
+    def __init__(self):
+        super().__init__()
+        self.registry = None
+
+    def invoke(self, messages, *args, **kwargs):
+        self.registry = current_source_registry()
+        result = super().invoke(messages, *args, **kwargs)
+        source_id = next(i for m in messages if m.type == "tool" for i in SOURCE_ID_PATTERN.findall(m.content))
+        return AIMessage(f"{result.content} [{source_id}]")
+
+def test_resume_restores_source_ids(tmp_path, monkeypatch):
+    compressor = CitingCompressor()
+    monkeypatch.setattr(supervisor_multi_agent, "supervisor_model_with_tools", FakeSupervisor())
+    monkeypatch.setattr(research_agent, "model_with_tools", SearchingResearcher())
+    monkeypatch.setitem(research_agent.tools_by_name, "tavily_search", FakeSearch())
+    monkeypatch.setattr(research_agent, "compress_model", compressor)
+
+    async def run():
+        async with sqlite_checkpointer(str(tmp_path / "checkpoints.db")) as checkpointer:
+            graph = supervisor_multi_agent.supervisor_builder.compile(checkpointer=checkpointer)
+            input_state = {"supervisor_messages": [HumanMessage(content="brief")], "research_brief": "brief"}
+
+            with pytest.raises(supervisor_multi_agent.ResearcherError):
+                await run_or_resume(graph, input_state, thread_id="crash")
+            return await run_or_resume(graph, input_state, thread_id="crash")
+
+    result = asyncio.run(run())
+
+    ## Both notes cite IDs assigned before the crash; the resumed run (which compressed
+    ## topic 1 again) resolves them to the same pages
+    cited = {
+        SOURCE_ID_PATTERN.search(note).group(1): f"https://example.com/{note.split(' for ')[1].split(' [')[0].replace(' ', '-')}"
+        for note in result["notes"]
+    }
+    assert len(cited) == 2
+    assert {source_id: compressor.registry.get(source_id)["url"] for source_id in cited if source_id in compressor.registry} == cited
@@ -0,0 +1,43 @@
+## Model Scheduler Tests
+## Ending a model's turn must never leave waiting calls with nothing in flight to admit them
+
+import threading
+import time
+
+from model_scheduler import ModelScheduler
+
+def start_waiting_call(scheduler: ModelScheduler, model: str, priority: str, admitted: list) -> threading.Thread:
+    """Acquire a slot in a background thread, recording the call once admitted."""
+    def run():
+        scheduler.acquire(model, priority)
+        admitted.append((model, priority))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_turn_end_admits_best_priority_call_of_active_model():
+    scheduler = ModelScheduler(max_in_flight=4, max_turn_calls=1)
+    admitted = []
+    scheduler.acquire("A", "normal")
+    bulk = start_waiting_call(scheduler, "B", "bulk", admitted)
+    critical = start_waiting_call(scheduler, "A", "critical", admitted)
+    assert wait_until(lambda: scheduler.metrics()["waiting"] == {"B": 1, "A": 1})
+
+    ## A's turn is over, but its critical call outranks B's bulk call
+    scheduler.release("A")
+    critical.join(timeout=5)
+    assert admitted == [("A", "critical")]
+
+    scheduler.release("A")
+    bulk.join(timeout=5)
+    assert admitted == [("A", "critical"), ("B", "bulk")]
+    assert scheduler.metrics()["in_flight"] == 1
@@ -0,0 +1,151 @@
+## Semantic Tool Loadout
+## Selects the tools relevant to the current research topic and step from an embedding index of
+## tool descriptions, so researchers bind a few tools instead of every tool of every MCP server
+
+"""Semantic Tool Loadout for Multi-Server MCP Deployments.
+
+Binding every discovered MCP tool on every llm_call costs the full set of tool
+schemas in prompt tokens per iteration, which grows with each MCP server added.
+Following Method5-ToolLoadout.ipynb, ToolLoadout keeps an embedding index of tool
+descriptions and selects the top-k tools for each model call:
+- Each tool's "name: description" is embedded once; vectors are cached by a hash of
+  the text, so rediscovered or unchanged tools are never embedded again and only new
+  or changed descriptions are embedded (in one batch)
+- The query is the research topic plus the current step (the latest message), so
+  the loadout follows the researcher as it moves from searching to reading
+- Pinned tools (e.g. think_tool) are always bound and do not count towards k
+- With k or fewer candidate tools, or when the embeddings model is unavailable,
+  every tool is bound, as without a loadout
+
+tool_node still resolves calls against every discovered tool, so a call to a tool
+outside the current loadout (e.g. one remembered from an earlier step) still runs.
+"""
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.messages import BaseMessage, HumanMessage
+from rich.console import Console
+
+console = Console()
+
+## CONFIGURATION
+
+## Embeddings model used to index tool descriptions (as in Method5-ToolLoadout.ipynb)
+tool_embedding_model = "ollama:nomic-embed-text"
+## Tools selected per model call, on top of the pinned tools
+tool_loadout_k = 5
+## Characters of the topic and of the current step used as the selection query
+max_query_chars = 1000
+## Query embeddings kept in memory (researcher steps often repeat)
+max_cached_queries = 256
+
+def tool_text(tool) -> str:
+    """Text embedded for a tool."""
+    return f"{tool.name}: {tool.description}"
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _message_text(message) -> str:
+    content = message.content if isinstance(message, BaseMessage) else message.get("content", "")
+    text = content if isinstance(content, str) else str(content)
+    tool_calls = getattr(message, "tool_calls", None) or []
+    ## A step that only calls tools is described by the tools it called
+    names = " ".join(tool_call["name"] for tool_call in tool_calls)
+    return f"{text} {names}".strip()
+
+def loadout_query(messages: list) -> str:
+    """Selection query for a researcher step: the research topic and the latest message."""
+    if not messages:
+        return ""
+    topic = next((m for m in messages if isinstance(m, HumanMessage)), messages[0])
+    query = _message_text(topic)[:max_query_chars]
+    if messages[-1] is not topic:
+        query += "\n" + _message_text(messages[-1])[:max_query_chars]
+    return query
+
+class ToolLoadout:
+    """Embedding index of tool descriptions with top-k selection per query."""
+
+    def __init__(self, embeddings=None, k: int = tool_loadout_k):
+        """Create a loadout.
+
+        Args:
+            embeddings: LangChain Embeddings model (initialized lazily from
+                tool_embedding_model if omitted)
+            k: Tools selected per call, on top of the pinned tools
+        """
+        self._embeddings = embeddings
+        self.k = k
+        self._vectors = {}
+        self._queries = OrderedDict()
+        self._index_lock = asyncio.Lock()
+        self._stats = {"selections": 0, "embedded_tools": 0, "query_cache_hits": 0, "fallbacks": 0}
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from langchain.embeddings import init_embeddings
+            self._embeddings = init_embeddings(tool_embedding_model)
+        return self._embeddings
+
+    async def _tool_vectors(self, tools: list) -> np.ndarray:
+        """Unit vectors of the tools' descriptions, embedding only uncached descriptions."""
+        texts = [tool_text(tool) for tool in tools]
+        keys = [_text_key(text) for text in texts]
+        ## Researchers starting together wait for one batch instead of embedding the same tools
+        async with self._index_lock:
+            missing = {key: text for key, text in zip(keys, texts) if key not in self._vectors}
+            if missing:
+                vectors = await self.embeddings.aembed_documents(list(missing.values()))
+                for key, vector in zip(missing, vectors):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    self._vectors[key] = vector / (np.linalg.norm(vector) + 1e-12)
+                self._stats["embedded_tools"] += len(missing)
+        return np.stack([self._vectors[key] for key in keys])
+
+    async def _query_vector(self, query: str) -> np.ndarray:
+        key = _text_key(query)
+        if key in self._queries:
+            self._stats["query_cache_hits"] += 1
+            self._queries.move_to_end(key)
+            return self._queries[key]
+        vector = np.asarray(await self.embeddings.aembed_query(query), dtype=np.float32)
+        self._queries[key] = vector / (np.linalg.norm(vector) + 1e-12)
+        while len(self._queries) > max_cached_queries:
+            self._queries.popitem(last=False)
+        return self._queries[key]
+
+    async def select(self, tools: list, query: str, pinned: list = ()) -> list:
+        """Return the pinned tools followed by the `k` tools most relevant to `query`.
+
+        Args:
+            tools: Candidate tools (e.g. every discovered MCP tool)
+            query: Research topic and current step (see loadout_query)
+            pinned: Tools bound on every call
+
+        Returns:
+            Tools to bind, in a stable order so equal selections reuse bound models
+        """
+        self._stats["selections"] += 1
+        pinned_names = {tool.name for tool in pinned}
+        candidates = [tool for tool in tools if tool.name not in pinned_names]
+        if len(candidates) <= self.k or not query:
+            return list(pinned) + candidates
+
+        try:
+            similarity = await self._tool_vectors(candidates) @ await self._query_vector(query)
+        except Exception as e:
+            ## Binding every tool costs tokens, a missing tool costs the research
+            self._stats["fallbacks"] += 1
+            console.print(f"[yellow]⚠ Tool loadout unavailable, binding all tools: {type(e).__name__}: {e}[/yellow]")
+            return list(pinned) + candidates
+
+        top = sorted(np.argsort(-similarity)[:self.k].tolist())
+        return list(pinned) + [candidates[i] for i in top]
+
+    def metrics(self) -> dict:
+        return {**self._stats, "indexed_tools": len(self._vectors), "cached_queries": len(self._queries)}
@@ -0,0 +1,459 @@
+## Disk-Backed Vector Store
+## Persistent replacement for InMemoryVectorStore: float32 vectors in a memory-mapped NumPy file,
+## document text and metadata in SQLite, incremental upserts and vectorized top-k search
+
+"""Disk-Backed Vector Store for Retrieval.
+
+The RAG notebooks build an InMemoryVectorStore from scratch on every start, embedding
+every chunk again with ollama:nomic-embed-text, and keep every vector in RAM.
+DiskVectorStore persists the index in a directory instead:
+- vectors.f32: L2-normalized float32 vectors, one row per chunk, memory-mapped with
+  NumPy (the file grows by doubling, so appends do not rewrite it)
+- alive.u8: one byte per row, 0 for deleted or replaced rows
+- metadata.db: SQLite table mapping document IDs to rows, text and metadata
+
+Opening a store only reads the row count and maps the files, so it takes
+milliseconds whatever the size of the index. add_texts/add_documents upsert by
+document ID (an existing ID overwrites its row in place). Exact search is a single
+matrix-vector product over the mapped rows, processed in blocks so memory stays
+bounded, followed by an argpartition top-k. Stores with index="ivf" switch to the
+approximate IVF-flat index of ann_index.py once they hold ann_min_rows rows; the
+nprobe search argument tunes its recall.
+
+DiskVectorStore is a LangChain VectorStore, so as_retriever() and
+create_retriever_tool() work as with InMemoryVectorStore:
+
+    store = DiskVectorStore("./vector_store", embedding=init_embeddings("ollama:nomic-embed-text"))
+    store.add_documents(doc_splits, ids=[...])   # unchanged chunks come from the embedding cache
+    retriever = store.as_retriever(search_kwargs={"k": 4})
+
+retrieve_documents is a research tool over the store at default_vector_store_path,
+built with `python vector_store.py index --docs ./deep_research_files` (add
+`--index ivf` for large corpora; the store remembers its index).
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.tools import tool
+from langchain_core.vectorstores import VectorStore
+from rich.console import Console
+
+from ann_index import IVFIndex, ann_min_rows, default_nprobe, retrain_growth_factor
+from embedding_cache import CachedEmbeddings
+
+console = Console()
+
+## CONFIGURATION
+
+## Embeddings model used when none is given (as in the RAG notebooks)
+default_embedding_model = "ollama:nomic-embed-text"
+## Store opened by retrieve_documents
+default_vector_store_path = os.path.abspath("./vector_store/")
+## Rows allocated when a store is created (the vector file doubles when full)
+initial_capacity = 1024
+## Rows scored per block during search
+search_block_rows = 65536
+## Search index of stores opened without one: "flat" (exact) or "ivf" (approximate above ann_min_rows)
+## IVF recall depends on how clustered the embeddings are, so it is opt-in per store
+## (index="ivf" or --index ivf); ann_benchmark.py measures the recall/latency trade-off
+default_index = "flat"
+## Search indexes
+vector_indexes = ("flat", "ivf")
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def default_embeddings(cache_dir: str = default_vector_store_path) -> Embeddings:
+    """Embeddings model used by stores created without one (cached by content hash in `cache_dir`)."""
+    from langchain.embeddings import init_embeddings
+    return CachedEmbeddings(init_embeddings(default_embedding_model), os.path.join(cache_dir, "embedding_cache.db"))
+
+class DiskVectorStore(VectorStore):
+    """Persistent vector store: memory-mapped float32 vectors plus SQLite metadata."""
+
+    def __init__(self, path: str, embedding: Embeddings = None, index: str = None, nprobe: int = default_nprobe):
+        """Open (or create) the store in directory `path`.
+
+        Args:
+            path: Directory holding vectors.f32, alive.u8 and metadata.db
+            embedding: Embeddings model (default_embedding_model behind CachedEmbeddings if omitted)
+            index: "flat" or "ivf" (the store's saved index, else default_index, if omitted)
+            nprobe: IVF lists probed per query unless a search passes its own
+        """
+        self.path = os.path.abspath(path)
+        os.makedirs(self.path, exist_ok=True)
+        self._embedding = embedding
+        self._lock = threading.RLock()
+        ## Tools and retrievers may run in worker threads, so the connection is shared under a lock
+        self.conn = sqlite3.connect(os.path.join(self.path, "metadata.db"), check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        settings = dict(self.conn.execute("SELECT key, value FROM settings").fetchall())
+        self.index = index or settings.get("index", default_index)
+        if self.index not in vector_indexes:
+            raise ValueError(f"Unknown index {self.index!r}, expected one of {vector_indexes}")
+        self.nprobe = nprobe
+        self.dim = int(settings["dim"]) if "dim" in settings else None
+        self.rows = int(settings.get("rows", 0))
+        ## Centroids left from before a switch to the flat index miss the rows added since
+        self.trained_rows = int(settings.get("ivf_trained_rows", 0)) if settings.get("index", self.index) == self.index else 0
+        self._vectors = None
+        self._alive = None
+        self._ivf = IVFIndex(self.path) if self.index == "ivf" else None
+        if self.dim is not None:
+            self._map(int(settings["capacity"]))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embedding is None:
+            self._embedding = default_embeddings(self.path)
+        return self._embedding
+
+    ## STORAGE
+
+    def _map(self, capacity: int):
+        """Map the vector and liveness files with room for `capacity` rows."""
+        vector_path = os.path.join(self.path, "vectors.f32")
+        alive_path = os.path.join(self.path, "alive.u8")
+        for file_path, row_bytes in ((vector_path, self.dim * 4), (alive_path, 1)):
+            size = capacity * row_bytes
+            if not os.path.exists(file_path) or os.path.getsize(file_path) < size:
+                with open(file_path, "ab") as f:
+                    f.truncate(size)
+        self._vectors = np.memmap(vector_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._alive = np.memmap(alive_path, dtype=np.uint8, mode="r+", shape=(capacity,))
+        if self._ivf is not None:
+            self._ivf.map(capacity)
+        self.capacity = capacity
+
+    def _reserve(self, rows: int):
+        if self.dim is None:
+            return
+        if rows > self.capacity:
+            capacity = self.capacity
+            while capacity < rows:
+                capacity *= 2
+            self._vectors.flush()
+            self._alive.flush()
+            self._map(capacity)
+
+    def _save_settings(self):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            [("dim", str(self.dim)), ("rows", str(self.rows)), ("capacity", str(self.capacity)),
+             ("index", self.index), ("ivf_trained_rows", str(self.trained_rows))],
+        )
+
+    ## ANN INDEX
+
+    @property
+    def ann_active(self) -> bool:
+        """Whether searches use the IVF index rather than scoring every row."""
+        return self._ivf is not None and self.trained_rows > 0 and self.rows >= ann_min_rows
+
+    def build_index(self):
+        """(Re)train the IVF index on the current rows and assign every row to a list."""
+        with self._lock:
+            if self._ivf is None or not self.rows:
+                return
+            self._ivf.train(self._vectors, self._alive, self.rows)
+            self.trained_rows = self.rows
+            self._save_settings()
+            self.conn.commit()
+
+    def _update_index(self, vectors: np.ndarray, rows: list[int]):
+        """Keep the IVF index in step with an upsert, training or retraining when due."""
+        if self._ivf is None or self.rows < ann_min_rows:
+            return
+        if not self.trained_rows or self.rows >= retrain_growth_factor * self.trained_rows:
+            self.build_index()
+        else:
+            self._ivf.add(vectors, rows)
+
+    ## UPSERTS
+
+    def add_vectors(self, vectors, texts: list[str], metadatas: list[dict] = None, ids: list[str] = None) -> list[str]:
+        """Upsert precomputed vectors with their texts; existing IDs are overwritten in place."""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [i or str(uuid.uuid4()) for i in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._map(initial_capacity)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Vectors have {vectors.shape[1]} dimensions, the store holds {self.dim}")
+
+            placeholders = ",".join("?" * len(ids))
+            existing = dict(self.conn.execute(
+                f"SELECT id, row FROM documents WHERE id IN ({placeholders})", ids
+            ).fetchall()) if ids else {}
+            rows = []
+            for doc_id in ids:
+                if doc_id not in existing:
+                    existing[doc_id] = self.rows
+                    self.rows += 1
+                rows.append(existing[doc_id])
+            self._reserve(self.rows)
+
+            ## Later duplicates of an ID in the same batch win, as with sequential upserts
+            self._vectors[rows] = vectors
+            self._alive[rows] = 1
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO documents (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+                [(row, doc_id, text, json.dumps(metadata, default=str))
+                 for row, doc_id, text, metadata in zip(rows, ids, texts, metadatas)],
+            )
+            self._save_settings()
+            self._vectors.flush()
+            self._alive.flush()
+            self.conn.commit()
+            self._update_index(vectors, rows)
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        """Embed and upsert texts (documents with an existing ID are replaced)."""
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self.embeddings.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas, ids)
+
+    def delete(self, ids: Optional[list[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete documents by ID (their rows are skipped by search)."""
+        if not ids:
+            return False
+        with self._lock:
+            placeholders = ",".join("?" * len(ids))
+            rows = [row for (row,) in self.conn.execute(
+                f"SELECT row FROM documents WHERE id IN ({placeholders})", ids
+            )]
+            if rows:
+                self._alive[rows] = 0
+                self._alive.flush()
+            self.conn.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", ids)
+            self.conn.commit()
+        return bool(rows)
+
+    def get_by_ids(self, ids, /) -> list[Document]:
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            found = {
+                doc_id: Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+                for doc_id, text, metadata in self.conn.execute(
+                    f"SELECT id, text, metadata FROM documents WHERE id IN ({placeholders})", list(ids)
+                )
+            }
+        return [found[doc_id] for doc_id in ids if doc_id in found]
+
+    ## SEARCH
+
+    def _top_rows(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Rows and cosine scores of the `k` live vectors most similar to `query`."""
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, self.rows, search_block_rows):
+            end = min(self.rows, start + search_block_rows)
+            scores = self._vectors[start:end] @ query
+            scores[self._alive[start:end] == 0] = -np.inf
+            if end - start > k:
+                top = np.argpartition(-scores, k)[:k]
+            else:
+                top = np.arange(end - start)
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            if len(best_rows) > k:
+                keep = np.argpartition(-best_scores, k)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        order = np.argsort(-best_scores, kind="stable")
+        rows, scores = best_rows[order], best_scores[order]
+        live = np.isfinite(scores)
+        return rows[live], scores[live]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: list[float], k: int = 4, nprobe: int = None, exact: bool = False
+    ) -> list[tuple[Document, float]]:
+        """Return the `k` documents most similar to an embedding, with cosine scores.
+
+        Args:
+            embedding: Query vector
+            k: Documents to return
+            nprobe: IVF lists to probe (the store's nprobe if omitted)
+            exact: Score every row even when the IVF index is active
+        """
+        with self._lock:
+            if not self.rows:
+                return []
+            query = _normalize(np.asarray(embedding, dtype=np.float32))
+            if self.ann_active and not exact:
+                rows, scores = self._ivf.search(self._vectors, self._alive, self.rows, query, k, nprobe or self.nprobe)
+            else:
+                rows, scores = self._top_rows(query, k)
+            placeholders = ",".join("?" * len(rows))
+            found = {
+                row: Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+                for row, doc_id, text, metadata in self.conn.execute(
+                    f"SELECT row, id, text, metadata FROM documents WHERE row IN ({placeholders})",
+                    [int(row) for row in rows],
+                )
+            }
+        return [(found[int(row)], float(score)) for row, score in zip(rows, scores) if int(row) in found]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        ## Scores are cosine similarities already
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        path: str = default_vector_store_path,
+        **kwargs: Any,
+    ) -> "DiskVectorStore":
+        """Create (or open) the store at `path` and upsert `texts`."""
+        store = cls(path, embedding=embedding)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    def __len__(self) -> int:
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._alive.flush()
+            if self._ivf is not None:
+                self._ivf.flush()
+            self.conn.close()
+
+## INDEXING
+
+def index_directory(store: DiskVectorStore, docs_path: str, chunk_size: int = 1000, chunk_overlap: int = 150) -> int:
+    """Split the text files of `docs_path` and upsert their chunks.
+
+    Chunk IDs are "<file>#<chunk number>", so re-indexing a file overwrites its chunks
+    and drops chunks past its new end.
+
+    Returns:
+        Number of chunks upserted
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    upserted = 0
+    for name in sorted(os.listdir(docs_path)):
+        file_path = os.path.join(docs_path, name)
+        if not os.path.isfile(file_path):
+            continue
+        with open(file_path, encoding="utf-8", errors="replace") as f:
+            chunks = splitter.split_text(f.read())
+        ids = [f"{name}#{i}" for i in range(len(chunks))]
+        store.add_texts(chunks, [{"source": name, "chunk": i} for i in range(len(chunks))], ids=ids)
+        stale = [doc_id for (doc_id,) in store.conn.execute(
+            "SELECT id FROM documents WHERE json_extract(metadata, '$.source') = ? AND json_extract(metadata, '$.chunk') >= ?",
+            (name, len(chunks)),
+        )]
+        store.delete(stale)
+        upserted += len(chunks)
+    return upserted
+
+## RETRIEVER TOOL
+
+## Global store variable - will be opened lazily
+_store = None
+
+def get_vector_store() -> DiskVectorStore:
+    """Get or open the store at default_vector_store_path."""
+    global _store
+    if _store is None:
+        _store = DiskVectorStore(default_vector_store_path)
+    return _store
+
+def vector_store_available() -> bool:
+    """Whether a store has been built at default_vector_store_path."""
+    return os.path.exists(os.path.join(default_vector_store_path, "metadata.db"))
+
+@tool(parse_docstring=True)
+def retrieve_documents(query: str) -> str:
+    """Retrieve the document chunks most similar in meaning to a query from the local vector store.
+
+    Args:
+        query: A description of the information to find
+
+    Returns:
+        The most relevant chunks with their source
+    """
+    docs = get_vector_store().as_retriever(search_kwargs={"k": 4}).invoke(query)
+    if not docs:
+        return "No documents found in the vector store."
+    return "\n\n".join(
+        f"--- {doc.metadata.get('source', doc.id)} ---\n{doc.page_content}" for doc in docs
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the disk-backed vector store.")
+    parser.add_argument("command", choices=["index", "query"], help="Index a directory or run a query")
+    parser.add_argument("text", nargs="?", help="Query text")
+    parser.add_argument("--store", default=default_vector_store_path, help="Store directory")
+    parser.add_argument("--docs", default="./deep_research_files", help="Directory to index")
+    parser.add_argument("-k", type=int, default=4, help="Results per query")
+    parser.add_argument("--index", choices=vector_indexes, help="Search index (default: the store's, else default_index)")
+    parser.add_argument("--nprobe", type=int, default=default_nprobe, help="IVF lists probed per query")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = DiskVectorStore(args.store, index=args.index, nprobe=args.nprobe)
+    console.print(f"[green]✓ Opened store with {store.rows} rows ({store.index} index) in {(time.perf_counter() - start) * 1000:.1f}ms[/green]")
+    if args.command == "index":
+        start = time.perf_counter()
+        count = index_directory(store, args.docs)
+        if store.index == "ivf" and store.rows >= ann_min_rows and not store.ann_active:
+            store.build_index()
+        console.print(f"[green]✓ Upserted {count} chunks in {time.perf_counter() - start:.1f}s[/green]")
+    elif args.text:
+        start = time.perf_counter()
+        results = store.similarity_search_with_score(args.text, k=args.k)
+        console.print(f"[green]✓ Search took {(time.perf_counter() - start) * 1000:.1f}ms[/green]")
+        for doc, score in results:
+            console.print(f"[cyan]{score:.3f}[/cyan] {doc.id}: {doc.page_content[:200]}")
+    store.close()